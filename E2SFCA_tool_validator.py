@@ -51,9 +51,37 @@ class ToolValidator(object):
     else:
         self.params[15].enabled = False
         self.params[16].enabled = False
+
+    # A local road network is solved whole, with its own travel time field
+    localNetwork = bool(self.params[22].value)
+    self.params[20].enabled = not localNetwork
+    self.params[21].enabled = not localNetwork
+    self.params[23].enabled = localNetwork
+
+    # O-D lines go to a columnar file only with the scores
+    self.params[31].enabled = bool(self.params[30].value)
+
+    # Stored network locations are for Network Analyst only
+    self.params[33].enabled = not localNetwork
+
+    # A contraction hierarchy is built for a local road network only
+    self.params[34].enabled = localNetwork
+
+    # Clusters are checked by travel time on a local road network only
+    self.params[38].enabled = bool(self.params[35].value) and localNetwork
+
+    # Supply layers scored as categories replace the category field
+    self.params[36].enabled = not self.params[37].value
     return
 
   def updateMessages(self):
     """Modify the messages created by internal validation for each tool
     parameter.  This method is called after internal validation."""
+    if self.params[29].value == "Stepwise":
+        self.params[29].setErrorMessage("E2SFCA zones are stepwise already; choose the function weighting them.")
+    for index in (20, 24, 35, 38):
+        if self.params[index].value and self.params[index].value < 0:
+            self.params[index].setErrorMessage("The value cannot be negative.")
+    if self.params[21].value and self.params[21].value < 1:
+        self.params[21].setErrorMessage("At least one worker is needed.")
     return
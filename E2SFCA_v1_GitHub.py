@@ -8,9 +8,28 @@
 
 
 # Import necessary modules
+import os
+import shutil
+import tempfile
 import numpy
 import arcpy
 from arcpy import env
+import sfca_core_GitHub as sfca_core
+import od_cache_GitHub as od_cache
+import od_parallel_GitHub as od_parallel
+import od_graph_GitHub as od_graph
+import od_prefilter_GitHub as od_prefilter
+import sfca_update_GitHub as sfca_update
+import sfca_timing_GitHub as sfca_timing
+import sfca_sparse_GitHub as sfca_sparse
+import sfca_decay_GitHub as sfca_decay
+import sfca_output_GitHub as sfca_output
+import od_store_GitHub as od_store
+import od_locations_GitHub as od_locations
+import od_hierarchy_GitHub as od_hierarchy
+import sfca_aggregate_GitHub as sfca_aggregate
+import sfca_categories_GitHub as sfca_categories
+import sfca_tables_GitHub as sfca_tables
 
 arcpy.CheckOutExtension("Network")
 
@@ -61,11 +80,77 @@ def e2sfca():
     outputFC = arcpy.GetParameterAsText(17)
     #Output report
     report = arcpy.GetParameterAsText(18)
+    #Folder for cached O-D matrices - OPTIONAL
+    cacheFolder = arcpy.GetParameterAsText(19)
+    #Origins per O-D batch (0 solves the whole matrix at once) - OPTIONAL
+    batchSize = int(arcpy.GetParameter(20) or 0)
+    #Worker processes solving O-D batches in parallel - OPTIONAL
+    workers = int(arcpy.GetParameter(21) or 1)
+    #Local road network (CSV edge list or lines) used instead of the Network Dataset - OPTIONAL
+    localNetwork = arcpy.GetParameterAsText(22)
+    #Travel time field of the road lines - OPTIONAL
+    localMinutesField = arcpy.GetParameterAsText(23)
+    #Maximum network speed (map units per minute) for skipping pairs out of reach - OPTIONAL
+    maxSpeed = float(arcpy.GetParameter(24) or 0)
+    #File keeping this run's lines & scores for incremental updates - OPTIONAL
+    stateFile = arcpy.GetParameterAsText(25)
+    #Stage timings sidecar (.json or .csv) - OPTIONAL
+    timingsFile = arcpy.GetParameterAsText(26)
+    #O-D table with IDs, volumes & scores of each line - OPTIONAL
+    odTable = arcpy.GetParameterAsText(27)
+    #Score with a sparse weight matrix held in memory - OPTIONAL
+    sparseEngine = bool(arcpy.GetParameter(28))
+    #Decay function weighting the zones (Gaussian if not set; not Stepwise) - OPTIONAL
+    decayName = arcpy.GetParameterAsText(29) or "Gaussian"
+    #Columnar output of the scores (.npz, .arrow or .parquet) - OPTIONAL
+    columnarOutput = arcpy.GetParameterAsText(30)
+    #Add the O-D lines to the columnar output - OPTIONAL
+    columnarLines = bool(arcpy.GetParameter(31))
+    #Folder of a memory-mapped O-D store indexed by supply & demand point - OPTIONAL
+    storeFolder = arcpy.GetParameterAsText(32)
+    #Folder keeping the network locations points were snapped to - OPTIONAL
+    locationFolder = arcpy.GetParameterAsText(33)
+    #Solve the local road network on a contraction hierarchy kept in the cache folder - OPTIONAL
+    localHierarchy = bool(arcpy.GetParameter(34))
+    #Cell size (map units) for scoring demand on cluster representatives (0 scores every point) - OPTIONAL
+    demandCellSize = float(arcpy.GetParameter(35) or 0)
+    #Field naming the category of each supply point, scored separately - OPTIONAL
+    supplyCategoryField = arcpy.GetParameterAsText(36)
+    #More supply layers, each scored as a category named after the layer - OPTIONAL
+    categorySupply = [layer for layer in arcpy.GetParameterAsText(37).split(";") if layer]
+    #Travel time tolerance (minutes) of demand clusters on a local road network - OPTIONAL
+    demandTolerance = float(arcpy.GetParameter(38) or 0)
+
+    # Run the tool on the parameters
+    runE2SFCA(inputND, inputSupply, supplyVolumeOpt, supplyVolumeField, supplyVolumeValue,
+              inputSupplyID, supplyMultiplier, inputDemand, demandVolumeOpt, demandVolumeField,
+              demandVolumeValue, inputDemandID, distList, distanceMethod, coeffOrWeight,
+              coefficient, targetWeight, outputFC, report, cacheFolder, batchSize, workers,
+              localNetwork, localMinutesField, maxSpeed, stateFile, timingsFile, odTable,
+              sparseEngine, decayName, columnarOutput, columnarLines, storeFolder, locationFolder,
+              localHierarchy, demandCellSize, supplyCategoryField, categorySupply, demandTolerance)
+
+# A function running E2SFCA on typed arguments (see sfca_jobs)
+def runE2SFCA(inputND, inputSupply, supplyVolumeOpt, supplyVolumeField, supplyVolumeValue,
+              inputSupplyID, supplyMultiplier, inputDemand, demandVolumeOpt, demandVolumeField,
+              demandVolumeValue, inputDemandID, distList, distanceMethod, coeffOrWeight,
+              coefficient, targetWeight, outputFC, report, cacheFolder="", batchSize=0, workers=1,
+              localNetwork="", localMinutesField="", maxSpeed=0, stateFile="", timingsFile="",
+              odTable="", sparseEngine=False, decayName="Gaussian", columnarOutput="",
+              columnarLines=False, storeFolder="", locationFolder="", localHierarchy=False,
+              demandCellSize=0, supplyCategoryField="", categorySupply=(), demandTolerance=0):
+    '''Runs E2SFCA without the ArcGIS parameter plumbing. Arguments are the
+    tool's parameters, with the same names & in the same order; optional
+    ones default as in the tool. Returns a summary of the run.'''
+
+    # Wall time, CPU time, memory & rows of each stage
+    timings = sfca_timing.StageTimings()
 
     # Begin generating report:
     file = open(report, "w")
     file.write("E2SFCA Report\n\nINPUTS:\n\n")
-    file.write("Network Dataset: %s\n\n"%inputND)
+    file.write("Network Dataset: %s\n"%inputND)
+    file.write("Local road network: %s\n\n"%(localNetwork or "Not used"))
     file.write("Supply:\nPoints: %s\nUnique IDs: %s\n"%(inputSupply,inputSupplyID))
     file.write("Volume: %s\nField: %s\nValue: %s\n"%(supplyVolumeOpt, supplyVolumeField, supplyVolumeValue))
     file.write("Volume multiplier: %s (This value is reflected in Step 2 scores)\n\n"%supplyMultiplier)
@@ -101,14 +186,19 @@ def e2sfca():
     catch = [catch1, catch2, catch3]
 
     #Check weighting method & calculate all 3 weights
+    if decayName == "Stepwise":
+        # The zones are steps already; a stepwise curve would cut the
+        # catchment into equal zones of its own & ignore the zone limits
+        raise ValueError("Stepwise decay is for V2SFCA; E2SFCA zones are weighted by a continuous function")
+    decay, decaySolve = sfca_decay.decayFunction(decayName)
     if coeffOrWeight == "Use coefficient":
-        weight1 = gaussianWeights(catch1, coefficient)
-        weight2 = gaussianWeights(catch2, coefficient)
-        weight3 = gaussianWeights(catch3, coefficient)
+        weight1 = float(decay(catch1, coefficient, distLimit))
+        weight2 = float(decay(catch2, coefficient, distLimit))
+        weight3 = float(decay(catch3, coefficient, distLimit))
     elif coeffOrWeight == "Use target weight":
-        coefficient = gaussianSolve(catch3, targetWeight)
-        weight1 = gaussianWeights(catch1, coefficient)
-        weight2 = gaussianWeights(catch2, coefficient)
+        coefficient = decaySolve(catch3, targetWeight)
+        weight1 = float(decay(catch1, coefficient, distLimit))
+        weight2 = float(decay(catch2, coefficient, distLimit))
         weight3 = targetWeight
     weights = [weight1, weight2, weight3]
 
@@ -117,7 +207,8 @@ def e2sfca():
     file.write("\n\nDistances and Weights:\n")
     file.write("Zone limits: %s (The third value is considered the catchment)\n"%distance)
     file.write("Distance method: %s\n"%distanceMethod)
-    file.write("Coefficient or Target Weight: %s\n\n"%coeffOrWeight)
+    file.write("Coefficient or Target Weight: %s\n"%coeffOrWeight)
+    file.write("Decay function: %s\n\n"%decayName)
     file.write("COEFFICIENT AND WEIGHTS:\n\n")
     file.write("Coefficient: %s\nTarget weight: %s\n"%(coefficient, targetWeight))
     file.write("First zone weighting distance and weight: %s, %s\n"%(catch1, weight1))
@@ -125,9 +216,31 @@ def e2sfca():
     file.write("Third zone weighting distance and weight: %s, %s\n\n"%(catch3, weight3))
     file.close()
 
+    # Several supply layers are scored as the categories of one union of
+    # their points, so the O-D matrix is solved once
+    if categorySupply:
+        arcpy.AddMessage("Combining supply layers...")
+        timings.start("Combining supply layers")
+        supplyLayers = [inputSupply] + list(categorySupply)
+        # Every layer is read in (projected to) the demand layer's
+        # coordinate system, so the union's points all share it
+        unionReference = arcpy.Describe(inputDemand).spatialReference
+        layerIDs, layerVolumes, layerX, layerY = zip(*[readPoints(layer, inputSupplyID, supplyVolumeOpt,
+                                                                  supplyVolumeField, supplyVolumeValue,
+                                                                  unionReference)
+                                                       for layer in supplyLayers])
+        inputSupply = sfca_categories.writeUnion(os.path.join(arcpy.env.scratchGDB, "supplyUnion"),
+                                                 [sfca_categories.layerCategory(arcpy.Describe(layer).catalogPath)
+                                                  for layer in supplyLayers],
+                                                 layerIDs, layerVolumes, layerX, layerY, unionReference)
+        timings.rows(sum(len(ids) for ids in layerIDs))
+        inputSupplyID, supplyCategoryField = sfca_categories.unionID, sfca_categories.categoryField
+        supplyVolumeOpt, supplyVolumeField = "Volume from field", sfca_categories.unionVolume
+
 # Make working feature layers based on supply & demand inputs
     arcpy.AddMessage("Preparing input features...")
     arcpy.SetProgressor("default", "Preparing input features...")
+    timings.start("Preparing input features")
 
     # Variables for new layers
     workingSupplyName = "WorkingSupplyLayer"
@@ -135,51 +248,329 @@ def e2sfca():
     workingSupply = arcpy.MakeFeatureLayer_management(inputSupply, workingSupplyName)
     workingDemand = arcpy.MakeFeatureLayer_management(inputDemand, workingDemandName)
 
-    # Check if Volume fields exist or if Volume values should be applied...
-    if supplyVolumeOpt == "Constant volume value":
-        supplyVolumeField = "Supply_Vol"
-        arcpy.AddField_management(workingSupply, supplyVolumeField, "DOUBLE")
-        writeVolume = arcpy.da.UpdateCursor(workingSupply, supplyVolumeField)
-        for row in writeVolume:
-            row[0] = supplyVolumeValue
-            writeVolume.updateRow(row)
-        del writeVolume, row
-    elif supplyVolumeOpt == "Volume from field":
-        pass
-    if demandVolumeOpt == "Constant volume value":
-        demandVolumeField = "Demand_Vol"
-        arcpy.AddField_management(workingDemand, demandVolumeField, "DOUBLE")
-        writeVolume = arcpy.da.UpdateCursor(workingDemand, demandVolumeField)
-        for row in writeVolume:
-            row[0] = demandVolumeValue
-            writeVolume.updateRow(row)
-        del writeVolume, row
-    elif demandVolumeOpt == "Volume from field":
-        pass
-
-# Prepare extra fields for weights & calculations
-    weightField = "Weight"
-    weightedSupply = "WghtSupply"
-    weightedDemand = "WghtDemand"
+# Names of the score fields
     step1Score = "Step1_Score"
     step2Score = "Step2_Score"
     sparField = "SPAR"
-    doubleType = "DOUBLE"
-
-    #Supply
-    arcpy.AddField_management(workingSupply, weightField, doubleType)
-    arcpy.AddField_management(workingSupply, weightedSupply, doubleType)
-    arcpy.AddField_management(workingSupply, step1Score, doubleType)
 
-    #Demand
-    arcpy.AddField_management(workingDemand, weightedDemand, doubleType)
-    arcpy.AddField_management(workingDemand, step2Score, doubleType)
-    arcpy.AddField_management(workingDemand, sparField, doubleType)
-
-# Creation of an Origin-Destination matrix layer & preparation of variables
-# and inputs.
+# Creation of an Origin-Destination matrix (or reuse of a cached one)
     arcpy.AddMessage("Preparing Origin-Destination Matrix...")
     arcpy.SetProgressor("default", "Preparing Origin-Destination Matrix...")
+    timings.start("Reading input features")
+    # Read inputs into arrays; constant volumes are applied in memory.
+    # IDs are compared as text, as in the Supply_ID & Demand_ID analysis fields
+    supplyIDs, supplyVolume, supplyX, supplyY = readPoints(workingSupply, inputSupplyID, supplyVolumeOpt,
+                                                           supplyVolumeField, supplyVolumeValue)
+    demandIDs, demandVolume, demandX, demandY = readPoints(workingDemand, inputDemandID, demandVolumeOpt,
+                                                           demandVolumeField, demandVolumeValue)
+    supplyKeys = supplyIDs.astype(str)
+    demandKeys = demandIDs.astype(str)
+    # Categories are read in the same order as the IDs
+    categoryNames = None
+    if supplyCategoryField:
+        categoryNames, supplyCategory = sfca_categories.supplyCategories(
+            readColumns(workingSupply, [supplyCategoryField])[0])
+
+    # Batch lines come back as ObjectIDs, read in the same order as the IDs
+    supplyOIDs = readColumns(workingSupply, ["OID@"])[0]
+    demandOIDs = readColumns(workingDemand, ["OID@"])[0]
+    timings.rows(len(supplyIDs) + len(demandIDs))
+
+    # Dense demand can be solved & scored on cluster representatives, which
+    # stand in for the demand layer until the scores are mapped back
+    demandLayer, demandIDField = workingDemand, inputDemandID
+    aggregationNote = "Not used"
+    if demandCellSize > 0:
+        arcpy.AddMessage("Aggregating demand points...")
+        timings.start("Aggregating demand points")
+        timings.rows(len(demandIDs))
+        pointIDs, pointVolume = demandIDs, demandVolume
+        times = None
+        demandTolerance = demandTolerance or sfca_aggregate.defaultTolerance
+        if localNetwork:
+            clusters, representative, demandVolume, times = sfca_aggregate.networkClusters(
+                od_graph.loadNetwork(localNetwork, localMinutesField or "minutes"), demandX, demandY,
+                pointVolume, demandCellSize, demandTolerance)
+        else:
+            clusters = sfca_aggregate.clusterPoints(demandX, demandY, demandCellSize)
+            representative, demandVolume = sfca_aggregate.representatives(demandX, demandY, pointVolume, clusters)
+        aggregationNote = sfca_aggregate.aggregationNote(demandCellSize, clusters, pointVolume,
+                                                         sfca_aggregate.displacement(demandX, demandY, clusters,
+                                                                                     representative),
+                                                         times, demandTolerance)
+        demandIDs = numpy.array(["R%s"%cluster for cluster in range(len(representative))])
+        demandKeys = demandIDs
+        demandX, demandY = demandX[representative], demandY[representative]
+        representativePath = sfca_aggregate.writeRepresentatives(
+            os.path.join(arcpy.env.scratchGDB, "demandRepresentatives"), demandIDs, demandX, demandY,
+            demandVolume, arcpy.Describe(inputDemand).spatialReference)
+        workingDemand = arcpy.MakeFeatureLayer_management(representativePath, "RepresentativeDemandLayer")
+        demandIDField = sfca_aggregate.representativeID
+        demandOIDs = readColumns(workingDemand, ["OID@"])[0]
+    timings.start("Preparing Origin-Destination Matrix")
+
+    # Zone weights are a lookup of three values already, so they are never
+    # quantized; bins across a zone limit would only add error
+    weightFunction = lambda odMinutes: sfca_core.zoneWeights(odMinutes, distance, weights)
+    weightNote = "Exact (zone lookup)"
+
+    # A local road network is solved whole, in this process
+    solveInBatches = (batchSize > 0 or workers > 1) and not localNetwork
+    if solveInBatches:
+        # Solve origins in batches & keep only each batch's weighted lines,
+        # spilled to scratch, so memory is bounded by the batch size.
+        # With several workers the batches are solved in parallel.
+        spillFolder = tempfile.mkdtemp(prefix="e2sfca_", dir=arcpy.env.scratchFolder)
+        tasks, skippedPairs, totalPairs = od_parallel.networkAnalystTasks(inputND, distLimit,
+                                                                          workingSupply, workingDemand,
+                                                                          batchSize, workers,
+                                                                          spillFolder, maxSpeed)
+        odBatches = (sfca_core.odArrays(supplyOIDs, demandOIDs, lineSupply, lineDemand,
+                                        lineMinutes)
+                     for lineSupply, lineDemand, lineMinutes in solveODBatches(tasks, workers))
+        # Minutes are spilled & weighted as they are read back
+        chunkPaths = od_cache.spillChunks(odBatches, tempfile.mkdtemp(dir=spillFolder))
+        odSource = "Solved in %s batches (%s workers)"%(len(chunkPaths), max(workers, 1))
+        if maxSpeed > 0:
+            odSource += "; %s"%od_prefilter.prunedNote(skippedPairs, totalPairs)
+        odLines = lambda: od_cache.spilledChunks(chunkPaths)
+        odChunks = lambda: sfca_core.weightChunks(odLines(), weightFunction)
+    else:
+        # The cache key covers everything the solve depends on
+        if localNetwork:
+            networkSig = od_cache.cacheKey([od_cache.networkSignature(localNetwork),
+                                            localMinutesField])
+        else:
+            networkSig = od_cache.networkSignature(inputND)
+        odKey = od_cache.cacheKey([networkSig, "Minutes", distLimit,
+                                   od_cache.pointsSignature(supplyKeys, supplyX, supplyY),
+                                   od_cache.pointsSignature(demandKeys, demandX, demandY)])
+        cachedLines = od_cache.loadMatrix(cacheFolder, odKey)
+        if cachedLines is not None:
+            arcpy.AddMessage("Loading cached Origin-Destination Matrix...")
+            odSource = "Loaded from cache (%s)"%odKey
+            lineSupply, lineDemand, lineMinutes = cachedLines
+        elif localNetwork:
+            arcpy.AddMessage("Solving Origin-Destination Matrix on the local road network...")
+            network = od_graph.loadNetwork(localNetwork, localMinutesField or "minutes")
+            solver, solverNote = None, ""
+            if localHierarchy:
+                # Built once per network version & kept for later runs
+                arcpy.AddMessage("Loading the contraction hierarchy of the network...")
+                solver = od_hierarchy.hierarchySolver(od_hierarchy.networkHierarchy(
+                    localNetwork, localMinutesField, cacheFolder or arcpy.env.scratchFolder))
+                solverNote = " on its contraction hierarchy"
+            supplyKept = numpy.arange(len(supplyKeys))
+            demandKept = numpy.arange(len(demandKeys))
+            pruned = ""
+            if maxSpeed > 0:
+                # Points with nothing in straight-line reach are not searched from
+                supplyMask, demandMask = od_prefilter.reachableMasks(
+                    supplyX, supplyY, demandX, demandY, od_prefilter.reachRadius(distLimit, maxSpeed))
+                pruned = "; %s"%od_prefilter.prunedNote(*od_prefilter.prunedPairs(supplyMask, demandMask))
+                supplyKept, demandKept = supplyKept[supplyMask], demandKept[demandMask]
+            supplyIndex, demandIndex, lineMinutes, longestSnap = od_graph.solvePoints(
+                network, supplyX[supplyKept], supplyY[supplyKept], demandX[demandKept],
+                demandY[demandKept], distLimit, solver)
+            lineSupply = supplyKeys[supplyKept[supplyIndex]]
+            lineDemand = demandKeys[demandKept[demandIndex]]
+            odSource = "Solved on the local road network%s (longest snap: %s)%s"%(solverNote, longestSnap,
+                                                                                   pruned)
+            if od_cache.saveMatrix(cacheFolder, odKey, lineSupply, lineDemand, lineMinutes):
+                odSource += ", cached (%s)"%odKey
+        elif maxSpeed > 0:
+            # One task, solved here, holding only the points within reach
+            tasks, skippedPairs, totalPairs = od_parallel.networkAnalystTasks(inputND, distLimit,
+                                                                              workingSupply, workingDemand,
+                                                                              0, 1, arcpy.env.scratchFolder,
+                                                                              maxSpeed)
+            batches = list(solveODBatches(tasks, 1))
+            if batches:
+                lineSupply, lineDemand, lineMinutes = [numpy.concatenate(column) for column in zip(*batches)]
+            else:
+                lineSupply, lineDemand, lineMinutes = numpy.zeros(0), numpy.zeros(0), numpy.zeros(0)
+            # Lines are matched on ObjectIDs, then stored with the text IDs
+            supplyIndex, demandIndex, lineMinutes = sfca_core.odArrays(supplyOIDs, demandOIDs, lineSupply,
+                                                                       lineDemand, lineMinutes)
+            lineSupply, lineDemand = supplyKeys[supplyIndex], demandKeys[demandIndex]
+            odSource = "Solved; %s"%od_prefilter.prunedNote(skippedPairs, totalPairs)
+            if od_cache.saveMatrix(cacheFolder, odKey, lineSupply, lineDemand, lineMinutes):
+                odSource += ", cached (%s)"%odKey
+        else:
+            solveSupply, solveDemand = workingSupply, workingDemand
+            if locationFolder:
+                # Points carry their stored network locations; only new or
+                # moved points are snapped
+                arcpy.AddMessage("Loading snapped network locations...")
+                solveSupply, supplySnapped = od_locations.locatedPoints(workingSupply, inputSupplyID, inputND,
+                                                                        locationFolder, "locatedSupply")
+                solveDemand, demandSnapped = od_locations.locatedPoints(workingDemand, demandIDField, inputND,
+                                                                        locationFolder, "locatedDemand")
+            lineSupply, lineDemand, lineMinutes = solveODMatrix(inputND, distLimit,
+                                                                solveSupply, inputSupplyID,
+                                                                solveDemand, demandIDField)
+            if od_cache.saveMatrix(cacheFolder, odKey, lineSupply, lineDemand, lineMinutes):
+                odSource = "Solved & cached (%s)"%odKey
+            else:
+                odSource = "Solved"
+            if locationFolder:
+                odSource += "; %s of %s points snapped, the rest from stored locations"%(
+                    supplySnapped + demandSnapped, len(supplyKeys) + len(demandKeys))
+        supplyIndex, demandIndex, odMinutes = sfca_core.odArrays(supplyKeys, demandKeys,
+                                                                 lineSupply.astype(str),
+                                                                 lineDemand.astype(str),
+                                                                 lineMinutes)
+
+        arcpy.AddMessage("First Step: Applying weights...")
+        arcpy.SetProgressor("default", "First Step: Applying weights...")
+        timings.start("First Step: Applying weights")
+        timings.rows(len(odMinutes))
+        odWeights = weightFunction(odMinutes)
+        odLines = lambda: [(supplyIndex, demandIndex, odMinutes)]
+        odChunks = lambda: [(supplyIndex, demandIndex, odWeights)]
+
+    arcpy.AddMessage("First Step: Calculating scores...")
+    arcpy.SetProgressor("default", "First Step: Calculating scores...")
+    timings.start("First Step: Calculating scores")
+    if sparseEngine:
+        # W is built once; each step is then one sparse product
+        weightMatrix = sfca_sparse.weightMatrix(timings.countLines(odChunks()), len(supplyIDs),
+                                                len(demandIDs))
+        ratios = sfca_sparse.step1Ratios(weightMatrix, supplyVolume, demandVolume, supplyMultiplier)
+    else:
+        ratios = sfca_core.streamStep1Ratios(supplyVolume, demandVolume, timings.countLines(odChunks()),
+                                             supplyMultiplier)
+    timings.start("First Step: Writing scores")
+    timings.rows(len(supplyIDs))
+    # Step 1 scores go to a scratch copy of the supply points, not the input
+    step1Path = sfca_tables.scoredCopy(workingSupply, os.path.join(arcpy.env.scratchGDB, "step1Supply"),
+                                       inputSupplyID, supplyIDs, [step1Score], [ratios])
+
+    arcpy.AddMessage("Second Step: Calculating scores... ")
+    arcpy.SetProgressor("default", "Second Step: Calculating scores...")
+    timings.start("Second Step: Calculating scores")
+    scoreRatios = ratios
+    if categoryNames is not None:
+        # One row of ratios per category, all scored in the same pass
+        scoreRatios = sfca_categories.categoryRatios(ratios, supplyCategory, len(categoryNames))
+    if sparseEngine:
+        timings.rows(weightMatrix.nnz)
+        scores = sfca_sparse.step2Scores(weightMatrix, scoreRatios)
+    else:
+        scores = sfca_core.streamStep2Scores(scoreRatios, timings.countLines(odChunks()), len(demandIDs))
+    if stateFile:
+        # Keep the weighted lines so sfca_update can re-score changed points
+        arcpy.AddMessage("Saving run state...")
+        timings.start("Saving run state")
+        state = sfca_update.buildState(supplyKeys, supplyVolume, demandKeys, demandVolume,
+                                       *sfca_update.linesFromChunks(odChunks()),
+                                       multiplier=supplyMultiplier)
+        sfca_update.saveState(stateFile, state)
+    if odTable:
+        # Lines are resolved against the point arrays; only the result is written
+        arcpy.AddMessage("Writing O-D table...")
+        timings.start("Writing O-D table")
+        records = sfca_core.odRecords(supplyKeys, demandKeys, supplyVolume, demandVolume, ratios,
+                                      odLines(), weightFunction)
+        timings.rows(len(records))
+        sfca_tables.writeODTable(odTable, records)
+
+    if demandCellSize > 0:
+        # Every point takes the Step 2 score of its representative
+        scores = numpy.take(scores, clusters, axis=-1)
+        demandIDs = pointIDs
+
+    arcpy.AddMessage("Calculating SPAR...")
+    arcpy.SetProgressor("default", "Calculating SPAR...")
+    timings.start("Calculating SPAR")
+    timings.rows(len(demandIDs))
+    spar, avgSpai = sfca_core.sparScores(scores)
+    totalScores = scores.shape[-1]
+    totalSpar = spar.sum(axis=-1)
+    # Each category has a score & a SPAR field of its own
+    scoreFields = [(step2Score, sparField)]
+    if categoryNames is not None:
+        demandWorkspace = os.path.dirname(outputFC)
+        scoreFields = sfca_categories.categoryFields(categoryNames,
+                                                     lambda field: arcpy.ValidateFieldName(field, demandWorkspace))
+    if columnarOutput:
+        # Scores (and O-D lines) in a compact file that loads without a geodatabase
+        arcpy.AddMessage("Writing columnar output...")
+        timings.start("Writing columnar output")
+        timings.rows(len(demandIDs))
+        columnarPaths = sfca_output.writeColumnar(columnarOutput,
+                                                  sfca_output.scoreColumns(demandIDs, scores, spar, inputDemandID,
+                                                                           scoreFields),
+                                                  supplyKeys, demandKeys,
+                                                  odLines() if columnarLines else None)
+    if storeFolder:
+        # Lines indexed by supply & demand point for later queries & re-scoring
+        arcpy.AddMessage("Writing O-D store...")
+        timings.start("Writing O-D store")
+        od_store.buildStore(storeFolder, supplyKeys, demandKeys, timings.countLines(odLines()))
+    if solveInBatches:
+        shutil.rmtree(spillFolder, ignore_errors=True)
+
+    arcpy.AddMessage("Saving output features...")
+    arcpy.SetProgressor("default", "Saving output features...")
+    timings.start("Saving output features")
+    timings.rows(len(demandIDs))
+    # Copy demand to user-defined Output & add the scores to the copy
+    sfca_tables.scoredCopy(demandLayer, outputFC, inputDemandID, demandIDs,
+                           [field for fields in scoreFields for field in fields],
+                           [column for columns in zip(numpy.atleast_2d(scores), numpy.atleast_2d(spar))
+                            for column in columns])
+    timings.stop()
+    if timingsFile:
+        timings.writeSidecar(timingsFile)
+
+    file = open(report, "a")
+    file.write("O-D MATRIX:\n\n%s\n"%odSource)
+    file.write("Weights: %s\n"%weightNote)
+    file.write("Demand aggregation: %s\n"%aggregationNote)
+    file.write("Scoring engine: %s\n"%("Sparse weight matrix" if sparseEngine else "Streamed arrays"))
+    file.write("Supply categories: %s\n\n"%(sfca_categories.categoryNote(categoryNames, supplyCategory, scoreFields)
+                                             if categoryNames is not None else "Not used"))
+    meanSpar = totalSpar/totalScores
+    if categoryNames is None:
+        file.write("SCORES:\n\nMean E2SFCA Score: %s\n"%avgSpai)
+        deflatedAvgSpai = avgSpai/supplyMultiplier
+        file.write("Mean E2SFCA Score without multiplier: %s\n"%deflatedAvgSpai)
+        file.write("Mean Spatial Access Ratio (SPAR): %s "%meanSpar)
+    else:
+        file.write("SCORES:\n\n")
+        for name, categoryMean, categorySpar in zip(categoryNames, avgSpai, meanSpar):
+            file.write("%s:\nMean E2SFCA Score: %s\n"%(name, categoryMean))
+            file.write("Mean E2SFCA Score without multiplier: %s\n"%(categoryMean/supplyMultiplier))
+            file.write("Mean Spatial Access Ratio (SPAR): %s\n"%categorySpar)
+    file.write("(A mean SPAR of 1.0 indicates that the ratio was calculated correcctly)\n\n")
+    file.write("TIMINGS:\n\n%s\n\n"%timings.reportText())
+    file.write("OUTPUT:\n\nOutput points: %s\n"%outputFC)
+    file.write("Step 1 scores: %s\n"%step1Path)
+    file.write("O-D table: %s\n"%(odTable or "Not written"))
+    file.write("O-D store: %s\n"%(storeFolder or "Not written"))
+    file.write("Columnar output: %s\n\nReport end."%(", ".join(columnarPaths) if columnarOutput
+                                                      else "Not written"))
+    # CLose the file to save it
+    file.close()
+
+    # Check in the Network Analyst extension
+    arcpy.CheckInExtension("Network")
+
+    arcpy.ResetProgressor()
+
+    # End the function
+    summary = {"output": outputFC, "report": report, "meanScore": numpy.asarray(avgSpai).tolist(),
+               "meanSpar": numpy.asarray(meanSpar).tolist(), "odMatrix": odSource}
+    if categoryNames is not None:
+        # Means are listed in category order
+        summary["categories"] = categoryNames.tolist()
+    return summary
+
+# A function for solving the supply-to-demand O-D matrix
+def solveODMatrix(inputND, distLimit, workingSupply, inputSupplyID,
+                  workingDemand, inputDemandID):
+    '''Returns the Supply_ID, Demand_ID & Total_Minutes of every line'''
     # Impedance and accumulation are in minutes
     minutes = "Minutes"
     accumMinutes = "Total_Minutes"
@@ -193,33 +584,31 @@ def e2sfca():
     # Identify sub-layers
     sublayers = arcpy.na.GetNAClassNames(odLayer)
 
-    # Variables for easy use of Origins & Desintations & Lines layers
+    # Variables for easy use of Origins & Desintations layers
     originsLayer = sublayers["Origins"]
     destinationsLayer = sublayers["Destinations"]
-    linesLayer = sublayers["ODLines"]
 
-    # Add fields for joining data & calculations
+    # Fields for matching lines with the inputs
     supplyID = "Supply_ID"
     demandID = "Demand_ID"
-    textField = "TEXT"
 
     arcpy.AddMessage("Adding Locations...")
     arcpy.SetProgressor("default", "Adding Locations...")
     # Get location fields
-    candidateFieldsS = arcpy.ListFields(inputSupply)
-    candidateFieldsD = arcpy.ListFields(inputDemand)
+    candidateFieldsS = arcpy.ListFields(workingSupply)
+    candidateFieldsD = arcpy.ListFields(workingDemand)
     # Origins
-    arcpy.na.AddFieldToAnalysisLayer(odLayer, originsLayer, "Supply_ID", "TEXT", "", "", 200)
+    arcpy.na.AddFieldToAnalysisLayer(odLayer, originsLayer, supplyID, "TEXT", "", "", 200)
     oFieldmap = arcpy.na.NAClassFieldMappings(odLayer, originsLayer, True, candidateFieldsS)
-    oFieldmap["Supply_ID"].mappedFieldName = inputSupplyID
+    oFieldmap[supplyID].mappedFieldName = inputSupplyID
 
     # Add Locations for Origins
     arcpy.na.AddLocations(odLayer, originsLayer, workingSupply, oFieldmap, "")
 
     # Destinations
-    arcpy.na.AddFieldToAnalysisLayer(odLayer, destinationsLayer, "Demand_ID", "TEXT", "", "", 200)
+    arcpy.na.AddFieldToAnalysisLayer(odLayer, destinationsLayer, demandID, "TEXT", "", "", 200)
     dFieldmap = arcpy.na.NAClassFieldMappings(odLayer, destinationsLayer, True, candidateFieldsD)
-    dFieldmap["Demand_ID"].mappedFieldName = inputDemandID
+    dFieldmap[demandID].mappedFieldName = inputDemandID
 
     # Add locations for Destinations
     arcpy.na.AddLocations(odLayer, destinationsLayer, workingDemand, dFieldmap, "")
@@ -229,166 +618,59 @@ def e2sfca():
     # Solve
     arcpy.na.Solve(odLayer)
 
-    arcpy.AddMessage("Joining layers...")
-    arcpy.SetProgressor("default", "Joining layers...")
+    arcpy.AddMessage("Reading Origin-Destination Matrix...")
+    arcpy.SetProgressor("default", "Reading Origin-Destination Matrix...")
     # Dictionary for accessing to solved sublayers
     subLayers = dict((lyr.datasetName, lyr) for lyr in arcpy.mapping.ListLayers(odLayer)[1:])
     originsSubLayer = subLayers["Origins"]
     destinationsSubLayer = subLayers["Destinations"]
     linesSubLayer = subLayers["ODLines"]
 
-    # Fields to join to lines (travel time outcomes)
-    supplyFieldsJoin = [inputSupplyID, weightField, supplyVolumeField, weightedSupply]
-    demandFieldsJoin = [inputDemandID, demandVolumeField, weightedDemand]
-
-    # Join ID fields to the lines layer to allow joins from inputs
-    arcpy.JoinField_management(linesSubLayer, "OriginID", originsSubLayer, "ObjectID", "Supply_ID")
-    arcpy.JoinField_management(linesSubLayer, "DestinationID", destinationsSubLayer, "ObjectID", "Demand_ID")
-
-    # Use unique IDs to join fields for calculations based on travel times
-    arcpy.JoinField_management(linesSubLayer, "Supply_ID", workingSupply, inputSupplyID, supplyFieldsJoin)
-    arcpy.JoinField_management(linesSubLayer, "Demand_ID", workingDemand, inputDemandID, demandFieldsJoin)
-
-    arcpy.AddMessage("First Step: Applying weights...")
-    arcpy.SetProgressor("default", "First Step: Applying weights...")
-    # Using an update cursor to check & assign weights
-    weightWriter = arcpy.da.UpdateCursor(linesSubLayer, ["Total_Minutes", "Weight"])
-    for row in weightWriter:
-        if (0 < row[0] <= distance[0]) == True:
-            row[1] = weight1
-        elif (distance[0] < row[0] <= distance[1]) == True:
-            row[1] = weight2
-        elif (distance[1] < row[0] <= distance[2]) == True:
-            row[1] = weight3
-        else:
-            row[1] = 0
-        weightWriter.updateRow(row)
-    del row, weightWriter
-
-    # Using an update cursor to weight demand
-    demandWeighter = arcpy.da.UpdateCursor(linesSubLayer, [demandVolumeField,
-                                                            weightField,
-                                                            weightedDemand])
-    for row in demandWeighter:
-        row[2] = row[0] * row[1]
-        demandWeighter.updateRow(row)
-    del row, demandWeighter
-
-    arcpy.AddMessage("First Step: Calculating scores...")
-    arcpy.SetProgressor("default", "First Step: Calculating scores...")
-    # Using cursors to assigne a scor for Step 1
-    with arcpy.da.UpdateCursor(workingSupply, [inputSupplyID, supplyVolumeField, step1Score]) as scoreWriter:
-        for item in scoreWriter:
-            uniqueID = item[0]
-            with arcpy.da.SearchCursor(linesSubLayer, [supplyID, weightedDemand]) as popReader:
-                score = 0
-                for demand in popReader:
-                    if item[0] == demand[0]:
-                        score += demand[1]
-                        continue
-                    else:
-                        continue
-                item[2] = supplyMultiplier * (item[1]/score)
-                scoreWriter.updateRow(item)
-    del demand, popReader, item, scoreWriter, uniqueID
-
-    # Step 1 scores need to be joined to the lines table for more calculations
-    arcpy.JoinField_management(linesSubLayer, supplyID, workingSupply, inputSupplyID, step1Score)
-
-    arcpy.AddMessage("Second Step: Applying weights... ")
-    arcpy.SetProgressor("default", "Second Step: Applying weights...")
-    # Using an update cursor to weight Step 1 score
-    supplyWeighter = arcpy.da.UpdateCursor(linesSubLayer, [weightField, step1Score, weightedSupply])
-    for line in supplyWeighter:
-        line[2] = line[0] * line[1]
-        supplyWeighter.updateRow(line)
-    del line, supplyWeighter
-
-    arcpy.AddMessage("Second Step: Calculating scores... ")
-    arcpy.SetProgressor("default", "Second Step: Calculating scores...")
-    # Using cursors to assign a score for Step 2
-    with arcpy.da.UpdateCursor(workingDemand, [inputDemandID, step2Score]) as scoreUpdater:
-        for place in scoreUpdater:
-            uniqueID = place[0]
-            with arcpy.da.SearchCursor(linesSubLayer, [demandID, weightedSupply]) as scoreChecker:
-                score = 0
-                for supply in scoreChecker:
-                    if place[0] == supply[0]:
-                        score += supply[1]
-                        continue
-                    else:
-                        continue
-                place[1] = score
-                scoreUpdater.updateRow(place)
-    del supply, scoreChecker, place, scoreUpdater, uniqueID
-
-    arcpy.AddMessage("Calculating SPAR...")
-    arcpy.SetProgressor("default", "Calculating SPAR...")
-
-    # Replace NULL values with 0 scores
-    nullFinder = arcpy.da.UpdateCursor(workingDemand, [step2Score])
-    for value in nullFinder:
-        if value[0] == [None]:
-            value[1] = 0
-            nullFinder.updateRow(value)
-        else:
-            break
-    del value, nullFinder
-
-    # Find the average SPAI (e2sfca score)
-    totalSpai = 0
-    totalScores = 0
-    scoreAdder = arcpy.da.SearchCursor(workingDemand, [step2Score])
-    for row in scoreAdder:
-        totalSpai += row[0]
-        totalScores += 1
-    avgSpai = totalSpai/totalScores
-    del row, scoreAdder
-
-    # Use an update cursor to ratio individual scores to average (SPAR)
-    with arcpy.da.UpdateCursor(workingDemand, [step2Score, sparField]) as sparWriter:
-        totalSpar = 0
-        for row in sparWriter:
-            row[1] = row[0]/avgSpai
-            totalSpar += row[1]
-            sparWriter.updateRow(row)
-    del row, sparWriter
-
-    arcpy.AddMessage("Saving output features...")
-    arcpy.SetProgressor("default", "Saving output features...")
-    # Copy working layer to user-defined Output
-    arcpy.CopyFeatures_management(workingDemand, outputFC)
-
-    file = open(report, "a")
-    file.write("SCORES:\n\nMean E2SFCA Score: %s\n"%avgSpai)
-    deflatedAvgSpai = avgSpai/supplyMultiplier
-    file.write("Mean E2SFCA Score without multiplier: %s\n"%deflatedAvgSpai)
-    meanSpar = totalSpar/totalScores
-    file.write("Mean Spatial Access Ratio (SPAR): %s "%meanSpar)
-    file.write("(A mean SPAR of 1.0 indicates that the ratio was calculated correcctly)\n\n")
-    file.write("OUTPUT:\n\nOutput points: %s\n\nReport end."%outputFC)
-    # CLose the file to save it
-    file.close()
-
-    # Check in the Network Analyst extension
-    arcpy.CheckInExtension("Network")
-
-    arcpy.ResetProgressor()
-
-    # End the function
-    return
-
-# A function for calculating weights
-def gaussianWeights(catch,coefficient):
-    '''Weights may be an approximation'''
-    weight = numpy.exp(-numpy.power(catch, 2.0)/coefficient)
-    return weight
-
-# A function for finding the coefficient, if necessary.
-def gaussianSolve(catch,targetWeight):
-    '''Coefficient may be an approximation'''
-    coefficient = -numpy.power(catch, 2.0)/numpy.log(targetWeight)
-    return coefficient
+    # Lines are matched with the inputs in memory, through the IDs each
+    # location was loaded with, rather than by joining tables
+    originOIDs, originIDs = readColumns(originsSubLayer, ["OID@", supplyID])
+    destinationOIDs, destinationIDs = readColumns(destinationsSubLayer, ["OID@", demandID])
+    lineOrigins, lineDestinations, lineMinutes = readColumns(linesSubLayer, ["OriginID", "DestinationID",
+                                                                            accumMinutes])
+    # Release the analysis layer
+    arcpy.Delete_management(odLayer)
+    originIndex = sfca_core.mapIndex(originOIDs, lineOrigins)
+    destinationIndex = sfca_core.mapIndex(destinationOIDs, lineDestinations)
+    found = (originIndex >= 0) & (destinationIndex >= 0)
+    return (originIDs[originIndex[found]], destinationIDs[destinationIndex[found]],
+            lineMinutes[found])
+
+# A function for solving the O-D matrix one batch of supply points at a time
+def solveODBatches(tasks, workers):
+    '''Yields the supply ObjectIDs, demand ObjectIDs & Total_Minutes of each
+    task made by od_parallel.networkAnalystTasks(); batches are shared among
+    worker processes'''
+    for task, lines in zip(tasks, od_parallel.solveParallel(od_parallel.networkAnalystSolver,
+                                                            tasks, workers)):
+        arcpy.AddMessage("Origin batch %s of %s solved..."%(task["batch"] + 1, len(tasks)))
+        yield lines
+
+# A function for reading table fields into arrays
+def readColumns(table, fields, spatialReference=None):
+    '''NULL values are read as 0; geometry is projected to spatialReference
+    if one is given'''
+    rows = [tuple(0 if value is None else value for value in row)
+            for row in arcpy.da.SearchCursor(table, fields, spatial_reference=spatialReference)]
+    if not rows:
+        return [numpy.array([]) for field in fields]
+    return [numpy.array(column) for column in zip(*rows)]
+
+# A function for reading IDs, volumes & coordinates of a point layer
+def readPoints(points, idField, volumeOpt, volumeField, volumeValue, spatialReference=None):
+    '''Constant volumes are applied in memory, not written to the input;
+    coordinates are in spatialReference if one is given'''
+    if volumeOpt == "Constant volume value":
+        ids, xs, ys = readColumns(points, [idField, "SHAPE@X", "SHAPE@Y"], spatialReference)
+        volume = numpy.full(len(ids), volumeValue)
+    else:
+        ids, volume, xs, ys = readColumns(points, [idField, volumeField,
+                                                   "SHAPE@X", "SHAPE@Y"], spatialReference)
+    return ids, volume, xs, ys
 
 # A standard python protocol to check before running the module's main funcion.
 if __name__ == '__main__':
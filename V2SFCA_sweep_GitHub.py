@@ -0,0 +1,279 @@
+'''-----------------------------------------------------------------------------
+# Name:        V2SFCA_Sweep_Version_1.0
+# Purpose:     Score many V2SFCA distance/coefficient settings in one run,
+#              against a single Origin-Destination matrix
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Every combination of the distance thresholds and coefficients (or target
+# weights) is a scenario. The O-D matrices are solved once at the largest
+# threshold and all scenarios are scored together as 2-D arrays
+# (scenario x O-D line) by sfca_core.
+
+# Import necessary modules
+import shutil
+import tempfile
+import numpy
+import arcpy
+from arcpy import env
+import sfca_core_GitHub as sfca_core
+import od_cache_GitHub as od_cache
+import sfca_timing_GitHub as sfca_timing
+import sfca_output_GitHub as sfca_output
+from V2SFCA_v1_GitHub import readPoints, weightedMatrix, matrixIsSymmetric
+env.overwriteOutput = True
+
+# Global variables that will appear in multiple functions
+minutes = "Minutes"
+
+# A function for building the scenario grid
+def scenarioGrid(distances, coeffOrWeight, coefficients, targetWeights):
+    '''Returns parallel arrays of distances & coefficients, one per scenario'''
+    gridDistance = []
+    gridCoefficient = []
+    for dist in sorted(set(float(value) for value in distances)):
+        if coeffOrWeight == "Use target weight":
+            values = [sfca_core.gaussianSolve(dist, float(weight)) for weight in targetWeights]
+        else:
+            values = [float(value) for value in coefficients]
+        for coefficient in values:
+            gridDistance.append(dist)
+            gridCoefficient.append(coefficient)
+    return numpy.array(gridDistance), numpy.array(gridCoefficient)
+
+# A function for checking the scenario parameters
+def scenarioErrors(distances, coeffOrWeight, coefficients, targetWeights):
+    '''Returns a message for each problem; none means the grid can be built'''
+    errors = []
+    if not distances:
+        errors.append("At least one distance is needed.")
+    elif min(float(value) for value in distances) <= 0:
+        errors.append("Distances must be greater than 0.")
+    if coeffOrWeight == "Use target weight":
+        if not targetWeights:
+            errors.append("At least one target weight is needed.")
+        elif not all(0 < float(weight) < 1 for weight in targetWeights):
+            errors.append("Target weights must be between 0 and 1 (exclusive).")
+    else:
+        if not coefficients:
+            errors.append("At least one coefficient is needed.")
+        elif min(float(value) for value in coefficients) <= 0:
+            errors.append("Coefficients must be greater than 0.")
+    return errors
+
+# Main function
+def v2sfcaSweep():
+    # Parameters retrieved as variables
+    arcpy.AddMessage("Retrieving paramters...")
+    # Network Dataset - REQUIRED
+    inputND = arcpy.GetParameterAsText(0)
+    # Supply(Resource) Points - REQUIRED
+    inputSupply = arcpy.GetParameterAsText(1)
+    # Volume of Supply (e.g. beds per hospital) - REQUIRED
+    supplyVolumeOpt = arcpy.GetParameterAsText(2)    #Choice
+    supplyVolumeField = arcpy.GetParameterAsText(3)    #Field
+    supplyVolumeValue = float(arcpy.GetParameter(4))    #Class value
+    # Demand (Population) Points - REQUIRED
+    inputDemand = arcpy.GetParameterAsText(5)
+    # Volume of Demand (e.g. population)
+    demandVolumeOpt = arcpy.GetParameterAsText(6)    #Choice
+    demandVolumeField = arcpy.GetParameterAsText(7)    #Field
+    demandVolumeValue = float(arcpy.GetParameter(8))    #Class value
+    # Distance thresholds - REQUIRED
+    distances = arcpy.GetParameter(9)    # Returns a list
+    #Use coefficients or calculate them based on weights
+    coeffOrWeight = arcpy.GetParameterAsText(10)    #Choice
+    coefficients = arcpy.GetParameter(11)    #Coefficient values (list)
+    targetWeights = arcpy.GetParameter(12)    #Target weight values (list)
+    #Output table
+    outputTable = arcpy.GetParameterAsText(13)
+    #Output layout: "One column per scenario" or "Long table"
+    outputLayout = arcpy.GetParameterAsText(14)
+    #Output report
+    report = arcpy.GetParameterAsText(15)
+    #Folder for cached O-D matrices - OPTIONAL
+    cacheFolder = arcpy.GetParameterAsText(16)
+    #Reuse the first matrix for the second step - OPTIONAL
+    reuseMatrix = bool(arcpy.GetParameter(17))
+    #Origins per O-D batch (0 solves each matrix at once) - OPTIONAL
+    batchSize = int(arcpy.GetParameter(18) or 0)
+    #Worker processes solving O-D batches in parallel - OPTIONAL
+    workers = int(arcpy.GetParameter(19) or 1)
+    #Local road network (CSV edge list or lines) used instead of the Network Dataset - OPTIONAL
+    localNetwork = arcpy.GetParameterAsText(20)
+    #Travel time field of the road lines - OPTIONAL
+    localMinutesField = arcpy.GetParameterAsText(21)
+    #Maximum network speed (map units per minute) for skipping pairs out of reach - OPTIONAL
+    maxSpeed = float(arcpy.GetParameter(22) or 0)
+    #Stage timings sidecar (.json or .csv) - OPTIONAL
+    timingsFile = arcpy.GetParameterAsText(23)
+    #Columnar output of every scenario's scores (.npz, .arrow or .parquet) - OPTIONAL
+    columnarOutput = arcpy.GetParameterAsText(24)
+    #Add the first step O-D lines to the columnar output - OPTIONAL
+    columnarLines = bool(arcpy.GetParameter(25))
+    #Solve the local road network on a contraction hierarchy kept in the cache folder - OPTIONAL
+    localHierarchy = bool(arcpy.GetParameter(26))
+
+    # Wall time, CPU time, memory & rows of each stage
+    timings = sfca_timing.StageTimings()
+
+    # Build the scenarios; the matrices are solved at the widest catchment
+    errors = scenarioErrors(distances, coeffOrWeight, coefficients, targetWeights)
+    if errors:
+        for error in errors:
+            arcpy.AddError(error)
+        return
+    gridDistance, gridCoefficient = scenarioGrid(distances, coeffOrWeight,
+                                                 coefficients, targetWeights)
+    maxDistance = gridDistance.max()
+    arcpy.AddMessage("%s scenarios..."%len(gridDistance))
+
+    # Read inputs into arrays, keyed by the text of each ObjectID
+    arcpy.AddMessage("Preparing input features...")
+    timings.start("Preparing input features")
+    supplyOID = arcpy.Describe(inputSupply).OIDFieldName
+    demandOID = arcpy.Describe(inputDemand).OIDFieldName
+    supplyIDs, supplyVolume, supplyX, supplyY = readPoints(inputSupply, supplyOID, supplyVolumeOpt,
+                                                           supplyVolumeField, supplyVolumeValue)
+    demandIDs, demandVolume, demandX, demandY = readPoints(inputDemand, demandOID, demandVolumeOpt,
+                                                           demandVolumeField, demandVolumeValue)
+    demandOIDs = demandIDs.astype(numpy.int32)
+    supplyIDs = supplyIDs.astype(str)
+    demandIDs = demandIDs.astype(str)
+    timings.rows(len(supplyIDs) + len(demandIDs))
+
+    # Cache keys cover everything a solve depends on, including its direction
+    if localNetwork:
+        networkSig = od_cache.cacheKey([od_cache.networkSignature(localNetwork), localMinutesField])
+    else:
+        networkSig = od_cache.networkSignature(inputND)
+    supplySig = od_cache.pointsSignature(supplyIDs, supplyX, supplyY)
+    demandSig = od_cache.pointsSignature(demandIDs, demandX, demandY)
+
+    step1Key = od_cache.cacheKey([networkSig, minutes, maxDistance, supplySig, demandSig])
+    step2Key = od_cache.cacheKey([networkSig, minutes, maxDistance, demandSig, supplySig])
+
+    # Batched matrices are spilled to scratch until both steps are scored
+    spillFolder = ""
+    if batchSize > 0 or workers > 1:
+        spillFolder = tempfile.mkdtemp(prefix="v2sweep_", dir=arcpy.env.scratchFolder)
+    # One contraction hierarchy serves every scenario & later sweeps
+    hierarchyFolder = (cacheFolder or arcpy.env.scratchFolder) if localHierarchy else ""
+
+    # Step 1 (origins are supply, destinations demand)
+    timings.start("First Origin-Destination Matrix")
+    step1Chunks, step1Lines, firstMatrix = weightedMatrix(inputND, "step1NALayer", gridDistance,
+                                                          gridCoefficient, inputSupply, inputDemand,
+                                                          supplyIDs, demandIDs, True, cacheFolder,
+                                                          step1Key, batchSize, spillFolder, "first",
+                                                          workers, localNetwork, localMinutesField,
+                                                          maxSpeed, hierarchyFolder=hierarchyFolder)
+
+    arcpy.AddMessage("First Step: Calculating scores...")
+    timings.start("First Step: Calculating scores")
+    ratios = sfca_core.streamStep1Ratios(supplyVolume, demandVolume, timings.countLines(step1Chunks()))
+
+    # Second step (origins are demand, destinations supply)
+    if reuseMatrix and matrixIsSymmetric(inputND, localNetwork, localMinutesField):
+        arcpy.AddMessage("Reusing First Origin-Destination Matrix...")
+        secondMatrix = "Reused first matrix"
+        step2Chunks = step1Chunks
+    else:
+        if reuseMatrix:
+            arcpy.AddWarning("The network has turns, restrictions or one-way roads; the second matrix will be solved.")
+        timings.start("Second Origin-Destination Matrix")
+        step2Chunks, _, secondMatrix = weightedMatrix(inputND, "step2NALayer", gridDistance,
+                                                      gridCoefficient, inputDemand, inputSupply,
+                                                      supplyIDs, demandIDs, False, cacheFolder,
+                                                      step2Key, batchSize, spillFolder, "second",
+                                                      workers, localNetwork, localMinutesField,
+                                                      maxSpeed, hierarchyFolder=hierarchyFolder)
+
+    arcpy.AddMessage("Second Step: Calculating scores... ")
+    timings.start("Second Step: Calculating scores")
+    scores = sfca_core.streamStep2Scores(ratios, timings.countLines(step2Chunks()), len(demandIDs))
+
+    arcpy.AddMessage("Calculating SPAR...")
+    timings.start("Calculating SPAR")
+    timings.rows(scores.size)
+    spar, avgSpai = sfca_core.sparScores(scores)
+    if columnarOutput:
+        # One score & SPAR column per scenario, in a file that loads without a geodatabase
+        arcpy.AddMessage("Writing columnar output...")
+        timings.start("Writing columnar output")
+        timings.rows(len(demandIDs))
+        columnarPaths = sfca_output.writeColumnar(columnarOutput,
+                                                  sfca_output.scoreColumns(demandOIDs, scores, spar,
+                                                                           "Demand_OID"),
+                                                  supplyIDs, demandIDs,
+                                                  step1Lines() if columnarLines else None)
+    if spillFolder:
+        shutil.rmtree(spillFolder, ignore_errors=True)
+
+    # Write every scenario in one bulk operation
+    arcpy.AddMessage("Saving output table...")
+    timings.start("Saving output table")
+    scenarioCount = len(gridDistance)
+    if outputLayout == "Long table":
+        output = numpy.zeros(scenarioCount * len(demandIDs),
+                             dtype=[("Demand_OID", numpy.int32), ("Scenario", numpy.int32),
+                                    ("Distance", numpy.float64), ("Coeff", numpy.float64),
+                                    ("Step2_Score", numpy.float64), ("SPAR", numpy.float64)])
+        output["Demand_OID"] = numpy.tile(demandOIDs, scenarioCount)
+        output["Scenario"] = numpy.repeat(numpy.arange(1, scenarioCount + 1), len(demandIDs))
+        output["Distance"] = numpy.repeat(gridDistance, len(demandIDs))
+        output["Coeff"] = numpy.repeat(gridCoefficient, len(demandIDs))
+        output["Step2_Score"] = scores.ravel()
+        output["SPAR"] = spar.ravel()
+    else:
+        fields = [("Demand_OID", numpy.int32)]
+        for scenario in range(1, scenarioCount + 1):
+            fields.append(("S%s_Score"%scenario, numpy.float64))
+            fields.append(("S%s_SPAR"%scenario, numpy.float64))
+        output = numpy.zeros(len(demandIDs), dtype=fields)
+        output["Demand_OID"] = demandOIDs
+        for scenario in range(scenarioCount):
+            output["S%s_Score"%(scenario + 1)] = scores[scenario]
+            output["S%s_SPAR"%(scenario + 1)] = spar[scenario]
+    timings.rows(len(output))
+    arcpy.da.NumPyArrayToTable(output, outputTable)
+    timings.stop()
+    if timingsFile:
+        timings.writeSidecar(timingsFile)
+
+    # Begin generating report (try/except since report is optional):
+    arcpy.AddMessage("Writing output report...")
+    try:
+        file = open(report, "w")
+        file.write("V2SFCA Sweep Report\n\nINPUTS:\n\n")
+        file.write("Network Dataset: %s\n"%inputND)
+        file.write("Local road network: %s\n\n"%(localNetwork or "Not used"))
+        file.write("Supply:\nPoints: %s\n"%inputSupply)
+        file.write("Volume: %s\nField: %s\nValue: %s\n"%(supplyVolumeOpt, supplyVolumeField, supplyVolumeValue))
+        file.write("Demand:\nPoints: %s\n"%inputDemand)
+        file.write("Volume: %s\nField: %s\nValue: %s"%(demandVolumeOpt, demandVolumeField, demandVolumeValue))
+        file.write("\n\nSCENARIOS:\n\n")
+        file.write("Coefficient or Target Weight: %s\n"%coeffOrWeight)
+        file.write("Matrices solved at: %s\n"%maxDistance)
+        file.write("First step matrix: %s\n"%firstMatrix)
+        file.write("Second step matrix: %s\n\n"%secondMatrix)
+        for scenario in range(scenarioCount):
+            file.write("Scenario %s: threshold %s, coefficient %s, mean V2SFCA score %s\n"%(
+                scenario + 1, gridDistance[scenario], gridCoefficient[scenario], avgSpai[scenario]))
+        file.write("\nTIMINGS:\n\n%s\n"%timings.reportText())
+        file.write("\nOUTPUT:\n\nOutput table (%s): %s\n"%(outputLayout, outputTable))
+        file.write("Columnar output: %s\n\nReport end."%(", ".join(columnarPaths) if columnarOutput
+                                                          else "Not written"))
+        # CLose the file to save it
+        file.close()
+    except:
+        pass
+
+    # End the function
+    return
+
+# A standard python protocol to check before running the module's main funcion.
+if __name__ == '__main__':
+    v2sfcaSweep()
@@ -51,9 +51,40 @@ class ToolValidator(object):
     else:
         self.params[11].enabled = False
         self.params[12].enabled = False
+
+    # A local road network is solved whole, with its own travel time field
+    localNetwork = bool(self.params[19].value)
+    self.params[17].enabled = not localNetwork
+    self.params[18].enabled = not localNetwork
+    self.params[20].enabled = localNetwork
+
+    # O-D lines go to a columnar file only with the scores
+    self.params[29].enabled = bool(self.params[28].value)
+
+    # Stored network locations are for Network Analyst only
+    self.params[31].enabled = not localNetwork
+
+    # A contraction hierarchy is built for a local road network only
+    self.params[32].enabled = localNetwork
+
+    # Clusters are checked by travel time on a local road network only
+    self.params[37].enabled = bool(self.params[33].value) and localNetwork
+
+    # The tile queue & its workers are only used in tiled runs
+    tiled = bool(self.params[34].value)
+    self.params[35].enabled = tiled
+    self.params[36].enabled = tiled
     return
 
   def updateMessages(self):
     """Modify the messages created by internal validation for each tool
     parameter.  This method is called after internal validation."""
+    # The maximum speed bounds the halo of demand points each tile needs
+    if self.params[34].value and not self.params[21].value:
+        self.params[34].setErrorMessage("Tiled runs need a maximum speed.")
+    for index in (17, 21, 27, 33, 34, 36, 37):
+        if self.params[index].value and self.params[index].value < 0:
+            self.params[index].setErrorMessage("The value cannot be negative.")
+    if self.params[18].value and self.params[18].value < 1:
+        self.params[18].setErrorMessage("At least one worker is needed.")
     return
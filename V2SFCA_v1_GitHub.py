@@ -7,9 +7,29 @@
 #----------------------------------------------------------------------------'''
 
 # Import necessary modules
+import os
+import shutil
+import tempfile
 import numpy
 import arcpy
 from arcpy import env
+import sfca_core_GitHub as sfca_core
+import od_cache_GitHub as od_cache
+import od_parallel_GitHub as od_parallel
+import od_network_GitHub as od_network
+import od_graph_GitHub as od_graph
+import od_prefilter_GitHub as od_prefilter
+import sfca_update_GitHub as sfca_update
+import sfca_timing_GitHub as sfca_timing
+import sfca_sparse_GitHub as sfca_sparse
+import sfca_decay_GitHub as sfca_decay
+import sfca_output_GitHub as sfca_output
+import od_store_GitHub as od_store
+import od_locations_GitHub as od_locations
+import od_hierarchy_GitHub as od_hierarchy
+import sfca_aggregate_GitHub as sfca_aggregate
+import sfca_tiles_GitHub as sfca_tiles
+import sfca_tables_GitHub as sfca_tables
 env.overwriteOutput = True
 
 # Check for & check out extension (except if license is unavailable)
@@ -19,55 +39,194 @@ try:
     else:
         raise Exception
 except:
-    arcpy.AddError("Network Analyst License is unavailable.")
+    arcpy.AddWarning("Network Analyst License is unavailable; only a local road network can be used.")
 
 # Global variables that will appear in multiple functions
-accumMinutes = "Total_Minutes"
-weightField = "Weight"
-doubleType = "DOUBLE"
-minutes = "Minutes"
-
-# A function for calculating weights
-def gaussianWeights(dist,coefficient):
-    '''Weights may be an approximation'''
-    weight = numpy.exp(-numpy.power(dist, 2.0)/coefficient)
-    return weight
-
-# A function for finding the coefficient, if necessary.
-def gaussianSolve(dist,targetWeight):
-    '''Coefficient may be an approximation'''
-    coefficient = -numpy.power(dist, 2.0)/numpy.log(targetWeight)
-    return coefficient
-
-# A function for updating weight values after each step
-def writeWeights(ODMatrixTable, distance, coefficient):
-    with arcpy.da.UpdateCursor(ODMatrixTable, [accumMinutes,
-                                weightField]) as weightWriter:
-        for row in weightWriter:
-            if (0 < row[0] <= distance) == True:
-                row[1] = gaussianWeights(row[0], coefficient)
-            else:
-                row[1] = 0
-            weightWriter.updateRow(row)
-    return
-
-# A function for applying weights to volume values
-def applyWeights(ODMatrixTable, inField, outField):
-    with arcpy.da.UpdateCursor(ODMatrixTable, [inField, weightField,
-                                outField]) as weightApplier:
-        for row in weightApplier:
-            row[2] = row[0] * row[1]
-            weightApplier.updateRow(row)
-    return
-
-# A function for implementing the user's choice for volume
-def writeVolume(inTable, newField, volumeValue):
-    arcpy.AddField_management(inTable, newField, "DOUBLE")
-    with arcpy.da.UpdateCursor(inTable, newField) as volumeCursor:
-        for row in volumeCursor:
-            row[0] = volumeValue
-            volumeCursor.updateRow(row)
-    return newField
+minutes = od_network.minutes
+
+# A function for reading table fields into arrays
+def readColumns(table, fields):
+    '''NULL values are read as 0'''
+    rows = [tuple(0 if value is None else value for value in row)
+            for row in arcpy.da.SearchCursor(table, fields)]
+    if not rows:
+        return [numpy.array([]) for field in fields]
+    return [numpy.array(column) for column in zip(*rows)]
+
+# A function for reading IDs, volumes & coordinates of a point layer
+def readPoints(points, idField, volumeOpt, volumeField, volumeValue):
+    '''Constant volumes are applied in memory, not written to the input'''
+    if volumeOpt == "Constant volume value":
+        ids, xs, ys = readColumns(points, [idField, "SHAPE@X", "SHAPE@Y"])
+        volume = numpy.full(len(ids), volumeValue)
+    else:
+        ids, volume, xs, ys = readColumns(points, [idField, volumeField,
+                                                   "SHAPE@X", "SHAPE@Y"])
+    return ids, volume, xs, ys
+
+# A function for solving an O-D matrix one batch of origins at a time
+def solveODBatches(tasks, workers):
+    '''Yields OriginID, DestinationID & Total_Minutes of each task made by
+    od_parallel.networkAnalystTasks(), with the IDs translated to input
+    ObjectIDs. Batches are shared among worker processes.'''
+    for task, lines in zip(tasks, od_parallel.solveParallel(od_parallel.networkAnalystSolver,
+                                                            tasks, workers)):
+        arcpy.AddMessage("Origin batch %s of %s solved..."%(task["batch"] + 1, len(tasks)))
+        yield lines
+
+# A function for solving an O-D matrix on a local road network
+def solveLocalMatrix(localNetwork, localMinutesField, distance, originPoints,
+                     destinationPoints, maxSpeed=0, hierarchyFolder=""):
+    '''Returns origin & destination ObjectIDs, Total_Minutes, the longest
+    distance a point was snapped to the network & a note on pruned pairs.
+    With a hierarchy folder the matrix is solved on the network's
+    contraction hierarchy, built there the first time.'''
+    network = od_graph.loadNetwork(localNetwork, localMinutesField or "minutes")
+    solver = None
+    if hierarchyFolder:
+        solver = od_hierarchy.hierarchySolver(od_hierarchy.networkHierarchy(localNetwork, localMinutesField,
+                                                                            hierarchyFolder))
+    originOIDs, originX, originY = readColumns(originPoints, ["OID@", "SHAPE@X", "SHAPE@Y"])
+    destOIDs, destX, destY = readColumns(destinationPoints, ["OID@", "SHAPE@X", "SHAPE@Y"])
+    pruned = ""
+    if maxSpeed > 0:
+        # Points with nothing in straight-line reach are not searched from
+        originMask, destMask = od_prefilter.reachableMasks(originX, originY, destX, destY,
+                                                           od_prefilter.reachRadius(distance, maxSpeed))
+        pruned = od_prefilter.prunedNote(*od_prefilter.prunedPairs(originMask, destMask))
+        originOIDs, originX, originY = originOIDs[originMask], originX[originMask], originY[originMask]
+        destOIDs, destX, destY = destOIDs[destMask], destX[destMask], destY[destMask]
+    originIndex, destIndex, lineMinutes, longestSnap = od_graph.solvePoints(network, originX, originY,
+                                                                            destX, destY, distance, solver)
+    return [originOIDs[originIndex], destOIDs[destIndex], lineMinutes], longestSnap, pruned
+
+# A function for matching O-D lines with the supply & demand arrays
+def matchLines(lines, supplyKeys, demandKeys, originsAreSupply):
+    '''Returns supplyIndex, demandIndex & minutes'''
+    lineOrigin, lineDest, lineMinutes = lines
+    if originsAreSupply:
+        return sfca_core.odArrays(supplyKeys, demandKeys, lineOrigin.astype(str),
+                                  lineDest.astype(str), lineMinutes)
+    return sfca_core.odArrays(supplyKeys, demandKeys, lineDest.astype(str),
+                              lineOrigin.astype(str), lineMinutes)
+
+# A function for the weighted lines of one O-D matrix, either solved whole
+# (and cached) or solved in origin batches that are spilled to disk
+def weightedMatrix(networkDataset, layerName, distance, coefficient, originPoints,
+                   destinationPoints, supplyKeys, demandKeys, originsAreSupply,
+                   cacheFolder, cacheKey, batchSize, spillFolder, ordinal, workers=1,
+                   localNetwork="", localMinutesField="", maxSpeed=0, decay=None,
+                   resolution=0, locationFolder="", hierarchyFolder=""):
+    '''Returns a function giving fresh (supplyIndex, demandIndex, weights)
+    chunks, one giving the same chunks with minutes in place of weights,
+    and a note on how the matrix was made. Lists of distances &
+    coefficients weight every scenario; the matrix is solved at the largest
+    distance. More than one worker always solves in batches. A local road
+    network replaces Network Analyst and is solved whole. A maximum speed
+    keeps pairs out of straight-line reach out of the solve. decay replaces
+    the Gaussian (see sfca_decay); a resolution weights times from a lookup
+    table. A location folder keeps the network locations of the points of
+    a whole Network Analyst solve (see od_locations); a hierarchy folder
+    keeps the contraction hierarchy a local road network is solved on (see
+    od_hierarchy).'''
+    weightFunction = lambda odMinutes: sfca_core.continuousWeights(odMinutes, distance, coefficient,
+                                                                   decay)
+    if resolution > 0:
+        weightFunction = sfca_decay.quantizedWeights(weightFunction, distance, resolution)[0]
+    solveDistance = float(numpy.max(distance))
+    if (batchSize > 0 or workers > 1) and not localNetwork:
+        arcpy.AddMessage("Creating %s Origin-Destination Matrix in batches..."%ordinal)
+        tasks, skippedPairs, totalPairs = od_parallel.networkAnalystTasks(networkDataset, solveDistance,
+                                                                          originPoints, destinationPoints,
+                                                                          batchSize, workers,
+                                                                          spillFolder, maxSpeed)
+        odBatches = (matchLines(lines, supplyKeys, demandKeys, originsAreSupply)
+                     for lines in solveODBatches(tasks, workers))
+        # Minutes are spilled & weighted as they are read back
+        chunkPaths = od_cache.spillChunks(odBatches, tempfile.mkdtemp(dir=spillFolder))
+        note = "Solved in %s batches (%s workers)"%(len(chunkPaths), max(workers, 1))
+        if maxSpeed > 0:
+            note += "; %s"%od_prefilter.prunedNote(skippedPairs, totalPairs)
+        lineChunks = lambda: od_cache.spilledChunks(chunkPaths)
+        return (lambda: sfca_core.weightChunks(lineChunks(), weightFunction)), lineChunks, note
+
+    lines = od_cache.loadMatrix(cacheFolder, cacheKey)
+    if lines is not None:
+        arcpy.AddMessage("Loading cached %s Origin-Destination Matrix..."%ordinal)
+        note = "Loaded from cache (%s)"%cacheKey
+    elif localNetwork:
+        arcpy.AddMessage("Creating %s Origin-Destination Matrix on the local road network..."%ordinal)
+        lines, longestSnap, pruned = solveLocalMatrix(localNetwork, localMinutesField, solveDistance,
+                                                      originPoints, destinationPoints, maxSpeed,
+                                                      hierarchyFolder)
+        note = "Solved on the local road network%s (longest snap: %s)"%(
+            " on its contraction hierarchy" if hierarchyFolder else "", longestSnap)
+        if pruned:
+            note += "; %s"%pruned
+        if od_cache.saveMatrix(cacheFolder, cacheKey, *lines):
+            note += ", cached (%s)"%cacheKey
+    elif maxSpeed > 0:
+        # One task, solved here, holding only the points within reach
+        arcpy.AddMessage("Creating %s Origin-Destination Matrix..."%ordinal)
+        tasks, skippedPairs, totalPairs = od_parallel.networkAnalystTasks(networkDataset, solveDistance,
+                                                                          originPoints, destinationPoints,
+                                                                          0, 1, arcpy.env.scratchFolder,
+                                                                          maxSpeed)
+        batches = list(solveODBatches(tasks, 1))
+        if batches:
+            lines = [numpy.concatenate(column) for column in zip(*batches)]
+        else:
+            lines = [numpy.zeros(0), numpy.zeros(0), numpy.zeros(0)]
+        note = "Solved; %s"%od_prefilter.prunedNote(skippedPairs, totalPairs)
+        if od_cache.saveMatrix(cacheFolder, cacheKey, *lines):
+            note += ", cached (%s)"%cacheKey
+    else:
+        arcpy.AddMessage("Creating %s Origin-Destination Matrix..."%ordinal)
+        if locationFolder:
+            # Only new or moved points are snapped; the copies hold the input
+            # ObjectIDs in Input_OID, which od_network.solveODMatrix() matches lines on
+            arcpy.AddMessage("Loading snapped network locations...")
+            originPoints, originsSnapped = od_locations.locatedPoints(originPoints, "OID@", networkDataset,
+                                                                      locationFolder, layerName + "Origins")
+            destinationPoints, destinationsSnapped = od_locations.locatedPoints(destinationPoints, "OID@",
+                                                                                networkDataset, locationFolder,
+                                                                                layerName + "Destinations")
+        lines = od_network.solveODMatrix(networkDataset, layerName, solveDistance, originPoints,
+                                         destinationPoints, ordinal)
+        if od_cache.saveMatrix(cacheFolder, cacheKey, *lines):
+            note = "Solved & cached (%s)"%cacheKey
+        else:
+            note = "Solved"
+        if locationFolder:
+            note += "; %s points snapped, the rest from stored locations"%(originsSnapped +
+                                                                           destinationsSnapped)
+    supplyIndex, demandIndex, odMinutes = matchLines(lines, supplyKeys, demandKeys,
+                                                     originsAreSupply)
+    arcpy.AddMessage("%s Step: Applying weights..."%ordinal.capitalize())
+    odWeights = weightFunction(odMinutes)
+    return ((lambda: [(supplyIndex, demandIndex, odWeights)]),
+            (lambda: [(supplyIndex, demandIndex, odMinutes)]), note)
+
+# A function for checking whether travel times can differ by direction
+def networkIsSymmetric(networkDataset):
+    '''Turn sources & default restrictions (e.g. one-way) make the network
+    asymmetric. Direction-specific costs are not detected.'''
+    desc = arcpy.Describe(networkDataset)
+    for source in desc.sources:
+        if "Turn" in source.sourceType:
+            return False
+    for attribute in desc.attributes:
+        if attribute.usageType == "Restriction" and attribute.useByDefault:
+            return False
+    return True
+
+# A function for checking the network the matrices are solved on
+def matrixIsSymmetric(networkDataset, localNetwork, localMinutesField):
+    '''A local road network is asymmetric if it has one-way edges'''
+    if localNetwork:
+        graph = od_graph.loadNetwork(localNetwork, localMinutesField or "minutes")[0]
+        return od_graph.graphIsSymmetric(graph)
+    return networkIsSymmetric(networkDataset)
 
 # Main function
 def v2sfca():
@@ -97,244 +256,367 @@ def v2sfca():
     outputFC = arcpy.GetParameterAsText(13)
     #Output report
     report = arcpy.GetParameterAsText(14)
+    #Reuse the first matrix for the second step - OPTIONAL
+    reuseMatrix = bool(arcpy.GetParameter(15))
+    #Folder for cached O-D matrices - OPTIONAL
+    cacheFolder = arcpy.GetParameterAsText(16)
+    #Origins per O-D batch (0 solves each matrix at once) - OPTIONAL
+    batchSize = int(arcpy.GetParameter(17) or 0)
+    #Worker processes solving O-D batches in parallel - OPTIONAL
+    workers = int(arcpy.GetParameter(18) or 1)
+    #Local road network (CSV edge list or lines) used instead of the Network Dataset - OPTIONAL
+    localNetwork = arcpy.GetParameterAsText(19)
+    #Travel time field of the road lines - OPTIONAL
+    localMinutesField = arcpy.GetParameterAsText(20)
+    #Maximum network speed (map units per minute) for skipping pairs out of reach - OPTIONAL
+    maxSpeed = float(arcpy.GetParameter(21) or 0)
+    #File keeping this run's lines & scores for incremental updates - OPTIONAL
+    stateFile = arcpy.GetParameterAsText(22)
+    #Stage timings sidecar (.json or .csv) - OPTIONAL
+    timingsFile = arcpy.GetParameterAsText(23)
+    #O-D table of the first step, with IDs, volumes & scores of each line - OPTIONAL
+    odTable = arcpy.GetParameterAsText(24)
+    #Score with sparse weight matrices held in memory - OPTIONAL
+    sparseEngine = bool(arcpy.GetParameter(25))
+    #Decay function (Gaussian if not set) - OPTIONAL
+    decayName = arcpy.GetParameterAsText(26) or "Gaussian"
+    #Resolution in minutes of a weight lookup table (0 weights every time exactly) - OPTIONAL
+    weightResolution = float(arcpy.GetParameter(27) or 0)
+    #Columnar output of the scores (.npz, .arrow or .parquet) - OPTIONAL
+    columnarOutput = arcpy.GetParameterAsText(28)
+    #Add the first step O-D lines to the columnar output - OPTIONAL
+    columnarLines = bool(arcpy.GetParameter(29))
+    #Folder of a memory-mapped store of the first step O-D matrix - OPTIONAL
+    storeFolder = arcpy.GetParameterAsText(30)
+    #Folder keeping the network locations points were snapped to - OPTIONAL
+    locationFolder = arcpy.GetParameterAsText(31)
+    #Solve the local road network on a contraction hierarchy kept in the cache folder - OPTIONAL
+    localHierarchy = bool(arcpy.GetParameter(32))
+    #Cell size (map units) for scoring demand on cluster representatives (0 scores every point) - OPTIONAL
+    demandCellSize = float(arcpy.GetParameter(33) or 0)
+    #Tile size (map units) for solving & scoring in tiles (0 solves the whole area at once) - OPTIONAL
+    tileSize = float(arcpy.GetParameter(34) or 0)
+    #Folder of the tile job queue, shared with workers on other machines - OPTIONAL
+    tileFolder = arcpy.GetParameterAsText(35)
+    #Local worker processes solving tiles besides the tool's own - OPTIONAL
+    tileWorkers = int(arcpy.GetParameter(36) or 0)
+    #Travel time tolerance (minutes) of demand clusters on a local road network - OPTIONAL
+    demandTolerance = float(arcpy.GetParameter(37) or 0)
+
+    # Run the tool on the parameters
+    runV2SFCA(inputND, inputSupply, supplyVolumeOpt, supplyVolumeField, supplyVolumeValue,
+              inputDemand, demandVolumeOpt, demandVolumeField, demandVolumeValue, distance,
+              coeffOrWeight, coefficient, targetWeight, outputFC, report, reuseMatrix, cacheFolder,
+              batchSize, workers, localNetwork, localMinutesField, maxSpeed, stateFile, timingsFile,
+              odTable, sparseEngine, decayName, weightResolution, columnarOutput, columnarLines,
+              storeFolder, locationFolder, localHierarchy, demandCellSize, tileSize, tileFolder,
+              tileWorkers, demandTolerance)
+
+# A function running V2SFCA on typed arguments (see sfca_jobs)
+def runV2SFCA(inputND, inputSupply, supplyVolumeOpt, supplyVolumeField, supplyVolumeValue,
+              inputDemand, demandVolumeOpt, demandVolumeField, demandVolumeValue, distance,
+              coeffOrWeight, coefficient, targetWeight, outputFC, report, reuseMatrix=False,
+              cacheFolder="", batchSize=0, workers=1, localNetwork="", localMinutesField="",
+              maxSpeed=0, stateFile="", timingsFile="", odTable="", sparseEngine=False,
+              decayName="Gaussian", weightResolution=0, columnarOutput="", columnarLines=False,
+              storeFolder="", locationFolder="", localHierarchy=False, demandCellSize=0, tileSize=0,
+              tileFolder="", tileWorkers=0, demandTolerance=0):
+    '''Runs V2SFCA without the ArcGIS parameter plumbing. Arguments are the
+    tool's parameters, with the same names & in the same order; optional
+    ones default as in the tool. Returns a summary of the run.'''
+
+    # Wall time, CPU time, memory & rows of each stage
+    timings = sfca_timing.StageTimings()
 
     #Check weighting method
+    decay, decaySolve = sfca_decay.decayFunction(decayName)
     if coeffOrWeight == "Use target weight":
-        coefficient = gaussianSolve(distance, targetWeight)
+        coefficient = decaySolve(distance, targetWeight)
     else:
         pass
+    weightFunction = lambda odMinutes: sfca_core.continuousWeights(odMinutes, distance, coefficient,
+                                                                   decay)
+    weightNote = "Exact"
+    if weightResolution > 0:
+        # Times are weighted from a table of bins up to the catchment
+        weightFunction, lookupError = sfca_decay.quantizedWeights(weightFunction, distance,
+                                                                  weightResolution)
+        weightNote = "Lookup table at %s minutes (largest weight error: %s)"%(weightResolution,
+                                                                              lookupError)
 
     # Make working feature layers based on supply & demand inputs
     arcpy.AddMessage("Preparing input features...")
+    timings.start("Preparing input features")
     workingSupplyLayer = "workingSupplyLayer"
     workingDemandLayer = "workingDemandLayer"
     workingSupply = arcpy.MakeFeatureLayer_management(inputSupply, workingSupplyLayer)
     workingDemand = arcpy.MakeFeatureLayer_management(inputDemand, workingDemandLayer)
 
-    # Check if Volume fields exist or if Volume values should be applied...
-    if supplyVolumeOpt == "Constant volume value":
-        supplyVolumeField = writeVolume(workingSupply, "Supply_Vol", supplyVolumeValue)
-    elif supplyVolumeOpt == "Volume from field":
-        pass
-    if demandVolumeOpt == "Constant volume value":
-        demandVolumeField = writeVolume(workingDemand, "Demand_Vol", demandVolumeValue)
-    elif demandVolumeOpt == "Volume from field":
-        pass
-
-    # Prepare extra fields for weights & calculations
-    weightedSupply = "WghtSupply"
-    weightedDemand = "WghtDemand"
+    # Names of the score fields
     step1Score = "Step1_Score"
     step2Score = "Step2_Score"
     sparField = "SPAR"
-    # Add fields to Supply
-    arcpy.AddField_management(workingSupply, step1Score, doubleType)
-    # Add fields to Demand
-    arcpy.AddField_management(workingDemand, step2Score, doubleType)
-    arcpy.AddField_management(workingDemand, sparField, doubleType)
 
     #Get ObjectID fields
     supplyOID = arcpy.Describe(inputSupply).OIDFieldName
     demandOID = arcpy.Describe(inputDemand).OIDFieldName
-    #Prepare for using ODMatrix ID Fields
-    originID = "OriginID"
-    destID = "DestinationID"
+    # Read volumes into arrays (constant volumes are applied in memory),
+    # keyed by the text of each ObjectID
+    supplyIDs, supplyVolume, supplyX, supplyY = readPoints(workingSupply, supplyOID, supplyVolumeOpt,
+                                                           supplyVolumeField, supplyVolumeValue)
+    demandIDs, demandVolume, demandX, demandY = readPoints(workingDemand, demandOID, demandVolumeOpt,
+                                                           demandVolumeField, demandVolumeValue)
+    supplyKeys = supplyIDs.astype(str)
+    demandKeys = demandIDs.astype(str)
+    timings.rows(len(supplyIDs) + len(demandIDs))
 
-    # Step 1
-    # Create OD Matrix Layer
-    arcpy.AddMessage("Creating First Origin-Destination Matrix...")
-    try:
-        arcpy.CheckOutExtension("Network")
-        step1NALayer = arcpy.na.MakeODCostMatrixLayer(inputND, "step1NALayer", minutes,
-                                                    distance, "", [minutes])
-        # Get layer object
-        step1Layer = step1NALayer.getOutput(0)
-        # Identify sub-layers
-        step1subLayers = arcpy.na.GetNAClassNames(step1Layer)
-        # Variables for easy use of Origins & Desintations & Lines layers
-        step1origins = step1subLayers["Origins"]
-        step1destinations = step1subLayers["Destinations"]
-        step1lines = step1subLayers["ODLines"]
-        # Get location fields
-        step1fieldsO = arcpy.ListFields(inputSupply)
-        step1fieldsD = arcpy.ListFields(inputDemand)
-        # Origins
-        step1Ofieldmap = arcpy.na.NAClassFieldMappings(step1Layer, step1origins, True, step1fieldsO)
-        # Add Locations for Origins
-        arcpy.AddMessage("Adding Origins...")
-        arcpy.na.AddLocations(step1Layer, step1origins, inputSupply, step1Ofieldmap, "")
-        # Destinations
-        step1Dfieldmap = arcpy.na.NAClassFieldMappings(step1Layer, step1destinations, True, step1fieldsD)
-        # Add locations for Destinations
-        arcpy.AddMessage("Adding Destinations...")
-        arcpy.na.AddLocations(step1Layer, step1destinations, inputDemand, step1Dfieldmap, "")
-        # Solve
-        arcpy.AddMessage("Solving Origin-Destination Matrix...")
-        arcpy.na.Solve(step1Layer)
-        # Dictionary for accessing to solved sublayers
-        step1LyrDict = dict((lyr.datasetName, lyr) for lyr in arcpy.mapping.ListLayers(step1Layer)[1:])
-        step1LinesTable = step1LyrDict["ODLines"]
-        # I think this variable will help
-        step1matrix = "step1matrix"
-        arcpy.MakeTableView_management(step1LinesTable, step1matrix)
-    except:
-        ODMatrixError = arcpy.GetMessages(2)
-        arcpy.AddMessage(ODMatrixError)
-        arcpy.AddError("The first O-D Matrix could not be completed.")
-    finally:
-        arcpy.CheckInExtension("Network")
-
-    # Join layers
-    arcpy.AddMessage("Joining layers...")
-    arcpy.JoinField_management(step1matrix, destID, workingDemand, demandOID, demandVolumeField)
-    arcpy.AddField_management(step1matrix, weightField, doubleType, 15, 14)
-    arcpy.AddField_management(step1matrix, weightedDemand, doubleType, 15, 14)
-
-    # Use weight functions
-    arcpy.AddMessage("First Step: Applying weights...")
-    writeWeights(step1matrix, distance, coefficient)
-    applyWeights(step1matrix, demandVolumeField, weightedDemand)
-
-    arcpy.AddMessage("First Step: Calculating scores...")
-    # Using cursors to assign a score for Step 1
-    with arcpy.da.UpdateCursor(workingSupply, [supplyOID, supplyVolumeField, step1Score]) as scoreWriter:
-        for item in scoreWriter:
-            with arcpy.da.SearchCursor(step1matrix, [originID, weightedDemand]) as popReader:
-                score = 0
-                for demand in popReader:
-                    if item[0] == demand[0]:
-                        score += demand[1]
-                        continue
-                    else:
-                        continue
-                item[2] = item[1]/score #multiplier removed here
-                scoreWriter.updateRow(item)
-    del demand, popReader, item, scoreWriter
-
-    # Second step
-    arcpy.AddMessage("Creating Second Origin-Destination Matrix...")
-    # Create OD Matrix Layer
-    try:
-        arcpy.CheckOutExtension("Network")
-        step2NALayer = arcpy.na.MakeODCostMatrixLayer(inputND, "step2NALayer", minutes,
-                                                    distance, "", [minutes])
-        # Get layer object
-        step2Layer = step2NALayer.getOutput(0)
-        # Identify sub-layers
-        step2subLayers = arcpy.na.GetNAClassNames(step2Layer)
-        # Variables for easy use of Origins & Desintations & Lines layers
-        step2origins = step2subLayers["Origins"]
-        step2destinations = step2subLayers["Destinations"]
-        step2lines = step2subLayers["ODLines"]
-        # Get location fields
-        step2fieldsO = arcpy.ListFields(inputDemand)
-        step2fieldsD = arcpy.ListFields(inputSupply)
-        # Origins
-        step2Ofieldmap = arcpy.na.NAClassFieldMappings(step2Layer, step2origins, True, step2fieldsO)
-        # Add Locations for Origins
-        arcpy.AddMessage("Adding Origins...")
-        arcpy.na.AddLocations(step2Layer, step2origins, inputDemand, step2Ofieldmap, "")
-        # Destinations
-        step2Dfieldmap = arcpy.na.NAClassFieldMappings(step2Layer, step2destinations, True, step2fieldsD)
-        # Add locations for Destinations
-        arcpy.AddMessage("Adding Destinations...")
-        arcpy.na.AddLocations(step2Layer, step2destinations, inputSupply, step2Dfieldmap, "")
-        # Solve
-        arcpy.AddMessage("Solving Origin-Destination Matrix...")
-        arcpy.na.Solve(step2Layer)
-        # Dictionary for accessing to solved sublayers
-        step2LyrDict = dict((lyr.datasetName, lyr) for lyr in arcpy.mapping.ListLayers(step2Layer)[1:])
-        step2LinesTable = step2LyrDict["ODLines"]
-        # I think this variable will help
-        step2matrix = "step2matrix"
-        arcpy.MakeTableView_management(step2LinesTable, step2matrix)
-    except:
-        ODMatrixError = arcpy.GetMessages(2)
-        arcpy.AddMessage(ODMatrixError)
-        arcpy.AddError("The second O-D Matrix could not be completed.")
-    finally:
-        arcpy.CheckInExtension("Network")
-
-    arcpy.AddMessage("Joining layers...")
-    arcpy.JoinField_management(step2matrix, destID, workingSupply, supplyOID, step1Score)
-    arcpy.AddField_management(step2matrix, weightField, doubleType, 15, 14)
-    arcpy.AddField_management(step2matrix, weightedSupply, doubleType, 15, 14)
-
-    arcpy.AddMessage("Second Step: Applying weights... ")
-    writeWeights(step2matrix, distance, coefficient)
-    applyWeights(step2matrix, step1Score, weightedSupply)
-
-    arcpy.AddMessage("Second Step: Calculating scores... ")
-    # Using cursors to assign a score for Step 2
-    with arcpy.da.UpdateCursor(workingDemand, [demandOID, step2Score]) as scoreUpdater:
-        for place in scoreUpdater:
-            with arcpy.da.SearchCursor(step2matrix, [originID, weightedSupply]) as scoreChecker:
-                score = 0
-                for supply in scoreChecker:
-                    if place[0] == supply[0]:
-                        score += supply[1]
-                        continue
-                    else:
-                        continue
-                place[1] = score
-                scoreUpdater.updateRow(place)
-    del supply, scoreChecker, place, scoreUpdater
+    # Dense demand can be solved & scored on cluster representatives, keyed
+    # by their own ObjectIDs until the scores are mapped back
+    demandPoints = inputDemand
+    aggregationNote = "Not used"
+    if demandCellSize > 0:
+        arcpy.AddMessage("Aggregating demand points...")
+        timings.start("Aggregating demand points")
+        timings.rows(len(demandIDs))
+        pointIDs, pointVolume = demandIDs, demandVolume
+        times = None
+        demandTolerance = demandTolerance or sfca_aggregate.defaultTolerance
+        if localNetwork:
+            clusters, representative, demandVolume, times = sfca_aggregate.networkClusters(
+                od_graph.loadNetwork(localNetwork, localMinutesField or "minutes"), demandX, demandY,
+                pointVolume, demandCellSize, demandTolerance)
+        else:
+            clusters = sfca_aggregate.clusterPoints(demandX, demandY, demandCellSize)
+            representative, demandVolume = sfca_aggregate.representatives(demandX, demandY, pointVolume, clusters)
+        aggregationNote = sfca_aggregate.aggregationNote(demandCellSize, clusters, pointVolume,
+                                                         sfca_aggregate.displacement(demandX, demandY, clusters,
+                                                                                     representative),
+                                                         times, demandTolerance)
+        demandX, demandY = demandX[representative], demandY[representative]
+        demandPoints = sfca_aggregate.writeRepresentatives(
+            os.path.join(arcpy.env.scratchGDB, "demandRepresentatives"),
+            ["R%s"%cluster for cluster in range(len(representative))], demandX, demandY, demandVolume,
+            arcpy.Describe(inputDemand).spatialReference)
+        demandIDs = readColumns(demandPoints, ["OID@"])[0]
+        demandKeys = demandIDs.astype(str)
+
+    # Cache keys cover everything a solve depends on, including its direction
+    if localNetwork:
+        networkSig = od_cache.cacheKey([od_cache.networkSignature(localNetwork), localMinutesField])
+    else:
+        networkSig = od_cache.networkSignature(inputND)
+    supplySig = od_cache.pointsSignature(supplyKeys, supplyX, supplyY)
+    demandSig = od_cache.pointsSignature(demandKeys, demandX, demandY)
+    step1Key = od_cache.cacheKey([networkSig, minutes, distance, supplySig, demandSig])
+    step2Key = od_cache.cacheKey([networkSig, minutes, distance, demandSig, supplySig])
+
+    # Batched matrices are spilled to scratch until both steps are scored
+    spillFolder = ""
+    if batchSize > 0 or workers > 1:
+        spillFolder = tempfile.mkdtemp(prefix="v2sfca_", dir=arcpy.env.scratchFolder)
+    # A contraction hierarchy is kept with the cached matrices
+    hierarchyFolder = (cacheFolder or arcpy.env.scratchFolder) if localHierarchy else ""
+
+    if tileSize > 0:
+        # Each tile solves & scores the facilities inside it against the
+        # demand in their reach; the lines stay in the tile queue folder
+        arcpy.AddMessage("Solving & scoring in tiles...")
+        timings.start("Solving & scoring in tiles")
+        reuseTiles = reuseMatrix and matrixIsSymmetric(inputND, localNetwork, localMinutesField)
+        if reuseMatrix and not reuseTiles:
+            arcpy.AddWarning("The network has turns, restrictions or one-way roads; the second matrix will be solved.")
+        if localNetwork:
+            tileSettings = sfca_tiles.tileSettings("graph", distance, coefficient, decayName, weightResolution,
+                                                   reuseTiles, networkFile=localNetwork,
+                                                   minutesField=localMinutesField or "minutes")
+        else:
+            tileSettings = sfca_tiles.tileSettings("networkAnalyst", distance, coefficient, decayName,
+                                                   weightResolution, reuseTiles,
+                                                   arcpy.Describe(inputSupply).catalogPath,
+                                                   arcpy.Describe(demandPoints).catalogPath,
+                                                   networkDataset=inputND,
+                                                   scratchFolder=arcpy.env.scratchFolder)
+        tileQueue = tileFolder or tempfile.mkdtemp(prefix="v2sfca_tiles_", dir=arcpy.env.scratchFolder)
+        halo = od_prefilter.reachRadius(distance, maxSpeed)
+        ratios, scores, tileCount, tileLines, firstPaths, secondPaths = sfca_tiles.runTiles(
+            tileQueue, tileSettings, supplyIDs, supplyVolume, supplyX, supplyY, demandIDs, demandVolume,
+            demandX, demandY, tileSize, halo, tileWorkers)
+        timings.rows(tileLines)
+        firstMatrix = sfca_tiles.tilesNote(tileCount, tileSize, halo, tileWorkers, tileLines)
+        secondMatrix = "Reused first matrix" if reuseTiles else "Solved in the same tiles"
+        # Lines are read back from the tiles only for the optional outputs
+        step1Lines = lambda: od_cache.spilledChunks(firstPaths)
+        step1Chunks = lambda: sfca_core.weightChunks(step1Lines(), weightFunction)
+        step2Chunks = step1Chunks
+        if not reuseTiles:
+            step2Chunks = lambda: sfca_core.weightChunks(od_cache.spilledChunks(secondPaths), weightFunction)
+        timings.start("First Step: Writing scores")
+        timings.rows(len(supplyIDs))
+        # Step 1 scores go to a scratch copy of the supply points, not the input
+        step1Path = sfca_tables.scoredCopy(workingSupply, os.path.join(arcpy.env.scratchGDB, "step1Supply"),
+                                           "OID@", supplyIDs, [step1Score], [ratios])
+    else:
+        # Step 1 (origins are supply, destinations demand)
+        timings.start("First Origin-Destination Matrix")
+        step1Chunks, step1Lines, firstMatrix = weightedMatrix(inputND, "step1NALayer", distance, coefficient,
+                                                              inputSupply, demandPoints, supplyKeys, demandKeys,
+                                                              True, cacheFolder, step1Key, batchSize,
+                                                              spillFolder, "first", workers,
+                                                              localNetwork, localMinutesField, maxSpeed,
+                                                              decay, weightResolution, locationFolder,
+                                                              hierarchyFolder)
+
+        arcpy.AddMessage("First Step: Calculating scores...")
+        timings.start("First Step: Calculating scores")
+        if sparseEngine:
+            # W is built once per matrix; each step is then one sparse product
+            step1Matrix = sfca_sparse.weightMatrix(timings.countLines(step1Chunks()), len(supplyIDs),
+                                                   len(demandIDs))
+            ratios = sfca_sparse.step1Ratios(step1Matrix, supplyVolume, demandVolume)
+        else:
+            ratios = sfca_core.streamStep1Ratios(supplyVolume, demandVolume,
+                                                 timings.countLines(step1Chunks())) #multiplier removed here
+        timings.start("First Step: Writing scores")
+        timings.rows(len(supplyIDs))
+        # Step 1 scores go to a scratch copy of the supply points, not the input
+        step1Path = sfca_tables.scoredCopy(workingSupply, os.path.join(arcpy.env.scratchGDB, "step1Supply"),
+                                           "OID@", supplyIDs, [step1Score], [ratios])
+
+        # Second step (origins are demand, destinations supply)
+        # On a symmetric network the demand-to-supply matrix is the transpose of
+        # the first one, so its lines can be reused as they are
+        if reuseMatrix and matrixIsSymmetric(inputND, localNetwork, localMinutesField):
+            arcpy.AddMessage("Reusing First Origin-Destination Matrix...")
+            secondMatrix = "Reused first matrix"
+            step2Chunks = step1Chunks
+        else:
+            if reuseMatrix:
+                arcpy.AddWarning("The network has turns, restrictions or one-way roads; the second matrix will be solved.")
+            timings.start("Second Origin-Destination Matrix")
+            step2Chunks, step2Lines, secondMatrix = weightedMatrix(inputND, "step2NALayer", distance, coefficient,
+                                                                   demandPoints, inputSupply, supplyKeys, demandKeys,
+                                                                   False, cacheFolder, step2Key, batchSize,
+                                                                   spillFolder, "second", workers,
+                                                                   localNetwork, localMinutesField, maxSpeed,
+                                                                   decay, weightResolution, locationFolder,
+                                                                   hierarchyFolder)
+
+        arcpy.AddMessage("Second Step: Calculating scores... ")
+        timings.start("Second Step: Calculating scores")
+        if sparseEngine:
+            step2Matrix = step1Matrix
+            if step2Chunks is not step1Chunks:
+                step2Matrix = sfca_sparse.weightMatrix(timings.countLines(step2Chunks()), len(supplyIDs),
+                                                       len(demandIDs))
+            scores = sfca_sparse.step2Scores(step2Matrix, ratios)
+        else:
+            scores = sfca_core.streamStep2Scores(ratios, timings.countLines(step2Chunks()), len(demandIDs))
+    if stateFile:
+        # Keep the weighted lines so sfca_update can re-score changed points
+        arcpy.AddMessage("Saving run state...")
+        timings.start("Saving run state")
+        step2Lines = None
+        if step2Chunks is not step1Chunks:
+            step2Lines = sfca_update.linesFromChunks(step2Chunks())
+        state = sfca_update.buildState(supplyKeys, supplyVolume, demandKeys, demandVolume,
+                                       *sfca_update.linesFromChunks(step1Chunks()),
+                                       step2Lines=step2Lines)
+        sfca_update.saveState(stateFile, state)
+    if odTable:
+        # Lines are resolved against the point arrays; only the result is written
+        arcpy.AddMessage("Writing O-D table...")
+        timings.start("Writing O-D table")
+        records = sfca_core.odRecords(supplyKeys, demandKeys, supplyVolume, demandVolume, ratios,
+                                      step1Lines(), weightFunction)
+        timings.rows(len(records))
+        sfca_tables.writeODTable(odTable, records)
+
+    if demandCellSize > 0:
+        # Every point takes the Step 2 score of its representative
+        scores = scores[clusters]
+        demandIDs = pointIDs
 
     arcpy.AddMessage("Calculating SPAR...")
-    # Find the average SPAI (v2sfca score)
-    totalSpai = 0
-    totalScores = 0
-    scoreSet = set()
-    scoreAdder = arcpy.da.SearchCursor(workingDemand, [step2Score])
-    for row in scoreAdder:
-        totalSpai += row[0]
-        totalScores += 1
-        if row[0] > 0:
-            scoreSet.add(row[0])
-    uniqueValues = len(scoreSet)
-    avgSpai = totalSpai/totalScores
-    del row, scoreAdder
-
-    # Use an update cursor to ratio individual scores to average (SPAR)
-    with arcpy.da.UpdateCursor(workingDemand, [step2Score, sparField]) as sparWriter:
-        totalSpar = 0
-        for row in sparWriter:
-            row[1] = row[0]/avgSpai
-            totalSpar += row[1]
-            sparWriter.updateRow(row)
-    del row, sparWriter
+    timings.start("Calculating SPAR")
+    timings.rows(len(demandIDs))
+    # Find the average SPAI (v2sfca score) & ratio individual scores to it
+    spar, avgSpai = sfca_core.sparScores(scores)
+    uniqueValues = len(numpy.unique(scores[scores > 0]))
+    totalScores = len(scores)
+    totalSpar = spar.sum()
+    if columnarOutput:
+        # Scores (and O-D lines) in a compact file that loads without a geodatabase
+        arcpy.AddMessage("Writing columnar output...")
+        timings.start("Writing columnar output")
+        timings.rows(len(demandIDs))
+        columnarPaths = sfca_output.writeColumnar(columnarOutput,
+                                                  sfca_output.scoreColumns(demandIDs, scores, spar, demandOID),
+                                                  supplyKeys, demandKeys,
+                                                  step1Lines() if columnarLines else None)
+    if storeFolder:
+        # Lines indexed by supply & demand point for later queries & re-scoring
+        arcpy.AddMessage("Writing O-D store...")
+        timings.start("Writing O-D store")
+        od_store.buildStore(storeFolder, supplyKeys, demandKeys, timings.countLines(step1Lines()))
+    if spillFolder:
+        shutil.rmtree(spillFolder, ignore_errors=True)
+    if tileSize > 0 and not tileFolder:
+        shutil.rmtree(tileQueue, ignore_errors=True)
 
     arcpy.AddMessage("Saving output features...")
-    # Copy working layer to user-defined Output
-    arcpy.CopyFeatures_management(workingDemand, outputFC)
+    timings.start("Saving output features")
+    timings.rows(len(demandIDs))
+    # Copy demand to user-defined Output & add the scores to the copy
+    sfca_tables.scoredCopy(workingDemand, outputFC, "OID@", demandIDs, [step2Score, sparField],
+                           [scores, spar])
+    timings.stop()
+    if timingsFile:
+        timings.writeSidecar(timingsFile)
 
     # Begin generating report (try/except since report is optional):
     arcpy.AddMessage("Writing output report...")
     try:
         file = open(report, "w")
         file.write("V2SFCA Report\n\nINPUTS:\n\n")
-        file.write("Network Dataset: %s\n\n"%inputND)
+        file.write("Network Dataset: %s\n"%inputND)
+        file.write("Local road network: %s\n\n"%(localNetwork or "Not used"))
         file.write("Supply:\nPoints: %s\n"%inputSupply)
         file.write("Volume: %s\nField: %s\nValue: %s\n"%(supplyVolumeOpt, supplyVolumeField, supplyVolumeValue))
         file.write("Demand:\nPoints: %s\n"%inputDemand)
         file.write("Volume: %s\nField: %s\nValue: %s"%(demandVolumeOpt, demandVolumeField, demandVolumeValue))
         file.write("\n\nDistances and Weights:\n")
         file.write("Catchment threshold: %s\n"%distance)
-        file.write("Coefficient or Target Weight: %s\n\n"%coeffOrWeight)
+        file.write("Coefficient or Target Weight: %s\n"%coeffOrWeight)
+        file.write("Decay function: %s\n\n"%decayName)
         file.write("Coefficient: %s\nTarget weight: %s\n"%(coefficient, targetWeight))
+        file.write("Weights: %s\n"%weightNote)
+        file.write("Demand aggregation: %s\n"%aggregationNote)
+        file.write("First step matrix: %s\n"%firstMatrix)
+        file.write("Second step matrix: %s\n"%secondMatrix)
+        file.write("Scoring engine: %s\n\n"%("Tiles" if tileSize > 0 else "Sparse weight matrices"
+                                                if sparseEngine else "Streamed arrays"))
         file.write("SCORES:\n\nMean V2SFCA Score: %s\n"%avgSpai)
         file.write("Number of unique scores: %s\n"%uniqueValues)
         meanSpar = totalSpar/totalScores
         file.write("Mean Spatial Access Ratio (SPAR): %s "%meanSpar)
         file.write("(A mean SPAR of 1.0 indicates that the ratio was calculated correctly)\n\n")
-        file.write("OUTPUT:\n\nOutput points: %s\n\nReport end."%outputFC)
+        file.write("TIMINGS:\n\n%s\n\n"%timings.reportText())
+        file.write("OUTPUT:\n\nOutput points: %s\n"%outputFC)
+        file.write("Step 1 scores: %s\n"%step1Path)
+        file.write("O-D table: %s\n"%(odTable or "Not written"))
+        file.write("O-D store: %s\n"%(storeFolder or "Not written"))
+        file.write("Tile queue: %s\n"%(tileFolder or "Not kept"))
+        file.write("Columnar output: %s\n\nReport end."%(", ".join(columnarPaths) if columnarOutput
+                                                          else "Not written"))
         # CLose the file to save it
         file.close()
     except:
         pass
 
     # End the function
-    return
+    return {"output": outputFC, "report": report, "meanScore": float(avgSpai),
+            "meanSpar": float(totalSpar/totalScores) if totalScores else 0.0,
+            "firstMatrix": firstMatrix, "secondMatrix": secondMatrix}
 
 # A standard python protocol to check before running the module's main funcion.
 if __name__ == '__main__':
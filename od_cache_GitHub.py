@@ -0,0 +1,154 @@
+'''-----------------------------------------------------------------------------
+# Name:        OD_Cache_Version_1.0
+# Purpose:     Keep solved Origin-Destination matrices on disk so repeated
+#              runs on the same network & points can skip the solve
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# A cached matrix is one .npz file named after its key, holding three
+# columns: origin IDs, destination IDs & travel times. The key is a hash of
+# everything the solve depends on (the network, impedance, cutoff and the
+# IDs & geometry of both point sets), so a changed input simply misses.
+# A network dataset is described by its own sources only, not by the rest
+# of its geodatabase, which the tools' scratch & outputs may share. The
+# attribute values of each source are hashed, so an edited travel time or a
+# recalculated speed field misses too.
+# An empty cache folder disables the cache.
+
+# Import necessary modules
+import os
+import hashlib
+import numpy
+
+# A function for hashing the parts a solve depends on
+def cacheKey(parts):
+    '''Arrays are hashed by value, anything else by its text'''
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, numpy.ndarray):
+            digest.update(str(part.dtype).encode("utf-8"))
+            digest.update(numpy.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(str(part).encode("utf-8"))
+        digest.update(b"|")
+    return digest.hexdigest()
+
+# A function for describing a network
+def networkSignature(networkDataset, networkVersion=""):
+    '''A local network file is described by its size & modification time. A
+    network dataset is described by its attributes & by the rows of each of
+    its sources (edges, junctions, turns), & a local network of line
+    features by its own. networkVersion marks changes the data cannot show
+    (e.g. a network service, described by its name only).'''
+    path = os.path.abspath(networkDataset)
+    parts = [path, networkVersion]
+    if os.path.isfile(path):
+        # A shapefile's travel times are in its .dbf
+        stem = os.path.splitext(path)[0]
+        for filePath in [path] + [stem + extension for extension in (".dbf", ".DBF")
+                                  if path.lower().endswith(".shp")]:
+            if os.path.isfile(filePath):
+                stat = os.stat(filePath)
+                parts.append("%s %s"%(stat.st_size, int(stat.st_mtime)))
+        return cacheKey(parts)
+    import arcpy
+    try:
+        description = arcpy.Describe(networkDataset)
+    except (IOError, OSError, RuntimeError):
+        # e.g. a network service, which is described by its name only
+        return cacheKey([networkDataset, networkVersion])
+    parts = [description.catalogPath, networkVersion]
+    folder = os.path.dirname(description.catalogPath)
+    if hasattr(description, "sources"):
+        for attribute in description.attributes:
+            parts.append("%s %s %s"%(attribute.name, attribute.usageType, attribute.units))
+        sourcePaths = [os.path.join(folder, source.name) for source in
+                       sorted(description.sources, key=lambda source: source.name)]
+    else:
+        sourcePaths = [description.catalogPath]
+    for sourcePath in sourcePaths:
+        parts.append("%s %s"%(os.path.basename(sourcePath), sourceDigest(sourcePath)))
+    return cacheKey(parts)
+
+# A function for hashing the rows of a network source
+def sourceDigest(sourcePath):
+    '''Every attribute, with the length of lines (length-based costs are
+    evaluated from it) or the place of points, is read in one cursor pass,
+    far cheaper than a solve'''
+    import arcpy
+    fields = [field.name for field in arcpy.ListFields(sourcePath)
+              if field.type not in ("Geometry", "Blob", "Raster")]
+    shapeType = getattr(arcpy.Describe(sourcePath), "shapeType", "")
+    if shapeType == "Polyline":
+        fields.append("SHAPE@LENGTH")
+    elif shapeType == "Point":
+        fields.append("SHAPE@XY")
+    digest = hashlib.sha1()
+    with arcpy.da.SearchCursor(sourcePath, fields) as cursor:
+        for row in cursor:
+            digest.update(repr(row).encode("utf-8"))
+    return digest.hexdigest()
+
+# A function for describing a point set by its IDs & coordinates
+def pointsSignature(ids, xs, ys):
+    '''IDs are hashed as text so text & numeric IDs behave alike'''
+    return cacheKey([numpy.asarray(ids).astype(str),
+                     numpy.asarray(xs, dtype=numpy.float64),
+                     numpy.asarray(ys, dtype=numpy.float64)])
+
+# A function for the file a key is stored in
+def cachePath(cacheFolder, key):
+    return os.path.join(cacheFolder, "od_%s.npz"%key)
+
+# A function for loading a cached matrix
+def loadMatrix(cacheFolder, key):
+    '''Returns origin IDs, destination IDs & minutes, or None on a miss'''
+    if not cacheFolder:
+        return None
+    path = cachePath(cacheFolder, key)
+    if not os.path.exists(path):
+        return None
+    with numpy.load(path) as cached:
+        return cached["origins"], cached["destinations"], cached["minutes"]
+
+# A function for storing a solved matrix
+def saveMatrix(cacheFolder, key, origins, destinations, minutes):
+    '''Written to a temporary file first so readers never see half a matrix'''
+    if not cacheFolder:
+        return None
+    if not os.path.isdir(cacheFolder):
+        os.makedirs(cacheFolder)
+    path = cachePath(cacheFolder, key)
+    tempPath = path + ".%s.tmp"%os.getpid()
+    with open(tempPath, "wb") as cacheFile:
+        numpy.savez(cacheFile,
+                    origins=numpy.asarray(origins).astype(str),
+                    destinations=numpy.asarray(destinations).astype(str),
+                    minutes=numpy.asarray(minutes, dtype=numpy.float64))
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tempPath, path)
+    return path
+
+# A function for spilling O-D chunks to disk as they are produced
+def spillChunks(chunks, spillFolder):
+    '''chunks yields (supplyIndex, demandIndex, values), values being minutes
+    or weights; returns the paths'''
+    paths = []
+    for supplyIndex, demandIndex, values in chunks:
+        path = os.path.join(spillFolder, "od_chunk_%05d.npz"%len(paths))
+        numpy.savez(path,
+                    supplyIndex=numpy.asarray(supplyIndex, dtype=numpy.int32),
+                    demandIndex=numpy.asarray(demandIndex, dtype=numpy.int32),
+                    values=numpy.asarray(values, dtype=numpy.float64))
+        paths.append(path)
+    return paths
+
+# A function for reading spilled chunks back one at a time
+def spilledChunks(paths):
+    '''Yields (supplyIndex, demandIndex, values) for each spilled chunk'''
+    for path in paths:
+        with numpy.load(path) as chunk:
+            yield chunk["supplyIndex"], chunk["demandIndex"], chunk["values"]
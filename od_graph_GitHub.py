@@ -0,0 +1,198 @@
+'''-----------------------------------------------------------------------------
+# Name:        OD_Graph_Version_1.0
+# Purpose:     Solve Origin-Destination matrices on a local road graph, as an
+#              alternative to Network Analyst
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# The road network is held as a CSR graph: one node per distinct line end
+# point & one edge per road segment, weighted by travel time in minutes.
+# Points are snapped to their nearest node with a KD-tree, and the search
+# from each origin stops at the catchment cutoff. Lines come back as
+# (origin, destination, minutes) positions, like the other solvers.
+#
+# Edge lists are CSV files with fromX, fromY, toX, toY & minutes columns
+# (and an optional oneway column, 1 = from-to only). Line features
+# (shapefile, GeoPackage, etc.) are read with GDAL/OGR when it is installed.
+# An edge with a missing or negative travel time is an error, as it would
+# otherwise be a free shortcut.
+
+# Import necessary modules
+import numpy
+from scipy import sparse
+from scipy.sparse import csgraph
+from scipy.spatial import cKDTree
+
+# Graphs already loaded by this process, keyed by path
+loadedGraphs = {}
+
+# A function for building the graph from its edges
+def buildGraph(fromX, fromY, toX, toY, edgeMinutes, oneway=None, decimals=6):
+    '''End points that match to the given decimals are one node. Returns
+    the graph & the coordinates of its nodes.'''
+    fromXY = numpy.column_stack([fromX, fromY]).astype(numpy.float64)
+    toXY = numpy.column_stack([toX, toY]).astype(numpy.float64)
+    edgeMinutes = numpy.asarray(edgeMinutes, dtype=numpy.float64)
+    allXY = numpy.round(numpy.vstack([fromXY, toXY]), decimals)
+    nodeXY, nodeIndex = numpy.unique(allXY, axis=0, return_inverse=True)
+    nodeIndex = nodeIndex.ravel()
+    fromNode = nodeIndex[:len(fromXY)]
+    toNode = nodeIndex[len(fromXY):]
+    # Two-way edges are added in both directions
+    if oneway is None:
+        twoWay = numpy.ones(len(edgeMinutes), dtype=bool)
+    else:
+        twoWay = numpy.asarray(oneway).astype(int) != 1
+    heads = numpy.concatenate([fromNode, toNode[twoWay]])
+    tails = numpy.concatenate([toNode, fromNode[twoWay]])
+    costs = numpy.concatenate([edgeMinutes, edgeMinutes[twoWay]])
+    # Parallel edges keep only the fastest, since the matrix would add them up
+    order = numpy.lexsort((costs, tails, heads))
+    heads, tails, costs = heads[order], tails[order], costs[order]
+    first = numpy.ones(len(heads), dtype=bool)
+    first[1:] = (heads[1:] != heads[:-1]) | (tails[1:] != tails[:-1])
+    graph = sparse.csr_matrix((costs[first], (heads[first], tails[first])),
+                              shape=(len(nodeXY), len(nodeXY)))
+    return graph, nodeXY
+
+# A function for reading an edge list
+def readEdgeList(path):
+    '''CSV with fromX, fromY, toX, toY, minutes & an optional oneway column'''
+    edges = numpy.genfromtxt(path, delimiter=",", names=True, dtype=None,
+                             encoding=None)
+    edges = numpy.atleast_1d(edges)
+    # Missing times read as nan (or -1 in an integer column)
+    invalid = numpy.flatnonzero(~(edges["minutes"] >= 0))
+    if len(invalid):
+        raise ValueError("Line %s of %s has a missing or negative travel time"%(invalid[0] + 2, path))
+    oneway = edges["oneway"] if "oneway" in edges.dtype.names else None
+    return buildGraph(edges["fromX"], edges["fromY"], edges["toX"], edges["toY"],
+                      edges["minutes"], oneway)
+
+# A function for reading road lines from a shapefile, GeoPackage, etc.
+def readLineEdges(path, minutesField, onewayField=""):
+    '''Each line joins its first & last vertex'''
+    try:
+        from osgeo import ogr
+    except ImportError:
+        raise ImportError("Reading %s needs GDAL/OGR; use a CSV edge list instead."%path)
+    source = ogr.Open(path)
+    if source is None:
+        raise IOError("Cannot open %s"%path)
+    layer = source.GetLayer(0)
+    columns = [[], [], [], [], [], []]
+    for feature in layer:
+        geometry = feature.GetGeometryRef()
+        if geometry is None:
+            continue
+        if geometry.GetGeometryCount():
+            points = []
+            for part in range(geometry.GetGeometryCount()):
+                points.extend(geometry.GetGeometryRef(part).GetPoints())
+        else:
+            points = geometry.GetPoints()
+        if not points:
+            continue
+        minutes = feature.GetField(minutesField)
+        if minutes is None or minutes < 0:
+            raise ValueError("Feature %s of %s has a missing or negative %s"%(feature.GetFID(), path,
+                                                                              minutesField))
+        values = [points[0][0], points[0][1], points[-1][0], points[-1][1], minutes,
+                  feature.GetField(onewayField) if onewayField else 0]
+        for column, value in zip(columns, values):
+            column.append(value)
+    oneway = columns[5] if onewayField else None
+    return buildGraph(columns[0], columns[1], columns[2], columns[3], columns[4], oneway)
+
+# A function for loading a road network file once per process
+def loadNetwork(path, minutesField="minutes", onewayField=""):
+    '''.csv files are edge lists, anything else is read as line features'''
+    key = (path, minutesField, onewayField)
+    if key not in loadedGraphs:
+        if path.lower().endswith(".csv"):
+            loadedGraphs[key] = readEdgeList(path)
+        else:
+            loadedGraphs[key] = readLineEdges(path, minutesField, onewayField)
+    return loadedGraphs[key]
+
+# A function for checking whether travel times can differ by direction
+def graphIsSymmetric(graph):
+    '''One-way edges make the graph asymmetric'''
+    return (graph != graph.T).nnz == 0
+
+# A function for snapping points to their nearest node
+def snapPoints(nodeXY, xs, ys):
+    '''Returns the node of each point & its distance from it'''
+    points = numpy.column_stack([xs, ys]).astype(numpy.float64)
+    if len(points) == 0:
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0)
+    snapDistance, nodes = cKDTree(nodeXY).query(points)
+    return nodes.astype(numpy.int64), snapDistance
+
+# A function for solving an O-D matrix between snapped points
+def solveOD(graph, originNodes, destinationNodes, cutoff, chunkCells=10000000):
+    '''Returns origin positions, destination positions & minutes of every
+    pair within the cutoff. Origins on the same node share one search. Each
+    search holds a time for every node, so searches are run in chunks of
+    about chunkCells times.'''
+    chunkSize = max(int(chunkCells // max(graph.shape[0], 1)), 1)
+    originNodes = numpy.asarray(originNodes, dtype=numpy.int64)
+    destinationNodes = numpy.asarray(destinationNodes, dtype=numpy.int64)
+    sources, sourceOfOrigin = numpy.unique(originNodes, return_inverse=True)
+    sourceOfOrigin = sourceOfOrigin.ravel()
+    # Origins grouped by their source node
+    counts = numpy.bincount(sourceOfOrigin, minlength=len(sources))
+    order = numpy.argsort(sourceOfOrigin, kind="mergesort")
+    starts = numpy.cumsum(counts) - counts
+    originParts, destinationParts, minuteParts = [], [], []
+    for start in range(0, len(sources), chunkSize):
+        times = csgraph.dijkstra(graph, directed=True, indices=sources[start:start + chunkSize],
+                                 limit=cutoff)[:, destinationNodes]
+        rows, columns = numpy.nonzero(times <= cutoff)
+        lineMinutes = times[rows, columns]
+        # Every origin on the source node gets the source's lines
+        rows = rows + start
+        repeats = counts[rows]
+        line = numpy.repeat(numpy.arange(len(rows)), repeats)
+        offset = numpy.arange(len(line)) - numpy.repeat(numpy.cumsum(repeats) - repeats, repeats)
+        originParts.append(order[starts[rows][line] + offset])
+        destinationParts.append(columns[line])
+        minuteParts.append(lineMinutes[line])
+    if not originParts:
+        return (numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64),
+                numpy.zeros(0))
+    return (numpy.concatenate(originParts), numpy.concatenate(destinationParts).astype(numpy.int64),
+            numpy.concatenate(minuteParts))
+
+# A function for solving an O-D matrix between point coordinates
+def solvePoints(network, originX, originY, destinationX, destinationY, cutoff, solver=None):
+    '''network is the (graph, nodeXY) pair of loadNetwork(). solver replaces
+    solveOD() (e.g. od_hierarchy.hierarchySolver()). Returns origin
+    positions, destination positions & minutes, and the longest snap.'''
+    graph, nodeXY = network
+    originNodes, originSnap = snapPoints(nodeXY, originX, originY)
+    destinationNodes, destinationSnap = snapPoints(nodeXY, destinationX, destinationY)
+    longestSnap = max([0.0] + originSnap.tolist() + destinationSnap.tolist())
+    originIndex, destinationIndex, lineMinutes = (solver or solveOD)(graph, originNodes, destinationNodes,
+                                                                     cutoff)
+    return originIndex, destinationIndex, lineMinutes, longestSnap
+
+# A solver for od_parallel tasks
+def graphSolver(task):
+    '''Needs networkFile (plus minutesField & onewayField for line files),
+    originIDs, originXY & destinationXY (dictionaries of ID to (x, y)) &
+    cutoff (minutes)'''
+    network = loadNetwork(task["networkFile"], task.get("minutesField", "minutes"),
+                          task.get("onewayField", ""))
+    originIDs = numpy.asarray(task["originIDs"])
+    destinationIDs = numpy.asarray(sorted(task["destinationXY"]))
+    originXY = numpy.array([task["originXY"][key] for key in originIDs.tolist()],
+                           dtype=numpy.float64).reshape(-1, 2)
+    destinationXY = numpy.array([task["destinationXY"][key] for key in destinationIDs.tolist()],
+                                dtype=numpy.float64).reshape(-1, 2)
+    originIndex, destinationIndex, lineMinutes = solvePoints(network, originXY[:, 0], originXY[:, 1],
+                                                             destinationXY[:, 0], destinationXY[:, 1],
+                                                             task["cutoff"])[:3]
+    return originIDs[originIndex], destinationIDs[destinationIndex], lineMinutes
@@ -0,0 +1,324 @@
+'''-----------------------------------------------------------------------------
+# Name:        OD_Hierarchy_Version_1.0
+# Purpose:     Build a contraction hierarchy of a local road graph once & solve
+#              many-to-many O-D matrices on it
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Nodes are contracted one at a time, least important first. A shortcut
+# edge replaces each shortest path through a contracted node unless a
+# (bounded) witness search finds another path as short. Every node keeps
+# its edges to the nodes contracted after it:
+#   forward   - edges leaving a node, upwards (CSR, one row per node)
+#   backward  - edges entering a node, upwards, stored from the node
+# A shortest path always climbs the forward edges & then comes down the
+# backward ones, so the O-D matrix is solved with buckets:
+#   1. a search up the backward edges from every destination node leaves
+#      (destination, minutes) in a bucket at each node it reaches
+#   2. a search up the forward edges from every origin node meets the
+#      buckets of the nodes it reaches; the shortest meeting is the time
+# Both searches stop at the cutoff & only climb, so they visit a few
+# hundred nodes where a Dijkstra search visits the whole catchment. The
+# hierarchy does not depend on the cutoff or the points, and is stored as
+# "hierarchy_<network key>.npz" for every later run on the same network.
+
+# Import necessary modules
+import os
+import heapq
+import numpy
+from scipy import sparse
+import od_cache_GitHub as od_cache
+import od_graph_GitHub as od_graph
+
+# Hierarchies already loaded by this process, keyed by path
+loadedHierarchies = {}
+
+# Nodes a witness search may settle before a shortcut is added anyway
+witnessLimit = 500
+
+# A function for a bounded search that avoids one node
+def witnessSearch(outEdges, source, skip, maxCost, settleLimit):
+    '''Returns the minutes of paths found from source; they are real paths,
+    so any of them no longer than a shortcut makes it unnecessary'''
+    minutes = {source: 0.0}
+    heap = [(0.0, source)]
+    settled = 0
+    while heap:
+        cost, node = heapq.heappop(heap)
+        if cost > minutes[node]:
+            continue
+        if cost > maxCost or settled >= settleLimit:
+            break
+        settled += 1
+        for neighbour, edgeCost in outEdges[node].items():
+            if neighbour == skip:
+                continue
+            total = cost + edgeCost
+            if total < minutes.get(neighbour, numpy.inf):
+                minutes[neighbour] = total
+                heapq.heappush(heap, (total, neighbour))
+    return minutes
+
+# A function for the shortcuts contracting a node needs
+def nodeShortcuts(outEdges, inEdges, node, settleLimit):
+    '''Returns (from, to, minutes) of each shortcut'''
+    shortcuts = []
+    for origin, inCost in inEdges[node].items():
+        paths = [(target, inCost + outCost) for target, outCost in outEdges[node].items()
+                 if target != origin]
+        if not paths:
+            continue
+        found = witnessSearch(outEdges, origin, node, max(cost for target, cost in paths), settleLimit)
+        shortcuts.extend((origin, target, cost) for target, cost in paths
+                         if found.get(target, numpy.inf) > cost)
+    return shortcuts
+
+# A function for building the hierarchy of a graph
+def buildHierarchy(graph, settleLimit=witnessLimit):
+    '''graph is the CSR graph of od_graph.buildGraph(). Returns a dict of the
+    rank of each node & the forward & backward upward graphs.'''
+    nodeCount = graph.shape[0]
+    edges = graph.tocoo()
+    outEdges = [{} for node in range(nodeCount)]
+    inEdges = [{} for node in range(nodeCount)]
+    for head, tail, cost in zip(edges.row.tolist(), edges.col.tolist(), edges.data.tolist()):
+        if head != tail and cost < outEdges[head].get(tail, numpy.inf):
+            outEdges[head][tail] = cost
+            inEdges[tail][head] = cost
+
+    # Priority is the edge difference plus the neighbours already contracted,
+    # which spreads contraction evenly over the network
+    contractedNeighbours = [0] * nodeCount
+    def priority(node, shortcuts):
+        return len(shortcuts) - len(outEdges[node]) - len(inEdges[node]) + contractedNeighbours[node]
+    queue = [(priority(node, nodeShortcuts(outEdges, inEdges, node, settleLimit)), node)
+             for node in range(nodeCount)]
+    heapq.heapify(queue)
+
+    rank = numpy.full(nodeCount, -1, dtype=numpy.int64)
+    upward = [[], [], [], [], [], []]
+    contracted = 0
+    while queue:
+        node = heapq.heappop(queue)[1]
+        if rank[node] >= 0:
+            continue
+        # Priorities go stale as neighbours are contracted; a node whose
+        # priority has grown goes back in the queue
+        shortcuts = nodeShortcuts(outEdges, inEdges, node, settleLimit)
+        newPriority = priority(node, shortcuts)
+        if queue and newPriority > queue[0][0]:
+            heapq.heappush(queue, (newPriority, node))
+            continue
+        rank[node] = contracted
+        contracted += 1
+        # The node's remaining edges all lead to nodes contracted later
+        for target, cost in outEdges[node].items():
+            upward[0].append(node)
+            upward[1].append(target)
+            upward[2].append(cost)
+            del inEdges[target][node]
+        for origin, cost in inEdges[node].items():
+            upward[3].append(node)
+            upward[4].append(origin)
+            upward[5].append(cost)
+            del outEdges[origin][node]
+        for neighbour in set(outEdges[node]) | set(inEdges[node]):
+            contractedNeighbours[neighbour] += 1
+        outEdges[node], inEdges[node] = {}, {}
+        for origin, target, cost in shortcuts:
+            if cost < outEdges[origin].get(target, numpy.inf):
+                outEdges[origin][target] = cost
+                inEdges[target][origin] = cost
+    forward = upwardGraph(upward[0], upward[1], upward[2], nodeCount)
+    backward = upwardGraph(upward[3], upward[4], upward[5], nodeCount)
+    return {"rank": rank, "level": nodeLevels(forward, backward), "forward": forward,
+            "backward": backward}
+
+# A function for the level of each node in the hierarchy
+def nodeLevels(forward, backward):
+    '''A node is one level above the highest node with an edge up to it, so
+    no edge joins two nodes of the same level'''
+    forward, backward = forward.tocoo(), backward.tocoo()
+    lower = numpy.concatenate([forward.row, backward.row])
+    upper = numpy.concatenate([forward.col, backward.col])
+    levels = numpy.zeros(forward.shape[0], dtype=numpy.int64)
+    while True:
+        climbed = levels.copy()
+        numpy.maximum.at(climbed, upper, levels[lower] + 1)
+        if numpy.array_equal(climbed, levels):
+            return levels
+        levels = climbed
+
+# A function for the CSR graph of upward edges
+def upwardGraph(heads, tails, costs, nodeCount):
+    '''Edges of no cost are kept as explicit zeros, which csgraph reads as edges'''
+    graph = sparse.csr_matrix((numpy.asarray(costs, dtype=numpy.float64),
+                               (numpy.asarray(heads, dtype=numpy.int64),
+                                numpy.asarray(tails, dtype=numpy.int64))),
+                              shape=(nodeCount, nodeCount))
+    graph.sort_indices()
+    return graph
+
+# A function for storing a hierarchy
+def saveHierarchy(path, hierarchy):
+    '''Written to a temporary file first so readers never see half a file'''
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+    arrays = {"rank": hierarchy["rank"], "level": hierarchy["level"]}
+    for name in ["forward", "backward"]:
+        graph = hierarchy[name]
+        arrays.update({name + "Indptr": graph.indptr, name + "Indices": graph.indices,
+                       name + "Minutes": graph.data})
+    tempPath = path + ".%s.tmp"%os.getpid()
+    with open(tempPath, "wb") as hierarchyFile:
+        numpy.savez(hierarchyFile, **arrays)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tempPath, path)
+    return path
+
+# A function for reading a stored hierarchy
+def loadHierarchy(path):
+    with numpy.load(path) as stored:
+        nodeCount = len(stored["rank"])
+        hierarchy = {"rank": stored["rank"], "level": stored["level"]}
+        for name in ["forward", "backward"]:
+            hierarchy[name] = sparse.csr_matrix((stored[name + "Minutes"], stored[name + "Indices"],
+                                                 stored[name + "Indptr"]), shape=(nodeCount, nodeCount))
+    return hierarchy
+
+# A function for the hierarchy of a local road network, built once
+def networkHierarchy(localNetwork, localMinutesField, folder):
+    '''The hierarchy is keyed like the tools' O-D cache, by the network file
+    & its travel time field (size & modification time of the file, not of
+    its folder), so an edited network gets a new one'''
+    graph = od_graph.loadNetwork(localNetwork, localMinutesField or "minutes")[0]
+    key = od_cache.cacheKey([od_cache.networkSignature(localNetwork), localMinutesField])
+    path = os.path.join(folder, "hierarchy_%s.npz"%key)
+    if path not in loadedHierarchies:
+        hierarchy = loadHierarchy(path) if os.path.exists(path) else None
+        if hierarchy is None or len(hierarchy["rank"]) != graph.shape[0]:
+            hierarchy = buildHierarchy(graph)
+            saveHierarchy(path, hierarchy)
+        loadedHierarchies[path] = hierarchy
+    return loadedHierarchies[path]
+
+# A function for the members of each group, for every line of a group
+def groupMembers(lineGroups, memberGroups, groupCount):
+    '''Returns the line & the member of each (line, member) pair'''
+    counts = numpy.bincount(memberGroups, minlength=groupCount)
+    order = numpy.argsort(memberGroups, kind="mergesort")
+    starts = numpy.cumsum(counts) - counts
+    repeats = counts[lineGroups]
+    line = numpy.repeat(numpy.arange(len(lineGroups)), repeats)
+    offset = numpy.arange(len(line)) - numpy.repeat(numpy.cumsum(repeats) - repeats, repeats)
+    return line, order[starts[lineGroups][line] + offset]
+
+# A function for searching up a hierarchy from many nodes at once
+def upwardSearch(graph, levels, startNodes, cutoff):
+    '''graph is the forward or backward graph & levels the level of each
+    node. Returns the start position, node & minutes of every node reached
+    within the cutoff. Labels are settled a level at a time: edges only
+    climb levels, so the labels on the lowest level left are final.'''
+    nodeCount = graph.shape[0]
+    indptr, indices, costs = graph.indptr, graph.indices, graph.data
+    pending = {}
+    def addLabels(start, node, minutes):
+        nodeLevels = levels[node]
+        order = numpy.argsort(nodeLevels, kind="mergesort")
+        bounds = numpy.flatnonzero(numpy.diff(nodeLevels[order])) + 1
+        for part in numpy.split(order, bounds):
+            if len(part):
+                pending.setdefault(int(nodeLevels[part[0]]), []).append((start[part], node[part],
+                                                                        minutes[part]))
+    startNodes = numpy.asarray(startNodes, dtype=numpy.int64)
+    addLabels(numpy.arange(len(startNodes)), startNodes, numpy.zeros(len(startNodes)))
+    settled = [[], [], []]
+    while pending:
+        level = min(pending)
+        start, node, minutes = [numpy.concatenate(column) for column in zip(*pending.pop(level))]
+        # The shortest label of each start & node
+        key = start * nodeCount + node
+        order = numpy.argsort(key)
+        key = key[order]
+        first = numpy.flatnonzero(numpy.concatenate([[True], key[1:] != key[:-1]]))
+        minutes = numpy.minimum.reduceat(minutes[order], first) if len(first) else minutes[:0]
+        start, node = start[order[first]], node[order[first]]
+        for column, values in zip(settled, (start, node, minutes)):
+            column.append(values)
+        # Relax the edges up from the settled labels
+        repeats = indptr[node + 1] - indptr[node]
+        label = numpy.repeat(numpy.arange(len(node)), repeats)
+        offset = numpy.arange(len(label)) - numpy.repeat(numpy.cumsum(repeats) - repeats, repeats)
+        edge = indptr[node][label] + offset
+        reached = minutes[label] + costs[edge]
+        keep = reached <= cutoff
+        if keep.any():
+            addLabels(start[label][keep], indices[edge][keep].astype(numpy.int64), reached[keep])
+    if not settled[0]:
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0)
+    return [numpy.concatenate(column) for column in settled]
+
+# A function for solving an O-D matrix between snapped points
+def solveOD(hierarchy, originNodes, destinationNodes, cutoff, chunkCells=10000000):
+    '''Same lines as od_graph.solveOD(): origin positions, destination
+    positions & minutes of every pair within the cutoff. Points on the same
+    node share one search.'''
+    originNodes = numpy.asarray(originNodes, dtype=numpy.int64)
+    destinationNodes = numpy.asarray(destinationNodes, dtype=numpy.int64)
+    sources, sourceOfOrigin = numpy.unique(originNodes, return_inverse=True)
+    targets, targetOfDestination = numpy.unique(destinationNodes, return_inverse=True)
+    cutoff = float(cutoff)
+    levels = hierarchy["level"]
+
+    # Buckets: the destinations that reach each node going up, sorted by
+    # node & minutes
+    bucketTarget, bucketNode, bucketMinutes = upwardSearch(hierarchy["backward"], levels, targets, cutoff)
+    order = numpy.lexsort((bucketMinutes, bucketNode))
+    bucketNode, bucketTarget, bucketMinutes = bucketNode[order], bucketTarget[order], bucketMinutes[order]
+    # One sorted key per bucket entry, spaced so a node's entries never
+    # reach the next node's
+    span = 2.0 * cutoff + 1.0
+    bucketKey = bucketNode * span + bucketMinutes
+    bucketStart = numpy.searchsorted(bucketNode, numpy.arange(len(levels)))
+
+    # Origins reach the buckets going up; only bucket entries that keep the
+    # total within the cutoff are met
+    labelSource, labelNode, upMinutes = upwardSearch(hierarchy["forward"], levels, sources, cutoff)
+    first = bucketStart[labelNode]
+    last = numpy.searchsorted(bucketKey, labelNode * span + (cutoff - upMinutes) + 1e-9, side="right")
+    order = numpy.argsort(labelSource, kind="mergesort")
+    labelSource, upMinutes, first, last = labelSource[order], upMinutes[order], first[order], last[order]
+    # The shortest meeting of each pair is its travel time, kept in a dense
+    # block of about chunkCells pairs at a time
+    blockSources = min(max(chunkCells // max(len(targets), 1), 1), max(len(sources), 1))
+    bounds = numpy.searchsorted(labelSource, numpy.arange(blockSources, len(sources), blockSources))
+    sourceParts, targetParts, minuteParts = [], [], []
+    for block, labels in enumerate(numpy.split(numpy.arange(len(labelSource)), bounds)):
+        repeats = last[labels] - first[labels]
+        entry = numpy.repeat(labels, repeats)
+        offset = numpy.arange(len(entry)) - numpy.repeat(numpy.cumsum(repeats) - repeats, repeats)
+        meeting = first[entry] + offset
+        times = numpy.full((min(blockSources, len(sources) - block * blockSources), len(targets)), numpy.inf)
+        numpy.minimum.at(times, (labelSource[entry] - block * blockSources, bucketTarget[meeting]),
+                         upMinutes[entry] + bucketMinutes[meeting])
+        rows, columns = numpy.nonzero(times <= cutoff)
+        sourceParts.append(rows + block * blockSources)
+        targetParts.append(columns)
+        minuteParts.append(times[rows, columns])
+    lineSource, lineTarget, lineMinutes = [numpy.concatenate(part) for part in
+                                           (sourceParts, targetParts, minuteParts)]
+
+    # Every origin & destination on a node gets the node's lines
+    line, originIndex = groupMembers(lineSource, sourceOfOrigin.ravel(), len(sources))
+    lineTarget, lineMinutes = lineTarget[line], lineMinutes[line]
+    line, destinationIndex = groupMembers(lineTarget, targetOfDestination.ravel(), len(targets))
+    return originIndex[line], destinationIndex, lineMinutes[line]
+
+# A function for an od_graph.solvePoints() solver using a hierarchy
+def hierarchySolver(hierarchy):
+    return lambda graph, originNodes, destinationNodes, cutoff: solveOD(hierarchy, originNodes,
+                                                                          destinationNodes, cutoff)
@@ -0,0 +1,173 @@
+'''-----------------------------------------------------------------------------
+# Name:        OD_Locations_Version_1.0
+# Purpose:     Keep the network locations points were snapped to, so
+#              AddLocations does not search the network again every run
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# A location folder holds one "locations_<network>_<signature>.npz" file
+# per network dataset, with the Network Analyst location fields of every
+# point snapped to it. The signature changes with the network's data (see
+# od_cache.networkSignature), so points are snapped again after an edit,
+# & the file of the earlier state is removed once the new one is written.
+# Each file holds:
+#   keys        - "<point layer path>|<point ID>"
+#   hashes      - hash of the point's coordinates
+#   SourceID, SourceOID, PosAlong, SideOfEdge
+# A point is only snapped (with CalculateLocations) when its key is new or
+# its coordinates hash differently; the others get their stored fields.
+# AddLocations loads points carrying these fields without searching the
+# network, as NAClassFieldMappings maps them by name.
+
+# Import necessary modules
+import os
+import numpy
+import sfca_core_GitHub as sfca_core
+import od_cache_GitHub as od_cache
+import od_parallel_GitHub as od_parallel
+import sfca_tables_GitHub as sfca_tables
+
+# Field holding the input ObjectID of each point of a copy
+inputOID = "Input_OID"
+
+# Network location fields, with their field types & array types
+locationFields = [("SourceID", "LONG", numpy.int32), ("SourceOID", "LONG", numpy.int32),
+                  ("PosAlong", "DOUBLE", numpy.float64), ("SideOfEdge", "SHORT", numpy.int16)]
+
+# A function for the location file of a network
+def locationsPath(locationFolder, networkDataset, networkVersion=""):
+    return os.path.join(locationFolder, "locations_%s_%s.npz"%(
+        od_cache.cacheKey([os.path.abspath(networkDataset)])[:16],
+        od_cache.networkSignature(networkDataset, networkVersion)))
+
+# A function for hashing point coordinates
+def geometryHashes(xs, ys):
+    '''One 64-bit hash per point, from the bits of its x & y'''
+    xBits = numpy.ascontiguousarray(xs, dtype=numpy.float64).view(numpy.uint64)
+    yBits = numpy.ascontiguousarray(ys, dtype=numpy.float64).view(numpy.uint64)
+    with numpy.errstate(over="ignore"):
+        return (xBits * numpy.uint64(0x9E3779B97F4A7C15)) ^ yBits
+
+# A function for reading stored locations
+def loadLocations(path):
+    '''Returns a dict of arrays, empty if nothing is stored yet'''
+    if not os.path.exists(path):
+        return {}
+    with numpy.load(path) as stored:
+        return dict((name, stored[name]) for name in stored.files)
+
+# A function for storing locations
+def saveLocations(path, locations):
+    '''Written to a temporary file first so readers never see half a file'''
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+    tempPath = path + ".%s.tmp"%os.getpid()
+    with open(tempPath, "wb") as locationFile:
+        numpy.savez(locationFile, **locations)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tempPath, path)
+    # Files of the same network in an earlier state are stale
+    prefix = os.path.basename(path).rsplit("_", 1)[0] + "_"
+    for name in os.listdir(folder or "."):
+        if name.startswith(prefix) and name.endswith(".npz") and name != os.path.basename(path):
+            os.remove(os.path.join(folder, name))
+    return path
+
+# A function for looking up the stored locations of points
+def storedLocations(locations, keys, hashes):
+    '''Returns a mask of the points stored with the same coordinates & the
+    location fields of those points'''
+    keys = numpy.asarray(keys).astype(str)
+    found = numpy.zeros(len(keys), dtype=bool)
+    values = dict((field, numpy.zeros(len(keys), dtype=dtype)) for field, fieldType, dtype in locationFields)
+    if not locations or not len(keys):
+        return found, values
+    position = sfca_core.mapIndex(locations["keys"], keys)
+    known = position >= 0
+    found[known] = locations["hashes"][position[known]] == hashes[known]
+    for field, fieldType, dtype in locationFields:
+        values[field][found] = locations[field][position[found]]
+    return found, values
+
+# A function for adding points to stored locations
+def mergeLocations(locations, keys, hashes, values):
+    '''Entries of the same keys are replaced'''
+    keys = numpy.asarray(keys).astype(str)
+    merged = {"keys": keys, "hashes": numpy.asarray(hashes, dtype=numpy.uint64)}
+    for field, fieldType, dtype in locationFields:
+        merged[field] = numpy.asarray(values[field], dtype=dtype)
+    if not locations:
+        return merged
+    kept = ~numpy.isin(locations["keys"], keys)
+    for name in merged:
+        merged[name] = numpy.concatenate([locations[name][kept], merged[name]])
+    return merged
+
+# A function for a copy of points carrying their network locations
+def locatedPoints(points, idField, networkDataset, locationFolder, name):
+    '''idField (e.g. "OID@") identifies the points within their layer. The
+    points are written to the scratch geodatabase with their IDs (ObjectIDs
+    go to Input_OID, as the copy has ObjectIDs of its own) & their stored
+    locations, & only new or moved points are snapped. Only points that
+    were located are stored. Returns the copy & the number of points
+    snapped.'''
+    import arcpy
+    path = locationsPath(locationFolder, networkDataset)
+    sourcePath = arcpy.Describe(points).catalogPath
+
+    # Points are keyed within the layer they came from, by their IDs there
+    rows = [row for row in arcpy.da.SearchCursor(points, [idField, "SHAPE@X", "SHAPE@Y"])]
+    ids = numpy.array([row[0] for row in rows])
+    xs = numpy.array([row[1] for row in rows], dtype=numpy.float64)
+    ys = numpy.array([row[2] for row in rows], dtype=numpy.float64)
+    keys = numpy.array(["%s|%s"%(sourcePath, pointID) for pointID in ids.tolist()]).astype(str)
+    hashes = geometryHashes(xs, ys)
+    locations = loadLocations(path)
+    found, values = storedLocations(locations, keys, hashes)
+    for field, fieldType, dtype in locationFields:
+        values[field][~found] = -1
+
+    # The copy is written in one bulk operation, stored fields & all
+    if ids.dtype.kind in "iu":
+        ids = sfca_tables.longIDs(ids)
+    elif ids.dtype.kind != "f":
+        ids = ids.astype(str)
+    idName = inputOID if idField == "OID@" else idField
+    array = numpy.zeros(len(rows), dtype=[(str(idName), ids.dtype), ("X", numpy.float64), ("Y", numpy.float64)] +
+                                         [(field, dtype) for field, fieldType, dtype in locationFields])
+    array[str(idName)] = ids
+    array["X"] = xs
+    array["Y"] = ys
+    for field, fieldType, dtype in locationFields:
+        array[field] = values[field]
+    located = os.path.join(arcpy.env.scratchGDB, name)
+    if arcpy.Exists(located):
+        arcpy.Delete_management(located)
+    arcpy.da.NumPyArrayToFeatureClass(array, located, ("X", "Y"), arcpy.Describe(points).spatialReference)
+
+    snapped = int((~found).sum())
+    if snapped:
+        # Only points that are new or moved are searched for on the network;
+        # the copy's ObjectIDs follow the order its rows were written in
+        oidField = arcpy.Describe(located).OIDFieldName
+        oids = numpy.array([row[0] for row in arcpy.da.SearchCursor(located, ["OID@"])], dtype=numpy.int64)
+        where = "" if snapped == len(oids) else od_parallel.oidWhere(oidField, oids[~found], True)
+        snapLayer = arcpy.MakeFeatureLayer_management(located, name + "_snap", where)
+        arcpy.na.CalculateLocations(snapLayer, networkDataset)
+        fields = [field for field, fieldType, dtype in locationFields]
+        snappedRows = [row for row in arcpy.da.SearchCursor(snapLayer, ["OID@"] + fields)]
+        position = sfca_core.mapIndex(oids, numpy.array([row[0] for row in snappedRows], dtype=numpy.int64))
+        for index, row in zip(position.tolist(), snappedRows):
+            for field, value in zip(fields, row[1:]):
+                values[field][index] = -1 if value is None else value
+        arcpy.Delete_management(snapLayer)
+        # Points the network could not locate are snapped again next time
+        stored = ~found & (values["SourceID"] >= 0)
+        if stored.any():
+            saveLocations(path, mergeLocations(locations, keys[stored], hashes[stored],
+                                               dict((field, values[field][stored]) for field in fields)))
+    return located, snapped
@@ -0,0 +1,128 @@
+'''-----------------------------------------------------------------------------
+# Name:        OD_Network_Version_1.0
+# Purpose:     Solve Origin-Destination matrices with ArcGIS Network Analyst,
+#              matching lines with the input points through their ObjectIDs
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Shared by the tools & the worker processes of od_parallel, so solving a
+# batch does not import a tool (& check out its license) in every worker.
+
+# Import necessary modules
+import os
+import numpy
+import sfca_core_GitHub as sfca_core
+import od_locations_GitHub as od_locations
+
+# Impedance & accumulation are in minutes
+minutes = "Minutes"
+accumMinutes = "Total_Minutes"
+# Field carrying each point's input ObjectID through an O-D solve
+inputOID = od_locations.inputOID
+
+# A function for reading table fields into arrays
+def readColumns(table, fields):
+    '''NULL values are read as 0'''
+    import arcpy
+    rows = [tuple(0 if value is None else value for value in row)
+            for row in arcpy.da.SearchCursor(table, fields)]
+    if not rows:
+        return [numpy.array([]) for field in fields]
+    return [numpy.array(column) for column in zip(*rows)]
+
+# A function for solving an O-D matrix & returning a table view of its lines
+def solveODMatrix(networkDataset, layerName, distance, originPoints,
+                  destinationPoints, ordinal):
+    '''ordinal ("first", "second") is only used in messages. Returns the
+    origin & destination ObjectIDs (of the input points, see idPoints()) &
+    Total_Minutes of every line.'''
+    import arcpy
+    try:
+        arcpy.CheckOutExtension("Network")
+        odNALayer = arcpy.na.MakeODCostMatrixLayer(networkDataset, layerName, minutes,
+                                                   distance, "", [minutes])
+        # Get layer object
+        odLayer = odNALayer.getOutput(0)
+        # Identify sub-layers
+        subLayers = arcpy.na.GetNAClassNames(odLayer)
+        # Variables for easy use of Origins & Desintations layers
+        origins = subLayers["Origins"]
+        destinations = subLayers["Destinations"]
+        # Points carrying their input ObjectIDs, which Network Analyst keeps
+        originIDPoints = idPoints(originPoints, os.path.join("in_memory", layerName + "OriginIDs"))
+        destinationIDPoints = idPoints(destinationPoints, os.path.join("in_memory", layerName + "DestinationIDs"))
+        # Get location fields
+        fieldsO = arcpy.ListFields(originIDPoints)
+        fieldsD = arcpy.ListFields(destinationIDPoints)
+        # Origins
+        arcpy.na.AddFieldToAnalysisLayer(odLayer, origins, inputOID, "LONG")
+        fieldmapO = arcpy.na.NAClassFieldMappings(odLayer, origins, True, fieldsO)
+        fieldmapO[inputOID].mappedFieldName = inputOID
+        # Add Locations for Origins
+        arcpy.AddMessage("Adding Origins...")
+        arcpy.na.AddLocations(odLayer, origins, originIDPoints, fieldmapO, "")
+        # Destinations
+        arcpy.na.AddFieldToAnalysisLayer(odLayer, destinations, inputOID, "LONG")
+        fieldmapD = arcpy.na.NAClassFieldMappings(odLayer, destinations, True, fieldsD)
+        fieldmapD[inputOID].mappedFieldName = inputOID
+        # Add locations for Destinations
+        arcpy.AddMessage("Adding Destinations...")
+        arcpy.na.AddLocations(odLayer, destinations, destinationIDPoints, fieldmapD, "")
+        # Solve
+        arcpy.AddMessage("Solving Origin-Destination Matrix...")
+        arcpy.na.Solve(odLayer)
+        # Dictionary for accessing to solved sublayers
+        lyrDict = dict((lyr.datasetName, lyr) for lyr in arcpy.mapping.ListLayers(odLayer)[1:])
+        # Lines are matched with the inputs through the ObjectIDs each
+        # location was loaded with, not through the order they were loaded in
+        arcpy.AddMessage("Reading Origin-Destination Matrix...")
+        originOIDs, originIDs = readColumns(lyrDict["Origins"], ["OID@", inputOID])
+        destinationOIDs, destinationIDs = readColumns(lyrDict["Destinations"], ["OID@", inputOID])
+        lineOrigins, lineDestinations, lineMinutes = readColumns(lyrDict["ODLines"], ["OriginID", "DestinationID",
+                                                                                     accumMinutes])
+        arcpy.Delete_management(odLayer)
+        for copied, points in ((originIDPoints, originPoints), (destinationIDPoints, destinationPoints)):
+            if copied != points:
+                arcpy.Delete_management(copied)
+    except:
+        ODMatrixError = arcpy.GetMessages(2)
+        arcpy.AddMessage(ODMatrixError)
+        arcpy.AddError("The %s O-D Matrix could not be completed."%ordinal)
+        raise
+    finally:
+        arcpy.CheckInExtension("Network")
+    originIndex = sfca_core.mapIndex(originOIDs, lineOrigins)
+    destinationIndex = sfca_core.mapIndex(destinationOIDs, lineDestinations)
+    found = (originIndex >= 0) & (destinationIndex >= 0)
+    return (originIDs[originIndex[found]].astype(numpy.int64),
+            destinationIDs[destinationIndex[found]].astype(numpy.int64),
+            lineMinutes[found].astype(numpy.float64))
+
+# A function for points carrying their ObjectIDs in a field
+def idPoints(points, path, copy=False):
+    '''Network Analyst cannot map the ObjectID field, so points are written
+    to path with their ObjectIDs in Input_OID, along with any network
+    location fields. Points that have Input_OID already are used as they
+    are, or copied with it if copy is set. Only the selected points of a
+    layer are written.'''
+    import arcpy
+    names = [field.name for field in arcpy.ListFields(points)]
+    if inputOID in names and not copy:
+        return points
+    idField = inputOID if inputOID in names else "OID@"
+    kept = [(field, dtype) for field, fieldType, dtype in od_locations.locationFields if field in names]
+    rows = arcpy.da.FeatureClassToNumPyArray(points, [idField, "SHAPE@X", "SHAPE@Y"] +
+                                             [field for field, dtype in kept], null_value=-1)
+    array = numpy.zeros(len(rows), dtype=[(inputOID, numpy.int32), ("X", numpy.float64),
+                                          ("Y", numpy.float64)] + kept)
+    array[inputOID] = rows[idField]
+    array["X"] = rows["SHAPE@X"]
+    array["Y"] = rows["SHAPE@Y"]
+    for field, dtype in kept:
+        array[field] = rows[field]
+    if arcpy.Exists(path):
+        arcpy.Delete_management(path)
+    arcpy.da.NumPyArrayToFeatureClass(array, path, ("X", "Y"), arcpy.Describe(points).spatialReference)
+    return path
@@ -0,0 +1,214 @@
+'''-----------------------------------------------------------------------------
+# Name:        OD_Parallel_Version_1.0
+# Purpose:     Solve Origin-Destination matrices in parallel worker processes,
+#              one batch of origins per task
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# A solver is any top-level function that takes a task dictionary and
+# returns (originIDs, destinationIDs, minutes) arrays for the task's batch
+# of origins. Every task carries its own scratch workspace, so workers never
+# share NA layers or scratch data. Results come back in task order, so the
+# merged matrix does not depend on which worker finished first.
+#
+# networkAnalystSolver() solves with ArcGIS Network Analyst.
+# straightLineSolver() needs only NumPy and stands in for it where no
+# license is available (e.g. for testing on Linux).
+
+# Import necessary modules
+import os
+import sys
+import shutil
+import tempfile
+import multiprocessing
+import numpy
+import od_prefilter_GitHub as od_prefilter
+
+# A function for splitting origins into batches of tasks
+def originTasks(originIDs, batchSize, common):
+    '''common holds the settings every task shares (paths, cutoff, etc.)'''
+    originIDs = numpy.asarray(originIDs)
+    tasks = []
+    for start in range(0, len(originIDs), max(int(batchSize), 1)):
+        task = dict(common)
+        task["originIDs"] = originIDs[start:start + batchSize]
+        task["batch"] = len(tasks)
+        tasks.append(task)
+    return tasks
+
+# A function for reading ObjectIDs & coordinates in ObjectID order
+def sortedPoints(points, idField="OID@"):
+    '''Returns ObjectIDs (or the IDs of idField), Xs & Ys'''
+    import arcpy
+    rows = sorted(arcpy.da.SearchCursor(points, [idField, "SHAPE@X", "SHAPE@Y"]))
+    if not rows:
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0), numpy.zeros(0)
+    oids, xs, ys = zip(*rows)
+    return (numpy.array(oids, dtype=numpy.int64), numpy.array(xs, dtype=numpy.float64),
+            numpy.array(ys, dtype=numpy.float64))
+
+# Most ObjectIDs in one IN list of a where clause
+inListSize = 1000
+
+# A function for a where clause selecting ObjectIDs
+def oidWhere(oidField, oids, listed):
+    '''listed selects exactly the given ObjectIDs, otherwise their range.
+    Listed runs of consecutive ObjectIDs become ranges & the rest IN lists
+    of at most inListSize, so the clause stays within what databases take.'''
+    if not listed:
+        return "%s >= %s AND %s <= %s"%(oidField, int(min(oids)), oidField, int(max(oids)))
+    oids = numpy.unique(numpy.asarray(oids, dtype=numpy.int64))
+    if not len(oids):
+        return "%s IN (-1)"%oidField
+    breaks = numpy.flatnonzero(numpy.diff(oids) != 1) + 1
+    starts = numpy.concatenate([[0], breaks])
+    ends = numpy.concatenate([breaks, [len(oids)]])
+    clauses, singles = [], []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if end - start > 2:
+            clauses.append("(%s >= %s AND %s <= %s)"%(oidField, oids[start], oidField, oids[end - 1]))
+        else:
+            singles.extend(oids[start:end].tolist())
+    for start in range(0, len(singles), inListSize):
+        clauses.append("%s IN (%s)"%(oidField, ",".join(str(oid) for oid in singles[start:start + inListSize])))
+    return clauses[0] if len(clauses) == 1 else "(%s)"%" OR ".join(clauses)
+
+# A function for the Network Analyst tasks of an O-D matrix
+def networkAnalystTasks(networkDataset, cutoff, originPoints, destinationPoints,
+                        batchSize, workers, scratchFolder, maxSpeed=0):
+    '''Origins are split into batches of batchSize (one batch per worker if
+    0). With a maximum speed, origins & destinations out of straight-line
+    reach are left out of each batch. Returns the tasks, the pairs skipped &
+    the pairs there were. Workers reopen the points by path, which would
+    lose a layer's selection & definition query, so the points are copied
+    (to a geodatabase in scratchFolder) with their ObjectIDs in Input_OID.'''
+    import arcpy
+    import od_network_GitHub as od_network
+    pointsFolder = tempfile.mkdtemp(prefix="od_points_", dir=scratchFolder or None)
+    pointsGDB = arcpy.CreateFileGDB_management(pointsFolder, "points.gdb").getOutput(0)
+    originPoints = od_network.idPoints(originPoints, os.path.join(pointsGDB, "origins"), True)
+    destinationPoints = od_network.idPoints(destinationPoints, os.path.join(pointsGDB, "destinations"), True)
+    originOIDs, originX, originY = sortedPoints(originPoints, od_network.inputOID)
+    destOIDs, destX, destY = sortedPoints(destinationPoints, od_network.inputOID)
+    totalPairs = len(originOIDs) * len(destOIDs)
+    common = {"networkDataset": networkDataset,
+              "originPoints": originPoints,
+              "destinationPoints": destinationPoints,
+              "cutoff": cutoff,
+              "scratchFolder": scratchFolder}
+    if maxSpeed > 0:
+        radius = od_prefilter.reachRadius(cutoff, maxSpeed)
+        originMask = od_prefilter.reachableMasks(originX, originY, destX, destY, radius)[0]
+        originOIDs, originX, originY = originOIDs[originMask], originX[originMask], originY[originMask]
+    if batchSize <= 0:
+        batchSize = max(-(-len(originOIDs)//max(workers, 1)), 1)
+    tasks = originTasks(originOIDs, batchSize, common)
+    if maxSpeed <= 0:
+        return tasks, 0, totalPairs
+    # Each batch only gets the destinations within reach of its origins
+    keptPairs = 0
+    for task in tasks:
+        batch = slice(task["batch"] * batchSize, task["batch"] * batchSize + batchSize)
+        destMask = od_prefilter.reachableMasks(originX[batch], originY[batch], destX, destY,
+                                               radius)[1]
+        task["destinationOIDs"] = destOIDs[destMask]
+        task["listed"] = True
+        keptPairs += len(task["originIDs"]) * int(destMask.sum())
+    return tasks, totalPairs - keptPairs, totalPairs
+
+# A function for running one task in its own scratch workspace
+def runTask(solverTask):
+    '''The workspace is removed once the task has finished'''
+    solver, task = solverTask
+    task = dict(task)
+    task["workspace"] = tempfile.mkdtemp(prefix="od_batch_%s_"%task.get("batch", 0),
+                                         dir=task.get("scratchFolder") or None)
+    try:
+        return solver(task)
+    finally:
+        shutil.rmtree(task["workspace"], ignore_errors=True)
+
+# A function for finding a Python interpreter for the workers
+def pythonExecutable():
+    '''Inside ArcMap sys.executable is ArcMap itself, so point
+    multiprocessing at the Python that ships with it'''
+    if os.path.basename(sys.executable).lower().startswith("python"):
+        return sys.executable
+    for name in ("python.exe", "pythonw.exe", "python"):
+        candidate = os.path.join(sys.exec_prefix, name)
+        if os.path.exists(candidate):
+            return candidate
+    return sys.executable
+
+# A function for solving tasks in parallel
+def solveParallel(solver, tasks, workers):
+    '''Yields each task's (originIDs, destinationIDs, minutes) in task order;
+    one worker (or one task) runs in this process'''
+    jobs = [(solver, task) for task in tasks]
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield runTask(job)
+        return
+    multiprocessing.set_executable(pythonExecutable())
+    pool = multiprocessing.Pool(min(workers, len(jobs)))
+    try:
+        for result in pool.imap(runTask, jobs):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+# A stand-in solver using straight-line travel times
+def straightLineSolver(task):
+    '''Needs originIDs, originXY & destinationXY (dictionaries of ID to
+    (x, y)), speed (map units per minute) & cutoff (minutes)'''
+    originIDs = numpy.asarray(task["originIDs"])
+    destinationIDs = numpy.asarray(sorted(task["destinationXY"]))
+    if len(originIDs) == 0 or len(destinationIDs) == 0:
+        return originIDs[:0], destinationIDs[:0], numpy.zeros(0)
+    originXY = numpy.array([task["originXY"][key] for key in originIDs.tolist()], dtype=numpy.float64)
+    destinationXY = numpy.array([task["destinationXY"][key] for key in destinationIDs.tolist()],
+                                dtype=numpy.float64)
+    distances = numpy.hypot(originXY[:, 0:1] - destinationXY[:, 0],
+                            originXY[:, 1:2] - destinationXY[:, 1])
+    travelMinutes = distances / float(task["speed"])
+    rows, columns = numpy.nonzero(travelMinutes <= task["cutoff"])
+    return originIDs[rows], destinationIDs[columns], travelMinutes[rows, columns]
+
+# A solver using ArcGIS Network Analyst
+def networkAnalystSolver(task):
+    '''Needs networkDataset, originPoints & destinationPoints (paths of
+    points with their input ObjectIDs in Input_OID), originIDs (input
+    ObjectIDs of the batch) & cutoff; destinationOIDs & listed (exact
+    ObjectID lists rather than ranges) are optional. Returns input
+    ObjectIDs, which od_network.solveODMatrix() carries through the solve.'''
+    import arcpy
+    import od_network_GitHub as od_network
+    destinationIDs = task.get("destinationOIDs")
+    if len(task["originIDs"]) == 0 or (destinationIDs is not None and len(destinationIDs) == 0):
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0)
+    previousScratch = arcpy.env.scratchWorkspace
+    arcpy.env.overwriteOutput = True
+    arcpy.env.scratchWorkspace = task["workspace"]
+    try:
+        layerName = "odBatch%s"%task["batch"]
+        listed = task.get("listed", False)
+        oidField = arcpy.AddFieldDelimiters(task["originPoints"], od_network.inputOID)
+        batchPoints = arcpy.MakeFeatureLayer_management(task["originPoints"], layerName + "Points",
+                                                        oidWhere(oidField, task["originIDs"], listed))
+        destinationPoints = task["destinationPoints"]
+        if destinationIDs is not None:
+            destField = arcpy.AddFieldDelimiters(destinationPoints, od_network.inputOID)
+            destinationPoints = arcpy.MakeFeatureLayer_management(destinationPoints,
+                                                                  layerName + "Destinations",
+                                                                  oidWhere(destField, destinationIDs, True))
+        lines = od_network.solveODMatrix(task["networkDataset"], layerName, task["cutoff"], batchPoints,
+                                         destinationPoints, "batch %s"%(task["batch"] + 1))
+        arcpy.Delete_management(batchPoints)
+        if destinationIDs is not None:
+            arcpy.Delete_management(destinationPoints)
+    finally:
+        arcpy.env.scratchWorkspace = previousScratch
+    return lines
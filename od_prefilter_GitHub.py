@@ -0,0 +1,48 @@
+'''-----------------------------------------------------------------------------
+# Name:        OD_Prefilter_Version_1.0
+# Purpose:     Skip Origin-Destination pairs that cannot be inside the
+#              catchment before they are solved
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# No route can be faster than a straight line at the network's maximum
+# speed, so a pair further apart than cutoff x maximum speed cannot be in
+# the catchment. The maximum speed is in map units per minute and must be a
+# true upper bound (allow for the distance points are snapped to the
+# network), otherwise pairs that are in reach will be lost.
+
+# Import necessary modules
+import numpy
+from scipy.spatial import cKDTree
+
+# A function for the straight-line reach of the catchment
+def reachRadius(cutoff, maxSpeed):
+    return float(cutoff) * float(maxSpeed)
+
+# A function for the points that have any partner within reach
+def reachableMasks(originX, originY, destinationX, destinationY, radius):
+    '''Returns a mask of origins & a mask of destinations'''
+    originXY = numpy.column_stack([originX, originY]).astype(numpy.float64).reshape(-1, 2)
+    destinationXY = numpy.column_stack([destinationX, destinationY]).astype(numpy.float64).reshape(-1, 2)
+    if len(originXY) == 0 or len(destinationXY) == 0:
+        return numpy.zeros(len(originXY), dtype=bool), numpy.zeros(len(destinationXY), dtype=bool)
+    # A little slack, so pairs exactly at the radius are kept
+    bound = radius * (1.0 + 1e-9) + 1e-9
+    originDistance = cKDTree(destinationXY).query(originXY, distance_upper_bound=bound)[0]
+    destinationDistance = cKDTree(originXY).query(destinationXY, distance_upper_bound=bound)[0]
+    return numpy.isfinite(originDistance), numpy.isfinite(destinationDistance)
+
+# A function for the pairs left to solve once unreachable points are dropped
+def prunedPairs(originMask, destinationMask):
+    '''Returns the pairs skipped & the pairs there were'''
+    totalPairs = len(originMask) * len(destinationMask)
+    return totalPairs - int(originMask.sum()) * int(destinationMask.sum()), totalPairs
+
+# A function for describing what the pre-filter skipped
+def prunedNote(skippedPairs, totalPairs):
+    if totalPairs == 0:
+        return "0 of 0 pairs pruned"
+    return "%s of %s pairs pruned (%.1f%%)"%(skippedPairs, totalPairs,
+                                             100.0 * skippedPairs/totalPairs)
@@ -0,0 +1,214 @@
+'''-----------------------------------------------------------------------------
+# Name:        OD_Store_Version_1.0
+# Purpose:     Keep a solved O-D matrix on disk as memory-mapped arrays
+#              indexed by origin & by destination
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# A store is a folder of .npy files:
+#   supplyKeys, demandKeys  - point keys (text), in the order of the run
+#   supplyIndptr            - CSR row pointers, one row per supply point
+#   supplyIndices, minutes  - demand position (int32) & minutes (float32)
+#                             of each line, sorted by supply point
+#   demandIndptr            - CSC column pointers, one per demand point
+#   demandIndices           - supply position (int32) of each line, sorted
+#                             by demand point
+#   demandOrder             - position of those lines in the CSR arrays
+# and store.json, written last, with the counts. Opened stores are memory
+# maps, so the lines of one point are read in O(degree) & whole-matrix
+# passes read slices of the files without copying them. A store is built
+# from streamed chunks without holding the whole matrix in memory.
+
+# Import necessary modules
+import os
+import json
+import numpy
+
+# Arrays of a store
+storeArrays = ["supplyKeys", "demandKeys", "supplyIndptr", "supplyIndices", "minutes",
+               "demandIndptr", "demandIndices", "demandOrder"]
+# Lines handled at a time while a store is built
+buildLines = 1000000
+
+# A function for writing a store
+def buildStore(folder, supplyKeys, demandKeys, chunks, chunkLines=buildLines):
+    '''chunks yields (supplyIndex, demandIndex, minutes); an existing store in
+    the folder is replaced. Chunks are spilled to disk as they come & the
+    arrays are filled from the spill by counting sort, chunkLines lines at a
+    time, so memory is bounded by the chunk size & the point counts.'''
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    manifest = os.path.join(folder, "store.json")
+    if os.path.exists(manifest):
+        os.remove(manifest)
+    supplyKeys = numpy.asarray(supplyKeys).astype(str)
+    demandKeys = numpy.asarray(demandKeys).astype(str)
+
+    # Pass 1: spill the lines & count them by supply & demand point
+    supplyCounts = numpy.zeros(len(supplyKeys), dtype=numpy.int64)
+    demandCounts = numpy.zeros(len(demandKeys), dtype=numpy.int64)
+    spillPaths = [os.path.join(folder, "spill_%s.bin"%name) for name in ("supply", "demand", "minutes")]
+    spillTypes = [numpy.int32, numpy.int32, numpy.float32]
+    spillFiles = [open(path, "wb") for path in spillPaths]
+    try:
+        for chunk in chunks:
+            if not len(chunk[0]):
+                continue
+            supplyCounts += numpy.bincount(numpy.asarray(chunk[0], dtype=numpy.int64), minlength=len(supplyKeys))
+            demandCounts += numpy.bincount(numpy.asarray(chunk[1], dtype=numpy.int64), minlength=len(demandKeys))
+            for spillFile, column, dtype in zip(spillFiles, chunk, spillTypes):
+                numpy.asarray(column).astype(dtype).tofile(spillFile)
+    finally:
+        for spillFile in spillFiles:
+            spillFile.close()
+    lineCount = int(supplyCounts.sum())
+    supplyIndptr = numpy.concatenate([[0], numpy.cumsum(supplyCounts)]).astype(numpy.int64)
+    demandIndptr = numpy.concatenate([[0], numpy.cumsum(demandCounts)]).astype(numpy.int64)
+
+    # Pass 2: rows by supply point, each row sorted by demand point
+    spill = [spilledArray(path, dtype, lineCount) for path, dtype in zip(spillPaths, spillTypes)]
+    supplyIndices = storeArray(folder, "supplyIndices", numpy.int32, lineCount)
+    minutes = storeArray(folder, "minutes", numpy.float32, lineCount)
+    nextSlot = supplyIndptr[:-1].copy()
+    for start in range(0, lineCount, chunkLines):
+        slots = countingSlots(numpy.asarray(spill[0][start:start + chunkLines], dtype=numpy.int64), nextSlot)
+        supplyIndices[slots] = spill[1][start:start + chunkLines]
+        minutes[slots] = spill[2][start:start + chunkLines]
+    spill = None
+    for row, lastRow in rowBlocks(supplyIndptr, chunkLines):
+        start, end = supplyIndptr[row], supplyIndptr[lastRow]
+        rows = numpy.repeat(numpy.arange(row, lastRow), numpy.diff(supplyIndptr[row:lastRow + 1]))
+        order = numpy.lexsort((supplyIndices[start:end], rows))
+        supplyIndices[start:end] = supplyIndices[start:end][order]
+        minutes[start:end] = minutes[start:end][order]
+
+    # Pass 3: columns by demand point, pointing back into the rows; rows are
+    # read in supply order, so each column comes out sorted by supply point
+    demandIndices = storeArray(folder, "demandIndices", numpy.int32, lineCount)
+    demandOrder = storeArray(folder, "demandOrder", numpy.int64, lineCount)
+    nextSlot = demandIndptr[:-1].copy()
+    for row, lastRow in rowBlocks(supplyIndptr, chunkLines):
+        start, end = supplyIndptr[row], supplyIndptr[lastRow]
+        slots = countingSlots(numpy.asarray(supplyIndices[start:end], dtype=numpy.int64), nextSlot)
+        demandIndices[slots] = numpy.repeat(numpy.arange(row, lastRow), numpy.diff(supplyIndptr[row:lastRow + 1]))
+        demandOrder[slots] = numpy.arange(start, end)
+    for array in (supplyIndices, minutes, demandIndices, demandOrder):
+        if isinstance(array, numpy.memmap):
+            array.flush()
+    supplyIndices = minutes = demandIndices = demandOrder = None
+    for path in spillPaths:
+        os.remove(path)
+
+    arrays = {"supplyKeys": supplyKeys, "demandKeys": demandKeys,
+              "supplyIndptr": supplyIndptr, "demandIndptr": demandIndptr}
+    for name in arrays:
+        numpy.save(os.path.join(folder, name + ".npy"), arrays[name])
+    with open(manifest, "w") as manifestFile:
+        json.dump({"supplyCount": len(supplyKeys), "demandCount": len(demandKeys),
+                   "lineCount": lineCount}, manifestFile)
+    return folder
+
+# A function for a store array written in place
+def storeArray(folder, name, dtype, count):
+    path = os.path.join(folder, name + ".npy")
+    if count == 0:
+        numpy.save(path, numpy.zeros(0, dtype=dtype))
+        return numpy.zeros(0, dtype=dtype)
+    return numpy.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(count,))
+
+# A function for reading a spilled column back
+def spilledArray(path, dtype, count):
+    if count == 0:
+        return numpy.zeros(0, dtype=dtype)
+    return numpy.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+# A function for the slots of lines in a counting sort
+def countingSlots(keys, nextSlot):
+    '''nextSlot holds the next free slot of each key & is moved past the
+    lines given; lines of one key keep their order'''
+    order = numpy.argsort(keys, kind="mergesort")
+    sortedKeys = keys[order]
+    first = numpy.searchsorted(sortedKeys, sortedKeys, side="left")
+    slots = numpy.empty(len(keys), dtype=numpy.int64)
+    slots[order] = nextSlot[sortedKeys] + numpy.arange(len(keys)) - first
+    nextSlot += numpy.bincount(keys, minlength=len(nextSlot))
+    return slots
+
+# A function for blocks of whole rows of about chunkLines lines
+def rowBlocks(indptr, chunkLines):
+    '''Yields (first row, row after the last); a supply point is never split'''
+    supplyCount = len(indptr) - 1
+    row = 0
+    while row < supplyCount:
+        lastRow = int(numpy.searchsorted(indptr, indptr[row] + chunkLines, side="right")) - 1
+        lastRow = min(max(lastRow, row + 1), supplyCount)
+        yield row, lastRow
+        row = lastRow
+def openStore(folder):
+    '''Returns a dict of read-only memory maps'''
+    manifest = os.path.join(folder, "store.json")
+    if not os.path.exists(manifest):
+        raise IOError("%s holds no complete O-D store"%folder)
+    store = dict((name, numpy.load(os.path.join(folder, name + ".npy"), mmap_mode="r"))
+                 for name in storeArrays)
+    # Key lookups search a sort order of the keys, found once
+    for name in ["supplyKeys", "demandKeys"]:
+        store[name + "Sorter"] = numpy.argsort(store[name], kind="mergesort")
+    return store
+
+# A function for the position of a key
+def keyPosition(store, name, key):
+    '''name is "supplyKeys" or "demandKeys"; returns -1 for an unknown key'''
+    keys, sorter = store[name], store[name + "Sorter"]
+    key = str(key)
+    position = numpy.searchsorted(keys, key, sorter=sorter)
+    if position < len(keys) and keys[sorter[position]] == key:
+        return int(sorter[position])
+    return -1
+
+# A function for the lines of one supply point
+def supplyLines(store, supplyKey, low=None, high=None):
+    '''Returns the keys & minutes of the demand points it reaches, optionally
+    only those in (low, high] minutes (e.g. one zone)'''
+    row = keyPosition(store, "supplyKeys", supplyKey)
+    if row < 0:
+        return store["demandKeys"][:0], numpy.zeros(0, dtype=numpy.float32)
+    start, end = store["supplyIndptr"][row], store["supplyIndptr"][row + 1]
+    demandIndex = store["supplyIndices"][start:end]
+    minutes = store["minutes"][start:end]
+    keep = minuteMask(minutes, low, high)
+    return store["demandKeys"][demandIndex[keep]], numpy.asarray(minutes[keep])
+
+# A function for the lines of one demand point
+def demandLines(store, demandKey, low=None, high=None):
+    '''Returns the keys & minutes of the supply points that reach it,
+    optionally only those in (low, high] minutes'''
+    column = keyPosition(store, "demandKeys", demandKey)
+    if column < 0:
+        return store["supplyKeys"][:0], numpy.zeros(0, dtype=numpy.float32)
+    start, end = store["demandIndptr"][column], store["demandIndptr"][column + 1]
+    supplyIndex = store["demandIndices"][start:end]
+    minutes = store["minutes"][store["demandOrder"][start:end]]
+    keep = minuteMask(minutes, low, high)
+    return store["supplyKeys"][supplyIndex[keep]], numpy.asarray(minutes[keep])
+
+# A function for the lines inside a band of minutes
+def minuteMask(minutes, low, high):
+    keep = numpy.ones(len(minutes), dtype=bool)
+    if low is not None:
+        keep &= minutes > low
+    if high is not None:
+        keep &= minutes <= high
+    return keep
+
+# A function for reading the whole matrix a block of supply points at a time
+def lineChunks(store, chunkLines=1000000):
+    '''Yields (supplyIndex, demandIndex, minutes) chunks of about chunkLines
+    lines; the demand positions & minutes are slices of the memory maps'''
+    indptr = numpy.asarray(store["supplyIndptr"])
+    for row, lastRow in rowBlocks(indptr, chunkLines):
+        start, end = indptr[row], indptr[lastRow]
+        supplyIndex = numpy.repeat(numpy.arange(row, lastRow), numpy.diff(indptr[row:lastRow + 1]))
+        yield supplyIndex, store["supplyIndices"][start:end], store["minutes"][start:end]
@@ -0,0 +1,157 @@
+'''-----------------------------------------------------------------------------
+# Name:        SFCA_Aggregate_Version_1.0
+# Purpose:     Cluster dense demand points into weighted representatives so
+#              the O-D matrix & scoring run on far fewer points
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Demand points are clustered by a square grid of a given cell size (in map
+# units). Each cluster is represented by the member nearest its volume-
+# weighted centre, so the representative is a real point & snaps to the
+# network like its neighbours; it carries the cluster's total volume.
+# The O-D matrix & both steps run on the representatives, and every point
+# takes the Step 2 score of its representative.
+#
+# On a local road network, clusters are then checked by travel time: one
+# search from all representatives at once (each way, on a one-way network)
+# gives every point its nearest representative & the time to it, bounded
+# by a tolerance. A point joins that representative if the time both ways
+# is within the tolerance; other points are clustered by the network node
+# they snap to, which costs no travel time. By the triangle inequality no
+# travel time to a point then moves by more than the reported largest
+# time, which is taken over all points.
+#
+# With Network Analyst no times are available, so only the displacement
+# (distance from each point to its representative) is reported; it is not
+# a bound on the change in travel times.
+
+# Import necessary modules
+import numpy
+from scipy.sparse import csgraph
+import od_graph_GitHub as od_graph
+
+# Name of the ID field of written representatives
+representativeID = "Rep_ID"
+representativeVolume = "Rep_Volume"
+
+# Travel time tolerance (minutes) of clusters on a local road network
+defaultTolerance = 1.0
+
+# A function for clustering points by grid cell
+def clusterPoints(xs, ys, cellSize):
+    '''Returns the cluster (0 to clusters - 1) of each point'''
+    xs = numpy.asarray(xs, dtype=numpy.float64)
+    ys = numpy.asarray(ys, dtype=numpy.float64)
+    if not len(xs):
+        return numpy.zeros(0, dtype=numpy.int64)
+    cells = numpy.column_stack([numpy.floor(xs/cellSize), numpy.floor(ys/cellSize)]).astype(numpy.int64)
+    clusters = numpy.unique(cells, axis=0, return_inverse=True)[1]
+    return clusters.ravel().astype(numpy.int64)
+
+# A function for the representatives of clusters
+def representatives(xs, ys, volume, clusters):
+    '''Returns the point representing each cluster & each cluster's volume.
+    Clusters without volume are centred on their points unweighted.'''
+    xs = numpy.asarray(xs, dtype=numpy.float64)
+    ys = numpy.asarray(ys, dtype=numpy.float64)
+    volume = numpy.asarray(volume, dtype=numpy.float64)
+    clusterCount = int(clusters.max()) + 1 if len(clusters) else 0
+    totals = numpy.bincount(clusters, weights=volume, minlength=clusterCount)
+    counts = numpy.bincount(clusters, minlength=clusterCount)
+    weighted = totals > 0
+    divisor = numpy.where(weighted, totals, counts)
+    centreX = numpy.where(weighted, numpy.bincount(clusters, weights=volume * xs, minlength=clusterCount),
+                          numpy.bincount(clusters, weights=xs, minlength=clusterCount))/divisor
+    centreY = numpy.where(weighted, numpy.bincount(clusters, weights=volume * ys, minlength=clusterCount),
+                          numpy.bincount(clusters, weights=ys, minlength=clusterCount))/divisor
+    # The member nearest the centre represents the cluster
+    offset = numpy.hypot(xs - centreX[clusters], ys - centreY[clusters])
+    order = numpy.lexsort((offset, clusters))
+    first = numpy.ones(len(order), dtype=bool)
+    first[1:] = clusters[order][1:] != clusters[order][:-1]
+    return order[first], totals
+
+# A function for the distance from each point to its representative
+def displacement(xs, ys, clusters, representative):
+    xs = numpy.asarray(xs, dtype=numpy.float64)
+    ys = numpy.asarray(ys, dtype=numpy.float64)
+    points = representative[clusters]
+    return numpy.hypot(xs - xs[points], ys - ys[points])
+
+# A function for clustering points on a local road network
+def networkClusters(network, xs, ys, volume, cellSize, tolerance):
+    '''network is the (graph, nodeXY) pair of od_graph.loadNetwork(). Points
+    are clustered by grid cell first, then checked by travel time (see
+    above). Returns the cluster of each point, the representative & volume
+    of each cluster & the time of each point from its representative
+    (the larger of both ways).'''
+    graph, nodeXY = network
+    xs = numpy.asarray(xs, dtype=numpy.float64)
+    ys = numpy.asarray(ys, dtype=numpy.float64)
+    volume = numpy.asarray(volume, dtype=numpy.float64)
+    if not len(xs):
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0), numpy.zeros(0)
+    pointNodes = od_graph.snapPoints(nodeXY, xs, ys)[0]
+    candidates = representatives(xs, ys, volume, clusterPoints(xs, ys, cellSize))[0]
+    # One representative per node; the search returns the node it came from
+    candidateNodes, first = numpy.unique(pointNodes[candidates], return_index=True)
+    nodeRepresentative = numpy.full(graph.shape[0], -1, dtype=numpy.int64)
+    nodeRepresentative[candidateNodes] = candidates[first]
+    times, _, sources = csgraph.dijkstra(graph, directed=True, indices=candidateNodes, min_only=True,
+                                         return_predecessors=True, limit=tolerance)
+    times, sources = times[pointNodes], sources[pointNodes]
+    if not od_graph.graphIsSymmetric(graph):
+        backTimes, _, backSources = csgraph.dijkstra(graph.T.tocsr(), directed=True, indices=candidateNodes,
+                                                     min_only=True, return_predecessors=True, limit=tolerance)
+        # The nearest representative must be the same both ways
+        backTimes, backSources = backTimes[pointNodes], backSources[pointNodes]
+        times = numpy.where(backSources == sources, numpy.maximum(times, backTimes), numpy.inf)
+    joined = (sources >= 0) & (times <= tolerance)
+    # Points out of reach are clustered by their own node
+    nodeLeader = numpy.full(graph.shape[0], -1, dtype=numpy.int64)
+    outside = numpy.flatnonzero(~joined)
+    nodeLeader[pointNodes[outside][::-1]] = outside[::-1]
+    pointRepresentative = numpy.where(joined, nodeRepresentative[numpy.maximum(sources, 0)],
+                                      nodeLeader[pointNodes])
+    representative, clusters = numpy.unique(pointRepresentative, return_inverse=True)
+    clusters = clusters.ravel().astype(numpy.int64)
+    totals = numpy.bincount(clusters, weights=volume, minlength=len(representative))
+    return clusters, representative, totals, numpy.where(joined, times, 0.0)
+
+# A function for describing an aggregation in the report
+def aggregationNote(cellSize, clusters, volume, distances, times=None, tolerance=None):
+    '''times holds the travel time of each point from its representative, on
+    a local road network'''
+    volume = numpy.asarray(volume, dtype=numpy.float64)
+    clusterCount = int(clusters.max()) + 1 if len(clusters) else 0
+    meanDistance = (numpy.average(distances, weights=volume) if volume.sum() > 0
+                    else (distances.mean() if len(distances) else 0.0))
+    note = "%s points in %s clusters of %s map units (%.1fx fewer); displacement: largest %s, " \
+           "volume-weighted mean %s"%(len(clusters), clusterCount, cellSize,
+                                      len(clusters)/float(max(clusterCount, 1)),
+                                      distances.max() if len(distances) else 0.0, meanDistance)
+    if times is not None:
+        note += "; travel time error bound (tolerance %s): largest %s, mean %s minutes"%(
+            tolerance, times.max() if len(times) else 0.0, times.mean() if len(times) else 0.0)
+    else:
+        note += " (no travel time bound without a local road network)"
+    return note
+
+# A function for writing representatives to a point feature class
+def writeRepresentatives(path, ids, xs, ys, volume, spatialReference):
+    '''Rep_ID holds the text ID & Rep_Volume the volume of each point'''
+    import arcpy
+    if arcpy.Exists(path):
+        arcpy.Delete_management(path)
+    ids = numpy.asarray(ids).astype(str)
+    array = numpy.zeros(len(ids), dtype=[(representativeID, "U%s"%max(ids.dtype.itemsize // 4, 1)),
+                                         (representativeVolume, numpy.float64),
+                                         ("X", numpy.float64), ("Y", numpy.float64)])
+    array[representativeID] = ids
+    array[representativeVolume] = volume
+    array["X"] = xs
+    array["Y"] = ys
+    arcpy.da.NumPyArrayToFeatureClass(array, path, ("X", "Y"), spatialReference)
+    return path
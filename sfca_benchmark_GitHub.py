@@ -0,0 +1,253 @@
+'''-----------------------------------------------------------------------------
+# Name:        SFCA_Benchmark_Version_1.0
+# Purpose:     Time each stage of the E2SFCA & V2SFCA engines on synthetic
+#              networks and points, and keep the results as JSON
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Runs without ArcGIS: the O-D matrix is solved on a synthetic road graph
+# by od_graph and scored by sfca_core. Travel is at 1 map unit per minute.
+#
+# Example:
+#   python sfca_benchmark_GitHub.py --demand 1000 10000 100000 --network grid random
+#                                   --output bench.json --compare previous.json
+#
+# With --engine sparse the weights stage also builds the sparse weight
+# matrix, and both steps are sparse products. With --solver hierarchy the
+# O-D matrix is solved on a contraction hierarchy (see od_hierarchy); the
+# hierarchy is built first, in a hierarchyBuild stage that is left out of
+# the total since a hierarchy is built once per network. The road network
+# itself is built once, before any timed stage, for both solvers, so the
+# odBuild stages of the two compare like for like.
+#
+# tracemalloc slows every allocation it traces, so stages are timed with it
+# off; their peak memory is measured in a second, untimed run of the stage
+# (left out with --no-memory).
+
+# Import necessary modules
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import numpy
+from scipy.spatial import cKDTree
+import sfca_core_GitHub as sfca_core
+import od_graph_GitHub as od_graph
+import sfca_sparse_GitHub as sfca_sparse
+import od_hierarchy_GitHub as od_hierarchy
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# Timer with the best resolution available
+timer = getattr(time, "perf_counter", time.time)
+
+# Whether stages are run a second time to measure their peak memory
+measureMemory = True
+
+# Stages in the order they run
+stages = ["odBuild", "weights", "step1", "step2", "spar", "write"]
+
+# A function for a grid road network
+def gridNetwork(side, spacing=1.0):
+    '''Returns (graph, nodeXY) of a side x side street grid'''
+    coords = numpy.arange(side) * spacing
+    x, y = numpy.meshgrid(coords, coords)
+    x, y = x.ravel(), y.ravel()
+    node = numpy.arange(side * side).reshape(side, side)
+    fromNode = numpy.concatenate([node[:, :-1].ravel(), node[:-1, :].ravel()])
+    toNode = numpy.concatenate([node[:, 1:].ravel(), node[1:, :].ravel()])
+    return od_graph.buildGraph(x[fromNode], y[fromNode], x[toNode], y[toNode],
+                               numpy.full(len(fromNode), spacing))
+
+# A function for a random geometric road network
+def randomNetwork(nodeCount, size, degree=6.0, seed=0):
+    '''Nodes closer than the radius giving about degree neighbours are joined'''
+    random = numpy.random.RandomState(seed)
+    xy = random.rand(nodeCount, 2) * size
+    radius = numpy.sqrt(degree / (numpy.pi * nodeCount / float(size * size)))
+    pairs = numpy.array(sorted(cKDTree(xy).query_pairs(radius)), dtype=numpy.int64).reshape(-1, 2)
+    lengths = numpy.hypot(*(xy[pairs[:, 0]] - xy[pairs[:, 1]]).T)
+    return od_graph.buildGraph(xy[pairs[:, 0], 0], xy[pairs[:, 0], 1],
+                               xy[pairs[:, 1], 0], xy[pairs[:, 1], 1], lengths)
+
+# A function for random points & volumes
+def randomPoints(count, size, volumeRange, seed):
+    '''Returns Xs, Ys & volumes'''
+    random = numpy.random.RandomState(seed)
+    xy = random.rand(count, 2) * size
+    return xy[:, 0], xy[:, 1], random.uniform(volumeRange[0], volumeRange[1], count)
+
+# A function for timing one stage
+def runStage(results, name, function, items=None):
+    '''Records the seconds, peak memory (MB) & items per second of a stage.
+    Memory is measured in a second run, so tracing does not slow the timed
+    one.'''
+    gc.collect()
+    start = timer()
+    value = function()
+    seconds = timer() - start
+    peak = None
+    if measureMemory and tracemalloc is not None:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function()
+            peak = tracemalloc.get_traced_memory()[1] / 1048576.0
+        finally:
+            tracemalloc.stop()
+    count = items(value) if items else None
+    results[name] = {"seconds": seconds, "peakMB": peak,
+                     "throughput": count / seconds if count and seconds > 0 else None}
+    return value
+
+# A function for one benchmark run
+def benchmark(method, network, demandCount, supplyCount, cutoff, seed=0, engine="arrays",
+              solver="dijkstra"):
+    '''method is "E2SFCA" or "V2SFCA", network "grid" or "random", engine
+    "arrays" or "sparse", solver "dijkstra" or "hierarchy"'''
+    # The area grows with the points, so density (and lines per point) stays put
+    size = max(10.0, numpy.sqrt(demandCount) / 2.0)
+    side = int(size) + 1
+    results = {}
+    supplyX, supplyY, supplyVolume = randomPoints(supplyCount, size - 1, (5, 50), seed)
+    demandX, demandY, demandVolume = randomPoints(demandCount, size - 1, (10, 1000), seed + 1)
+
+    if network == "grid":
+        roads = gridNetwork(side)
+    else:
+        roads = randomNetwork(side * side, size - 1, seed=seed)
+    if solver == "hierarchy":
+        hierarchy = runStage(results, "hierarchyBuild", lambda: od_hierarchy.buildHierarchy(roads[0]),
+                             lambda value: len(value["rank"]))
+        buildOD = lambda: od_graph.solvePoints(roads, supplyX, supplyY, demandX, demandY, cutoff,
+                                               od_hierarchy.hierarchySolver(hierarchy))[:3]
+    else:
+        buildOD = lambda: od_graph.solvePoints(roads, supplyX, supplyY, demandX, demandY, cutoff)[:3]
+    supplyIndex, demandIndex, odMinutes = runStage(results, "odBuild", buildOD,
+                                                   lambda lines: len(lines[0]))
+    lineCount = len(odMinutes)
+
+    if method == "E2SFCA":
+        limits = [cutoff / 3.0, 2.0 * cutoff / 3.0, cutoff]
+        coefficient = sfca_core.gaussianSolve(cutoff, 0.01)
+        zones = [sfca_core.gaussianWeights(limit, coefficient) for limit in limits]
+        weightFunction = lambda: sfca_core.zoneWeights(odMinutes, limits, zones)
+    else:
+        coefficient = sfca_core.gaussianSolve(cutoff, 0.01)
+        weightFunction = lambda: sfca_core.continuousWeights(odMinutes, cutoff, coefficient)
+    if engine == "sparse":
+        matrix = runStage(results, "weights",
+                          lambda: sfca_sparse.weightMatrix([(supplyIndex, demandIndex, weightFunction())],
+                                                           supplyCount, demandCount),
+                          lambda value: lineCount)
+        ratios = runStage(results, "step1",
+                          lambda: sfca_sparse.step1Ratios(matrix, supplyVolume, demandVolume),
+                          lambda value: lineCount)
+        scores = runStage(results, "step2", lambda: sfca_sparse.step2Scores(matrix, ratios),
+                          lambda value: lineCount)
+    else:
+        weights = runStage(results, "weights", weightFunction, lambda value: lineCount)
+        ratios = runStage(results, "step1",
+                          lambda: sfca_core.step1Ratios(supplyVolume, demandVolume, supplyIndex,
+                                                        demandIndex, weights),
+                          lambda value: lineCount)
+        scores = runStage(results, "step2",
+                          lambda: sfca_core.step2Scores(ratios, supplyIndex, demandIndex, weights,
+                                                        demandCount),
+                          lambda value: lineCount)
+    spar = runStage(results, "spar", lambda: sfca_core.sparScores(scores)[0],
+                    lambda value: demandCount)
+
+    def write():
+        folder = tempfile.mkdtemp(prefix="sfca_bench_")
+        try:
+            numpy.savez(os.path.join(folder, "scores.npz"), scores=scores, spar=spar)
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    runStage(results, "write", write, lambda value: demandCount)
+
+    return {"method": method, "network": network, "engine": engine, "solver": solver,
+            "demandCount": demandCount,
+            "supplyCount": supplyCount, "cutoff": cutoff, "lines": lineCount,
+            "totalSeconds": sum(results[name]["seconds"] for name in stages),
+            "stages": results}
+
+# A function for the environment the results came from
+def environment(label):
+    return {"label": label, "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(), "numpy": numpy.__version__,
+            "platform": platform.platform(),
+            "memory": "tracemalloc, in a separate run" if measureMemory and tracemalloc is not None
+                      else "not measured"}
+
+# A function for comparing results with an earlier file
+def compare(runs, previousPath):
+    '''Prints the ratio of new to old seconds for matching runs & stages'''
+    with open(previousPath) as previousFile:
+        previous = json.load(previousFile)
+    key = lambda run: (run["method"], run["network"], run.get("engine", "arrays"),
+                       run.get("solver", "dijkstra"), run["demandCount"], run["supplyCount"])
+    old = dict((key(run), run) for run in previous["runs"])
+    for run in runs:
+        if key(run) not in old:
+            continue
+        ratios = ["%s %.2fx"%(name, run["stages"][name]["seconds"] /
+                              max(old[key(run)]["stages"][name]["seconds"], 1e-9))
+                  for name in stages]
+        print("%s %s %s %s %s: %s"%(run["method"], run["network"], run["engine"], run["solver"],
+                                    run["demandCount"], ", ".join(ratios)))
+
+# Main function
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the 2SFCA engines")
+    parser.add_argument("--demand", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--supply-per-demand", type=float, default=0.01)
+    parser.add_argument("--network", nargs="+", default=["grid", "random"],
+                        choices=["grid", "random"])
+    parser.add_argument("--method", nargs="+", default=["E2SFCA", "V2SFCA"],
+                        choices=["E2SFCA", "V2SFCA"])
+    parser.add_argument("--engine", nargs="+", default=["arrays"], choices=["arrays", "sparse"])
+    parser.add_argument("--solver", nargs="+", default=["dijkstra"], choices=["dijkstra", "hierarchy"])
+    parser.add_argument("--cutoff", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default="")
+    parser.add_argument("--output", default="sfca_benchmark.json")
+    parser.add_argument("--compare", default="")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip the second run of each stage that measures its peak memory")
+    args = parser.parse_args(argv)
+    global measureMemory
+    measureMemory = not args.no_memory
+
+    runs = []
+    for demandCount in args.demand:
+        supplyCount = max(10, int(demandCount * args.supply_per_demand))
+        for network in args.network:
+            for method in args.method:
+                for engine in args.engine:
+                    for solver in args.solver:
+                        run = benchmark(method, network, demandCount, supplyCount, args.cutoff,
+                                        args.seed, engine, solver)
+                        runs.append(run)
+                        print("%s %s %s %s %s demand, %s supply, %s lines: %.3f s"%(
+                            method, network, engine, solver, demandCount, supplyCount, run["lines"],
+                            run["totalSeconds"]))
+    with open(args.output, "w") as outputFile:
+        json.dump({"environment": environment(args.label), "runs": runs}, outputFile, indent=2)
+    if args.compare:
+        compare(runs, args.compare)
+    return runs
+
+# A standard python protocol to check before running the module's main funcion.
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,92 @@
+'''-----------------------------------------------------------------------------
+# Name:        SFCA_Categories_Version_1.0
+# Purpose:     Score several categories of supply (e.g. hospitals, clinics,
+#              pharmacies) in one run, against one O-D matrix
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Categories are named by a field of the supply layer, or by the layers of
+# several supply layers, which are written to one union of points first.
+# The O-D matrix is solved once against all facilities. A facility's Step 1
+# ratio only depends on the demand in its reach, so ratios are calculated
+# once for every facility. Step 2 then runs on one row of ratios per
+# category, each row holding only that category's facilities, so all
+# categories are scored in one pass over the lines (as scenario rows, see
+# sfca_core). Each category gets a score & a SPAR field of its own.
+
+# Import necessary modules
+import os
+import numpy
+
+# Fields of a union of supply layers
+categoryField = "Category"
+unionID = "Union_ID"
+unionVolume = "Union_Vol"
+
+# A function for the category of each supply point
+def supplyCategories(values):
+    '''Returns the sorted category names & the category of each point'''
+    values = numpy.asarray(values).astype(str)
+    names, categoryIndex = numpy.unique(values, return_inverse=True)
+    return names, categoryIndex.ravel().astype(numpy.int64)
+
+# A function for one row of Step 1 ratios per category
+def categoryRatios(ratios, categoryIndex, categoryCount):
+    '''Each row holds the ratios of its category's facilities & 0 elsewhere'''
+    ratios = numpy.asarray(ratios, dtype=numpy.float64)
+    rows = numpy.zeros((categoryCount, len(ratios)))
+    rows[categoryIndex, numpy.arange(len(ratios))] = ratios
+    return rows
+
+# A function for the score & SPAR fields of each category
+def categoryFields(names, validate=None):
+    '''validate turns a name into a valid field name (e.g.
+    arcpy.ValidateFieldName); if that makes two fields alike, categories
+    are numbered in name order instead'''
+    fields = [("Score_%s"%name, "SPAR_%s"%name) for name in names]
+    if validate is None:
+        return fields
+    fields = [(validate(score), validate(spar)) for score, spar in fields]
+    flat = [field for pair in fields for field in pair]
+    if len(set(field.lower() for field in flat)) < len(flat):
+        fields = [(validate("Score_%s"%number), validate("SPAR_%s"%number))
+                  for number in range(1, len(names) + 1)]
+    return fields
+
+# A function for describing the categories in the report
+def categoryNote(names, categoryIndex, fields):
+    counts = numpy.bincount(categoryIndex, minlength=len(names))
+    return "; ".join("%s (facilities: %s; fields: %s, %s)"%(name, count, scoreField, sparField)
+                     for name, count, (scoreField, sparField) in zip(names, counts, fields))
+
+# A function for the category named by a layer
+def layerCategory(path):
+    return os.path.splitext(os.path.basename(path.rstrip("\\/")))[0]
+
+# A function for writing several supply layers to one point feature class
+def writeUnion(path, names, ids, volumes, xs, ys, spatialReference):
+    '''names holds one category per layer, & ids, volumes, xs & ys one array
+    per layer, with coordinates in spatialReference (read each layer
+    projected to it, see E2SFCA readPoints()). Each point's
+    Union_ID is "<category>|<ID>", so IDs need only be unique per layer.'''
+    import arcpy
+    if len(set(names)) < len(names):
+        raise ValueError("Supply layers need different names to be told apart (%s)"%", ".join(names))
+    if arcpy.Exists(path):
+        arcpy.Delete_management(path)
+    pointIDs = numpy.array(["%s|%s"%(name, pointID) for name, layerIDs in zip(names, ids)
+                            for pointID in layerIDs]).astype(str)
+    categories = numpy.repeat(numpy.asarray(names).astype(str), [len(layerIDs) for layerIDs in ids])
+    array = numpy.zeros(len(pointIDs), dtype=[(unionID, "U%s"%max(pointIDs.dtype.itemsize // 4, 1)),
+                                              (categoryField, "U%s"%max(categories.dtype.itemsize // 4, 1)),
+                                              (unionVolume, numpy.float64),
+                                              ("X", numpy.float64), ("Y", numpy.float64)])
+    array[unionID] = pointIDs
+    array[categoryField] = categories
+    array[unionVolume] = numpy.concatenate(volumes)
+    array["X"] = numpy.concatenate(xs)
+    array["Y"] = numpy.concatenate(ys)
+    arcpy.da.NumPyArrayToFeatureClass(array, path, ("X", "Y"), spatialReference)
+    return path
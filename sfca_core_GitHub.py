@@ -0,0 +1,219 @@
+'''-----------------------------------------------------------------------------
+# Name:        SFCA_Core_Version_1.0
+# Purpose:     Array-based scoring engine for the Two-Step Floating Catchment
+#              Area tools (no ArcGIS license required)
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# The O-D matrix is held as three parallel (COO) arrays:
+#   supplyIndex - position of the supply point in the supply arrays
+#   demandIndex - position of the demand point in the demand arrays
+#   minutes     - network travel time between the two points
+# Every function below works on whole arrays, so no cursor or table is
+# needed between the steps.
+
+# Import necessary modules
+import numpy
+
+# A function for calculating weights
+def gaussianWeights(dist,coefficient):
+    '''Weights may be an approximation'''
+    weight = numpy.exp(-numpy.power(dist, 2.0)/coefficient)
+    return weight
+
+# A function for finding the coefficient, if necessary.
+def gaussianSolve(dist,targetWeight):
+    '''Coefficient may be an approximation'''
+    coefficient = -numpy.power(dist, 2.0)/numpy.log(targetWeight)
+    return coefficient
+
+# A function for turning ID values into positions in an ID array
+def mapIndex(ids, values):
+    '''Values that are not found in ids are returned as -1'''
+    ids = numpy.asarray(ids)
+    values = numpy.asarray(values)
+    if len(ids) == 0:
+        return numpy.full(len(values), -1, dtype=numpy.int64)
+    sorter = numpy.argsort(ids, kind="mergesort")
+    position = numpy.searchsorted(ids, values, sorter=sorter)
+    position = numpy.clip(position, 0, len(ids) - 1)
+    index = sorter[position]
+    index[ids[index] != values] = -1
+    return index.astype(numpy.int64)
+
+# A function for building the COO arrays from solved O-D lines
+def odArrays(supplyIDs, demandIDs, lineSupplyIDs, lineDemandIDs, lineMinutes):
+    '''Lines whose supply or demand ID is unknown are dropped'''
+    supplyIndex = mapIndex(supplyIDs, lineSupplyIDs)
+    demandIndex = mapIndex(demandIDs, lineDemandIDs)
+    minutes = numpy.asarray(lineMinutes, dtype=numpy.float64)
+    keep = (supplyIndex >= 0) & (demandIndex >= 0)
+    return supplyIndex[keep], demandIndex[keep], minutes[keep]
+
+# A function for expanding a CSR matrix (rows are supply) into COO arrays
+def csrToCOO(indptr, indices, data):
+    '''Returns supplyIndex, demandIndex, minutes'''
+    indptr = numpy.asarray(indptr, dtype=numpy.int64)
+    rows = numpy.repeat(numpy.arange(len(indptr) - 1, dtype=numpy.int64),
+                        numpy.diff(indptr))
+    return (rows, numpy.asarray(indices, dtype=numpy.int64),
+            numpy.asarray(data, dtype=numpy.float64))
+
+# A function for V2SFCA weights (continuous Gaussian inside the catchment)
+def continuousWeights(minutes, distance, coefficient, decay=None):
+    '''Travel times outside (0, distance] are weighted 0, as in the tools.
+    Lists of distances and/or coefficients give one row per scenario.
+    decay(minutes, coefficient, distance) replaces the Gaussian.'''
+    minutes = numpy.asarray(minutes, dtype=numpy.float64)
+    distance = numpy.asarray(distance, dtype=numpy.float64)
+    coefficient = numpy.asarray(coefficient, dtype=numpy.float64)
+    if distance.ndim or coefficient.ndim:
+        distance = distance.reshape(-1, 1)
+        coefficient = coefficient.reshape(-1, 1)
+    inside = (minutes > 0) & (minutes <= distance)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        if decay is None:
+            weights = gaussianWeights(minutes, coefficient)
+        else:
+            weights = decay(minutes, coefficient, distance)
+    return numpy.where(inside, weights, 0.0)
+
+# A function for E2SFCA weights (one weight per zone)
+def zoneWeights(minutes, distance, weights):
+    '''distance holds the sorted zone limits, weights one weight per zone.
+    A 2-D weights array gives one row per scenario.'''
+    minutes = numpy.asarray(minutes, dtype=numpy.float64)
+    weights = numpy.asarray(weights, dtype=numpy.float64)
+    zoneCount = weights.shape[-1]
+    limits = numpy.asarray(distance[:zoneCount], dtype=numpy.float64)
+    # Zone i holds (limit i-1, limit i]; times past the last limit get the
+    # extra weight of 0, as do times of 0 or less
+    zone = numpy.searchsorted(limits, minutes, side="left")
+    zone[minutes <= 0] = zoneCount
+    zoneTable = numpy.concatenate([weights, numpy.zeros(weights.shape[:-1] + (1,))],
+                                  axis=-1)
+    return numpy.take(zoneTable, zone, axis=-1)
+
+# A function for summing values per index; 2-D values are summed per row
+def groupSum(index, values, count):
+    '''Each row of 2-D values is a scenario with its own totals'''
+    values = numpy.asarray(values, dtype=numpy.float64)
+    if values.ndim == 1:
+        return numpy.bincount(index, values, minlength=count)
+    scenarios = values.shape[0]
+    offsets = (numpy.arange(scenarios, dtype=numpy.int64) * count)[:, None] + index
+    totals = numpy.bincount(offsets.ravel(), values.ravel(),
+                            minlength=scenarios * count)
+    return totals.reshape(scenarios, count)
+
+# A function for turning weighted demand totals into supply-to-demand ratios
+def ratiosFromTotals(supplyVolume, demandTotals, multiplier=1.0):
+    '''Supply points with no weighted demand in reach score 0'''
+    supplyVolume = numpy.asarray(supplyVolume, dtype=numpy.float64)
+    demandTotals = numpy.asarray(demandTotals, dtype=numpy.float64)
+    ratios = numpy.zeros(demandTotals.shape)
+    reached = demandTotals > 0
+    supplyVolume = numpy.broadcast_to(supplyVolume, demandTotals.shape)
+    ratios[reached] = multiplier * (supplyVolume[reached]/demandTotals[reached])
+    return ratios
+
+# A function for the first step: supply-to-demand ratio of each supply point
+def step1Ratios(supplyVolume, demandVolume, supplyIndex, demandIndex, weights,
+                multiplier=1.0):
+    '''Supply points with no weighted demand in reach score 0'''
+    demandVolume = numpy.asarray(demandVolume, dtype=numpy.float64)
+    weightedDemand = demandVolume[demandIndex] * weights
+    demandTotals = groupSum(supplyIndex, weightedDemand, len(supplyVolume))
+    return ratiosFromTotals(supplyVolume, demandTotals, multiplier)
+
+# A function for the second step: sum of weighted ratios at each demand point
+def step2Scores(ratios, supplyIndex, demandIndex, weights, demandCount):
+    '''Demand points with no supply in reach score 0'''
+    weightedSupply = numpy.take(ratios, supplyIndex, axis=-1) * weights
+    return groupSum(demandIndex, weightedSupply, demandCount)
+
+# A function for weighting O-D chunks as they are read
+def weightChunks(chunks, weightFunction):
+    '''Turns (supplyIndex, demandIndex, minutes) chunks into
+    (supplyIndex, demandIndex, weights) chunks'''
+    for supplyIndex, demandIndex, minutes in chunks:
+        yield supplyIndex, demandIndex, weightFunction(minutes)
+
+# A function for the first step over an O-D matrix read in chunks
+def streamStep1Ratios(supplyVolume, demandVolume, chunks, multiplier=1.0):
+    '''chunks yields (supplyIndex, demandIndex, weights); only one chunk is
+    held at a time, and totals are kept per supply point'''
+    demandVolume = numpy.asarray(demandVolume, dtype=numpy.float64)
+    demandTotals = numpy.zeros(len(supplyVolume))
+    for supplyIndex, demandIndex, weights in chunks:
+        weightedDemand = demandVolume[demandIndex] * weights
+        demandTotals = demandTotals + groupSum(supplyIndex, weightedDemand,
+                                               len(supplyVolume))
+    return ratiosFromTotals(supplyVolume, demandTotals, multiplier)
+
+# A function for the second step over an O-D matrix read in chunks
+def streamStep2Scores(ratios, chunks, demandCount):
+    '''chunks yields (supplyIndex, demandIndex, weights); only one chunk is
+    held at a time, and scores are kept per demand point'''
+    ratios = numpy.asarray(ratios, dtype=numpy.float64)
+    scores = numpy.zeros(ratios.shape[:-1] + (demandCount,))
+    for supplyIndex, demandIndex, weights in chunks:
+        scores = scores + step2Scores(ratios, supplyIndex, demandIndex, weights,
+                                      demandCount)
+    return scores
+
+# A function for resolving O-D lines against the supply & demand arrays
+def odRecords(supplyKeys, demandKeys, supplyVolume, demandVolume, ratios, chunks,
+              weightFunction):
+    '''chunks yields (supplyIndex, demandIndex, minutes). Returns one record
+    per line: both IDs, minutes, weight, both volumes, the supply point's
+    Step 1 ratio & the line's part of the demand point's Step 2 score'''
+    supplyKeys, demandKeys = numpy.asarray(supplyKeys), numpy.asarray(demandKeys)
+    supplyVolume = numpy.asarray(supplyVolume, dtype=numpy.float64)
+    demandVolume = numpy.asarray(demandVolume, dtype=numpy.float64)
+    ratios = numpy.asarray(ratios, dtype=numpy.float64)
+    fields = [("Supply_ID", supplyKeys.dtype), ("Demand_ID", demandKeys.dtype)]
+    fields += [(str(name), numpy.float64) for name in ["Total_Minutes", "Weight", "Supply_Vol",
+                                                        "Demand_Vol", "Step1_Score", "Step2_Part"]]
+    records = []
+    for supplyIndex, demandIndex, minutes in chunks:
+        weights = weightFunction(minutes)
+        chunk = numpy.zeros(len(supplyIndex), dtype=fields)
+        chunk["Supply_ID"] = supplyKeys[supplyIndex]
+        chunk["Demand_ID"] = demandKeys[demandIndex]
+        chunk["Total_Minutes"] = minutes
+        chunk["Weight"] = weights
+        chunk["Supply_Vol"] = supplyVolume[supplyIndex]
+        chunk["Demand_Vol"] = demandVolume[demandIndex]
+        chunk["Step1_Score"] = ratios[supplyIndex]
+        chunk["Step2_Part"] = ratios[supplyIndex] * weights
+        records.append(chunk)
+    if not records:
+        return numpy.zeros(0, dtype=fields)
+    return numpy.concatenate(records)
+
+# A function for the Spatial Access Ratio
+def sparScores(scores):
+    '''Returns the SPAR of each score and the mean score (one mean per row
+    for 2-D scores)'''
+    scores = numpy.asarray(scores, dtype=numpy.float64)
+    if scores.shape[-1] == 0:
+        return scores, numpy.zeros(scores.shape[:-1]) if scores.ndim > 1 else 0.0
+    avgSpai = scores.mean(axis=-1)
+    divisor = numpy.where(avgSpai == 0, 1.0, avgSpai)
+    spar = numpy.where(numpy.expand_dims(avgSpai == 0, -1), 0.0,
+                       scores/numpy.expand_dims(divisor, -1))
+    return spar, avgSpai
+
+# A function running both steps and SPAR on one O-D matrix
+def twoStepScores(supplyVolume, demandVolume, supplyIndex, demandIndex, weights,
+                  multiplier=1.0):
+    '''Returns Step 1 ratios, Step 2 scores, SPAR and the mean score'''
+    ratios = step1Ratios(supplyVolume, demandVolume, supplyIndex, demandIndex,
+                         weights, multiplier)
+    scores = step2Scores(ratios, supplyIndex, demandIndex, weights,
+                         len(demandVolume))
+    spar, avgSpai = sparScores(scores)
+    return ratios, scores, spar, avgSpai
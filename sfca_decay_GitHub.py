@@ -0,0 +1,137 @@
+'''-----------------------------------------------------------------------------
+# Name:        SFCA_Decay_Version_1.0
+# Purpose:     Distance-decay functions for the Two-Step Floating Catchment
+#              Area tools, selectable by name
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Every decay function takes (minutes, coefficient, distance) and works on
+# whole arrays; distance is the catchment. Every solver takes (distance,
+# targetWeight) and returns the coefficient giving that weight at that
+# distance. The curves sketched in decay_scripts_GitHub.py are:
+#   Gaussian     exp(-d^2/272)
+#   Exponential  exp(-0.09 d)
+#   Power        d^-0.72
+#
+# Travel times may also be weighted from a lookup table: (0, cutoff] is cut
+# into bins of a fixed resolution, each weighted once at its centre, and
+# every time takes the weight of its bin. Zone limits on multiples of the
+# resolution are kept exactly.
+
+# Import necessary modules
+import numpy
+import sfca_core_GitHub as sfca_core
+
+# Weight of the Gaussian kernel at its bandwidth
+kernelFloor = numpy.exp(-0.5)
+
+# Zones of the stepwise function, as in E2SFCA
+stepZones = 3
+
+# A function for Gaussian weights
+def gaussianDecay(minutes, coefficient, distance=None):
+    return sfca_core.gaussianWeights(minutes, coefficient)
+
+# A function for exponential weights
+def exponentialDecay(minutes, coefficient, distance=None):
+    return numpy.exp(-coefficient * numpy.asarray(minutes, dtype=numpy.float64))
+
+# A function for finding the exponential coefficient
+def exponentialSolve(dist, targetWeight):
+    return -numpy.log(targetWeight)/dist
+
+# A function for power (inverse distance) weights
+def powerDecay(minutes, coefficient, distance=None):
+    '''Weights are capped at 1, so times under a minute are not inflated'''
+    minutes = numpy.asarray(minutes, dtype=numpy.float64)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        weights = numpy.power(minutes, -coefficient)
+    return numpy.where(minutes > 1.0, weights, 1.0)
+
+# A function for finding the power coefficient
+def powerSolve(dist, targetWeight):
+    '''The distance must be over 1 minute, where the curve starts to fall'''
+    if dist <= 1.0:
+        raise ValueError("Power decay needs a distance over 1 to solve for a target weight")
+    return -numpy.log(targetWeight)/numpy.log(dist)
+
+# A function for kernel density weights
+def kernelDecay(minutes, coefficient, distance=None):
+    '''Gaussian kernel scaled to 1 at 0 & 0 at the bandwidth (coefficient),
+    as in the kernel density 2SFCA'''
+    minutes = numpy.asarray(minutes, dtype=numpy.float64)
+    kernel = numpy.exp(-0.5 * numpy.power(minutes/coefficient, 2.0))
+    return numpy.where(minutes < coefficient, (kernel - kernelFloor)/(1.0 - kernelFloor), 0.0)
+
+# A function for finding the kernel bandwidth
+def kernelSolve(dist, targetWeight):
+    return dist/numpy.sqrt(-2.0 * numpy.log(targetWeight * (1.0 - kernelFloor) + kernelFloor))
+
+# A function for stepwise zonal weights
+def stepwiseDecay(minutes, coefficient, distance):
+    '''The catchment is split into equal zones, each weighted by the
+    Gaussian at its outer limit'''
+    distance = numpy.asarray(distance, dtype=numpy.float64)
+    zone = numpy.ceil(stepZones * numpy.asarray(minutes, dtype=numpy.float64)/distance)
+    zone = numpy.clip(zone, 1, stepZones)
+    return sfca_core.gaussianWeights(zone * distance/stepZones, coefficient)
+
+# Decay functions & coefficient solvers by name
+decayFunctions = {"Gaussian": (gaussianDecay, sfca_core.gaussianSolve),
+                  "Exponential": (exponentialDecay, exponentialSolve),
+                  "Power": (powerDecay, powerSolve),
+                  "Kernel density": (kernelDecay, kernelSolve),
+                  "Stepwise": (stepwiseDecay, sfca_core.gaussianSolve)}
+
+# A function for looking up a decay function & its solver
+def decayFunction(name):
+    '''An empty name is the Gaussian'''
+    name = name or "Gaussian"
+    if name not in decayFunctions:
+        raise ValueError("Unknown decay function %s (choose from %s)"%(name, ", ".join(sorted(decayFunctions))))
+    return decayFunctions[name]
+
+# A function for the weights of each bin of a lookup table
+def lookupTable(weightFunction, cutoff, resolution):
+    '''weightFunction takes minutes; bin k holds (k, k+1] x resolution &
+    is weighted at its centre (or the cutoff, if that comes first)'''
+    binCount = max(int(numpy.ceil(float(cutoff)/resolution)), 1)
+    centres = numpy.minimum((numpy.arange(binCount) + 0.5) * resolution, cutoff)
+    return weightFunction(centres)
+
+# A function for weighting travel times from a lookup table
+def lookupWeights(minutes, table, resolution, cutoff, weightFunction):
+    '''Times outside (0, cutoff] are weighted exactly'''
+    minutes = numpy.asarray(minutes, dtype=numpy.float64)
+    # The tolerance keeps times on a bin edge (e.g. a zone limit) in the bin below
+    index = numpy.ceil(minutes/resolution - 1e-9).astype(numpy.intp) - 1
+    numpy.clip(index, 0, table.shape[-1] - 1, out=index)
+    weights = numpy.take(table, index, axis=-1)
+    outside = (minutes <= 0) | (minutes > cutoff)
+    if outside.any():
+        weights[..., outside] = weightFunction(minutes[outside])
+    return weights
+
+# A function for the largest difference between table & exact weights
+def lookupError(weightFunction, table, resolution, cutoff):
+    '''Decay weights never rise with time, so across a bin they lie between
+    the weights at its two ends & the largest error is at one of them. A
+    bin starts just past its lower edge, as times on the edge (e.g. a zone
+    limit) belong to the bin below.'''
+    binCount = table.shape[-1]
+    starts = numpy.minimum((numpy.arange(binCount) + 2e-9) * resolution, cutoff)
+    ends = numpy.minimum((numpy.arange(binCount) + 1.0) * resolution, cutoff)
+    minutes = numpy.concatenate([starts, ends])
+    exact = weightFunction(minutes)
+    quantized = lookupWeights(minutes, table, resolution, cutoff, weightFunction)
+    return float(numpy.max(numpy.abs(exact - quantized))) if minutes.size else 0.0
+
+# A function for turning a weight function into a quantized one
+def quantizedWeights(weightFunction, cutoff, resolution):
+    '''Returns the quantized weight function & its largest error'''
+    cutoff = float(numpy.max(cutoff))
+    table = lookupTable(weightFunction, cutoff, resolution)
+    maxError = lookupError(weightFunction, table, resolution, cutoff)
+    return (lambda minutes: lookupWeights(minutes, table, resolution, cutoff, weightFunction)), maxError
@@ -0,0 +1,177 @@
+'''-----------------------------------------------------------------------------
+# Name:        SFCA_Jobs_Version_1.0
+# Purpose:     Run E2SFCA & V2SFCA jobs from a YAML or JSON job spec, several
+#              at a time, without the ArcGIS toolbox
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# A job spec lists runs of runE2SFCA() or runV2SFCA(); each job's keys are
+# the keyword arguments of its function, on top of the shared defaults:
+#
+#   workers: 4
+#   defaults:
+#     inputND: C:/data/streets_ND
+#     cacheFolder: C:/data/od_cache
+#   jobs:
+#     - name: clinics
+#       method: V2SFCA
+#       inputSupply: C:/data/clinics.shp
+#       ...
+#
+# Jobs run in a process pool, one process per job. With a cache folder,
+# the first job of each O-D matrix (method, network, supply, demand,
+# catchment, aggregation & tiles) runs before the others, so the rest load
+# the matrix from the cache.
+# Jobs in a pool solve their own O-D batches in one process, as pool
+# processes cannot start workers of their own. Each job runs in a scratch
+# workspace of its own (a job's scratchWorkspace, or a new temporary
+# folder), so jobs running at once never share scratch data; the tools only
+# write to their outputs & scratch, never to their inputs.
+#
+# Example:
+#   python sfca_jobs_GitHub.py jobs.yaml --workers 4 --results results.json
+
+# Import necessary modules
+import sys
+import json
+import time
+import tempfile
+import argparse
+import traceback
+import multiprocessing
+import od_parallel_GitHub as od_parallel
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Arguments naming the O-D matrix of a job. The tools key cached matrices
+# differently (E2SFCA by text IDs, V2SFCA by ObjectIDs), and aggregation
+# & categories change the points solved, so these are part of it too.
+matrixArguments = ["method", "inputND", "localNetwork", "localMinutesField", "inputSupply",
+                   "inputSupplyID", "categorySupply", "inputDemand", "inputDemandID", "cacheFolder",
+                   "demandCellSize", "demandTolerance", "tileSize"]
+
+# A function for reading a job spec
+def readSpec(path):
+    '''.yaml & .yml files need PyYAML; anything else is read as JSON'''
+    with open(path) as specFile:
+        if path.lower().endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ImportError("Reading %s needs PyYAML; use a JSON job spec instead"%path)
+            return yaml.safe_load(specFile)
+        return json.load(specFile)
+
+# A function for the jobs of a spec, with the defaults applied
+def specJobs(spec):
+    defaults = spec.get("defaults") or {}
+    jobs = []
+    for number, job in enumerate(spec.get("jobs") or []):
+        arguments = dict(defaults)
+        arguments.update(job)
+        arguments.setdefault("name", "job%s"%(number + 1))
+        if arguments.get("method") not in ("E2SFCA", "V2SFCA"):
+            raise ValueError("Job %s: method must be E2SFCA or V2SFCA"%arguments["name"])
+        jobs.append(arguments)
+    return jobs
+
+# A function for the O-D matrix a job solves
+def matrixKey(job):
+    '''Jobs with the same key can share a cached matrix'''
+    if job["method"] == "E2SFCA":
+        catchment = max(float(value) for value in job.get("distList") or [0])
+    else:
+        catchment = float(job.get("distance") or 0)
+    return tuple([str(job.get(name) or "") for name in matrixArguments] + [catchment])
+
+# A function for splitting jobs into waves
+def jobWaves(jobs):
+    '''The first job of each cached matrix runs in the first wave'''
+    first, rest = [], []
+    seen = set()
+    for job in jobs:
+        key = matrixKey(job)
+        if job.get("cacheFolder") and key in seen:
+            rest.append(job)
+        else:
+            seen.add(key)
+            first.append(job)
+    return [wave for wave in (first, rest) if wave]
+
+# A function for running one job
+def runJob(job):
+    '''Returns the job's name, method, seconds, scratch workspace & summary
+    or error'''
+    arguments = dict(job)
+    name = arguments.pop("name")
+    method = arguments.pop("method")
+    scratch = arguments.pop("scratchWorkspace", "") or tempfile.mkdtemp(prefix="sfca_job_")
+    start = time.time()
+    result = {"name": name, "method": method, "scratchWorkspace": scratch}
+    try:
+        # The tools import arcpy, so they are only loaded where a job runs
+        import arcpy
+        arcpy.env.scratchWorkspace = scratch
+        if method == "E2SFCA":
+            from E2SFCA_v1_GitHub import runE2SFCA as runTool
+        else:
+            from V2SFCA_v1_GitHub import runV2SFCA as runTool
+        result["summary"] = runTool(**arguments)
+    except Exception:
+        result["error"] = traceback.format_exc()
+    result["seconds"] = time.time() - start
+    return result
+
+# A function for running jobs, several at a time
+def runJobs(jobs, workers=1):
+    '''Yields each job's result as it finishes, wave by wave'''
+    for wave in jobWaves(jobs):
+        if workers <= 1 or len(wave) == 1:
+            for job in wave:
+                yield runJob(job)
+            continue
+        # The caller's jobs are left as they are
+        wave = [dict(job, workers=1) for job in wave]
+        multiprocessing.set_executable(od_parallel.pythonExecutable())
+        # A fresh process per job keeps layers & licenses of jobs apart
+        pool = multiprocessing.Pool(min(workers, len(wave)), maxtasksperchild=1)
+        try:
+            for result in pool.imap_unordered(runJob, wave):
+                yield result
+        finally:
+            pool.close()
+            pool.join()
+
+# Main function
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run E2SFCA & V2SFCA jobs from a job spec")
+    parser.add_argument("spec", help="YAML or JSON job spec")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="jobs run at once (default: the spec's workers, or 1)")
+    parser.add_argument("--results", default="", help="JSON file for the results")
+    args = parser.parse_args(argv)
+
+    spec = readSpec(args.spec)
+    workers = args.workers if args.workers is not None else int(spec.get("workers") or 1)
+    jobs = specJobs(spec)
+    results = []
+    for result in runJobs(jobs, workers):
+        results.append(result)
+        if "error" in result:
+            print("%s (%s) failed after %.1f s:\n%s"%(result["name"], result["method"],
+                                                     result["seconds"], result["error"]))
+        else:
+            print("%s (%s) done in %.1f s: mean score %s"%(result["name"], result["method"],
+                                                          result["seconds"],
+                                                          result["summary"]["meanScore"]))
+    if args.results:
+        with open(args.results, "w") as resultsFile:
+            json.dump({"jobs": results}, resultsFile, indent=2)
+    return 1 if any("error" in result for result in results) else 0
+
+# A standard python protocol to check before running the module's main funcion.
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
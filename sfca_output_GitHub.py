@@ -0,0 +1,167 @@
+'''-----------------------------------------------------------------------------
+# Name:        SFCA_Output_Version_1.0
+# Purpose:     Write scores & O-D lines to compact columnar files (.npz,
+#              .arrow or .parquet) that load without a geodatabase
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# A .npz file holds one array per column, stored uncompressed so each can be
+# memory-mapped straight from the archive by readColumnar(). O-D lines are
+# kept as int32 positions into the supply & demand key arrays, with float32
+# minutes:
+#   od_supplyKeys, od_demandKeys, od_supplyIndex, od_demandIndex, od_minutes
+# Arrow (.arrow/.feather) & Parquet files need pyarrow. Scores go to the
+# named file and O-D lines to "<name>_od<extension>", with the IDs
+# dictionary-encoded over the same int32 positions.
+
+# Import necessary modules
+import os
+import struct
+import zipfile
+import numpy
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Extensions written with pyarrow
+arrowExtensions = [".arrow", ".feather"]
+parquetExtensions = [".parquet"]
+
+# A function for the score columns of a run
+def scoreColumns(ids, scores, spar, idName="ID", fields=None):
+    '''Returns (name, array) pairs; 2-D scores & SPAR (one row per scenario)
+    give S1_Score, S1_SPAR, S2_Score..., or the (score, SPAR) names in
+    fields, one pair per row'''
+    ids = numpy.asarray(ids)
+    # int32 when every ID fits, so wide IDs (e.g. GEOID-style keys) never wrap
+    if ids.dtype.kind in "iu":
+        limits = numpy.iinfo(numpy.int32)
+        fits = not len(ids) or (ids.min() >= limits.min and ids.max() <= limits.max)
+        ids = ids.astype(numpy.int32 if fits else numpy.int64)
+    columns = [(idName, ids)]
+    scores = numpy.asarray(scores, dtype=numpy.float64)
+    spar = numpy.asarray(spar, dtype=numpy.float64)
+    if scores.ndim == 1:
+        return columns + [("Step2_Score", scores), ("SPAR", spar)]
+    if fields is None:
+        fields = [("S%s_Score"%(scenario + 1), "S%s_SPAR"%(scenario + 1)) for scenario in range(len(scores))]
+    for scenario, (scoreName, sparName) in enumerate(fields):
+        columns.append((scoreName, scores[scenario]))
+        columns.append((sparName, spar[scenario]))
+    return columns
+
+# A function for joining O-D chunks into compact line arrays
+def odColumns(chunks):
+    '''chunks yields (supplyIndex, demandIndex, minutes); returns int32
+    supply & demand positions and float32 minutes'''
+    chunks = [chunk for chunk in chunks if len(chunk[0])]
+    if not chunks:
+        return (numpy.zeros(0, dtype=numpy.int32), numpy.zeros(0, dtype=numpy.int32),
+                numpy.zeros(0, dtype=numpy.float32))
+    supplyIndex, demandIndex, minutes = [numpy.concatenate(column) for column in zip(*chunks)]
+    return (supplyIndex.astype(numpy.int32), demandIndex.astype(numpy.int32),
+            minutes.astype(numpy.float32))
+
+# A function for the path the O-D lines of an Arrow or Parquet file go to
+def odPath(path):
+    root, extension = os.path.splitext(path)
+    return root + "_od" + extension
+
+# A function for writing scores (and optionally O-D lines) to a columnar file
+def writeColumnar(path, columns, supplyKeys=None, demandKeys=None, lineChunks=None):
+    '''columns come from scoreColumns(); lineChunks yields (supplyIndex,
+    demandIndex, minutes) & needs the key arrays. Returns the paths written.'''
+    extension = os.path.splitext(path)[1].lower()
+    if lineChunks is not None:
+        supplyIndex, demandIndex, minutes = odColumns(lineChunks)
+        supplyKeys, demandKeys = numpy.asarray(supplyKeys).astype(str), numpy.asarray(demandKeys).astype(str)
+    if extension in arrowExtensions + parquetExtensions:
+        if pyarrow is None:
+            raise ImportError("Writing %s files needs pyarrow; use .npz instead"%extension)
+        tables = [(path, pyarrow.table([pyarrow.array(column) for name, column in columns],
+                                       names=[name for name, column in columns]))]
+        if lineChunks is not None:
+            odTable = pyarrow.table([pyarrow.DictionaryArray.from_arrays(supplyIndex, supplyKeys),
+                                     pyarrow.DictionaryArray.from_arrays(demandIndex, demandKeys),
+                                     pyarrow.array(minutes)],
+                                    names=["Supply_ID", "Demand_ID", "Total_Minutes"])
+            tables.append((odPath(path), odTable))
+        for tablePath, table in tables:
+            if extension in parquetExtensions:
+                pyarrow.parquet.write_table(table, tablePath)
+            else:
+                # Uncompressed, so the file can be memory-mapped
+                with pyarrow.OSFile(tablePath, "wb") as sink:
+                    with pyarrow.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+        return [tablePath for tablePath, table in tables]
+    arrays = dict(columns)
+    if lineChunks is not None:
+        arrays.update({"od_supplyKeys": supplyKeys, "od_demandKeys": demandKeys,
+                       "od_supplyIndex": supplyIndex, "od_demandIndex": demandIndex,
+                       "od_minutes": minutes})
+    # savez (not savez_compressed) keeps every member mappable
+    with open(path, "wb") as outputFile:
+        numpy.savez(outputFile, **arrays)
+    return [path]
+
+# A function for memory-mapping the arrays of an uncompressed .npz file
+def mapNpz(path):
+    '''Returns a dict of read-only memory maps, one per array'''
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as npzFile:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError("%s is compressed and cannot be memory-mapped"%path)
+            # Skip the local file header to the start of the .npy member
+            npzFile.seek(info.header_offset)
+            header = npzFile.read(30)
+            nameLength, extraLength = struct.unpack("<HH", header[26:30])
+            npzFile.seek(info.header_offset + 30 + nameLength + extraLength)
+            version = numpy.lib.format.read_magic(npzFile)
+            if version == (1, 0):
+                shape, fortranOrder, dtype = numpy.lib.format.read_array_header_1_0(npzFile)
+            else:
+                shape, fortranOrder, dtype = numpy.lib.format.read_array_header_2_0(npzFile)
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if numpy.prod(shape) == 0:
+                arrays[name] = numpy.zeros(shape, dtype=dtype)
+            else:
+                arrays[name] = numpy.memmap(path, dtype=dtype, mode="r", offset=npzFile.tell(),
+                                            shape=shape, order="F" if fortranOrder else "C")
+    return arrays
+
+# A function for reading a columnar file back
+def readColumnar(path):
+    '''Returns a dict of arrays; .npz & Arrow files are memory-mapped. The O-D
+    lines of an Arrow or Parquet file are read from "<name>_od<extension>"
+    into the same od_ arrays as a .npz file holds.'''
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in arrowExtensions + parquetExtensions:
+        return mapNpz(path)
+    if pyarrow is None:
+        raise ImportError("Reading %s files needs pyarrow"%extension)
+    def readTable(tablePath):
+        if extension in parquetExtensions:
+            return pyarrow.parquet.read_table(tablePath, memory_map=True)
+        return pyarrow.ipc.open_file(pyarrow.memory_map(tablePath, "r")).read_all()
+    table = readTable(path)
+    arrays = dict((name, table.column(name).to_numpy()) for name in table.column_names)
+    if os.path.exists(odPath(path)):
+        odTable = readTable(odPath(path)).combine_chunks()
+        for name, prefix in [("Supply_ID", "od_supply"), ("Demand_ID", "od_demand")]:
+            column = odTable.column(name).chunk(0) if odTable.num_rows else None
+            if column is None:
+                arrays[prefix + "Keys"] = numpy.zeros(0, dtype=str)
+                arrays[prefix + "Index"] = numpy.zeros(0, dtype=numpy.int32)
+            else:
+                arrays[prefix + "Keys"] = column.dictionary.to_numpy(zero_copy_only=False).astype(str)
+                arrays[prefix + "Index"] = column.indices.to_numpy()
+        arrays["od_minutes"] = odTable.column("Total_Minutes").to_numpy()
+    return arrays
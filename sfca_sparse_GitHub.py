@@ -0,0 +1,70 @@
+'''-----------------------------------------------------------------------------
+# Name:        SFCA_Sparse_Version_1.0
+# Purpose:     Score the Two-Step Floating Catchment Area methods as sparse
+#              matrix products
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# W is the weighted O-D matrix, one row per supply point & one column per
+# demand point. With S the supply volumes & D the demand volumes:
+#   Step 1: R = S / (W.D)
+#   Step 2: A = W'.R
+# W is built once from the O-D lines; each step is then one sparse product.
+# Volumes (or ratios) given as 2-D arrays hold one scenario per row and are
+# scored in a single sparse-dense product.
+
+# Import necessary modules
+import numpy
+from scipy import sparse
+import sfca_core_GitHub as sfca_core
+
+# A function for building the weight matrix from weighted O-D chunks
+def weightMatrix(chunks, supplyCount, demandCount):
+    '''chunks yields (supplyIndex, demandIndex, weights) with one weight per
+    line; repeated pairs are summed'''
+    chunks = [chunk for chunk in chunks if len(chunk[0])]
+    if chunks:
+        supplyIndex, demandIndex, weights = [numpy.concatenate(column) for column in zip(*chunks)]
+    else:
+        supplyIndex = demandIndex = numpy.zeros(0, dtype=numpy.int64)
+        weights = numpy.zeros(0)
+    weights = numpy.asarray(weights, dtype=numpy.float64)
+    if weights.ndim != 1:
+        raise ValueError("The weight matrix takes one weight per line, not one per scenario")
+    matrix = sparse.csr_matrix((weights, (supplyIndex, demandIndex)),
+                               shape=(supplyCount, demandCount))
+    matrix.sum_duplicates()
+    return matrix
+
+# A function for multiplying the matrix with 1-D or 2-D (scenario rows) values
+def product(matrix, values):
+    values = numpy.asarray(values, dtype=numpy.float64)
+    if values.ndim == 1:
+        return matrix.dot(values)
+    return matrix.dot(values.T).T
+
+# A function for the first step: supply-to-demand ratio of each supply point
+def step1Ratios(matrix, supplyVolume, demandVolume, multiplier=1.0):
+    '''Weighted demand totals are W.D; several supply scenarios share them'''
+    demandTotals = product(matrix, demandVolume)
+    supplyVolume = numpy.asarray(supplyVolume, dtype=numpy.float64)
+    if supplyVolume.ndim > demandTotals.ndim:
+        demandTotals = numpy.broadcast_to(demandTotals, supplyVolume.shape)
+    return sfca_core.ratiosFromTotals(supplyVolume, demandTotals, multiplier)
+
+# A function for the second step: sum of weighted ratios at each demand point
+def step2Scores(matrix, ratios):
+    '''Demand points with no supply in reach score 0'''
+    return product(matrix.T, ratios)
+
+# A function running both steps and SPAR
+def twoStepScores(matrix, supplyVolume, demandVolume, multiplier=1.0, step2Matrix=None):
+    '''step2Matrix is the weight matrix of a second step solved on its own
+    O-D matrix. Returns Step 1 ratios, Step 2 scores, SPAR and the mean
+    score.'''
+    ratios = step1Ratios(matrix, supplyVolume, demandVolume, multiplier)
+    scores = step2Scores(matrix if step2Matrix is None else step2Matrix, ratios)
+    spar, avgSpai = sfca_core.sparScores(scores)
+    return ratios, scores, spar, avgSpai
@@ -0,0 +1,92 @@
+'''-----------------------------------------------------------------------------
+# Name:        SFCA_Tables_Version_1.0
+# Purpose:     Write scores & O-D lines to geodatabase tables for the
+#              Two-Step Floating Catchment Area tools
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Inputs are never written to. Scores go to a copy of the points, made with
+# CopyFeatures from the working layer so selections & definition queries
+# carry over, and are added to the copy in one bulk ExtendTable. A copy has
+# ObjectIDs of its own; copiedOIDs() matches them with the input's.
+
+# Import necessary modules
+import numpy
+import sfca_core_GitHub as sfca_core
+
+# A function for integer IDs a LONG field can hold
+def longIDs(ids):
+    '''IDs past the 32-bit range (e.g. BigInteger or GEOID-style keys) raise
+    an error rather than wrap, which would corrupt the join'''
+    ids = numpy.asarray(ids)
+    limits = numpy.iinfo(numpy.int32)
+    if len(ids) and (ids.min() < limits.min or ids.max() > limits.max):
+        raise ValueError("IDs from %s to %s do not fit a LONG field; use a text ID field"%(ids.min(), ids.max()))
+    return ids.astype(numpy.int32)
+
+# A function for writing arrays to a table in one bulk operation
+def extendColumns(table, idField, ids, fields, columns):
+    '''Fields of the same name are replaced; rows are matched on idField'''
+    import arcpy
+    tablePath = arcpy.Describe(table).catalogPath
+    existing = [field.name for field in arcpy.ListFields(tablePath)]
+    stale = [field for field in fields if field in existing]
+    if stale:
+        arcpy.DeleteField_management(tablePath, stale)
+    ids = numpy.asarray(ids)
+    if ids.dtype.kind in "iu":
+        ids = longIDs(ids)
+    array = numpy.zeros(len(ids), dtype=[(str(idField), ids.dtype)] +
+                        [(str(field), numpy.float64) for field in fields])
+    array[str(idField)] = ids
+    for field, column in zip(fields, columns):
+        array[str(field)] = column
+    arcpy.da.ExtendTable(tablePath, idField, array, idField)
+    return tablePath
+
+# A function for matching the ObjectIDs of a copy with those of its source
+def copiedOIDs(source, copy, sourceOIDs):
+    '''Both are read in cursor order, which CopyFeatures keeps; the
+    coordinates (read in the source's coordinate system) must agree row by
+    row. Returns the copy's ObjectID of each of sourceOIDs.'''
+    import arcpy
+    fields = ["OID@", "SHAPE@X", "SHAPE@Y"]
+    sourceRows = numpy.array([row for row in arcpy.da.SearchCursor(source, fields)],
+                             dtype=numpy.float64).reshape(-1, 3)
+    copyRows = numpy.array([row for row in arcpy.da.SearchCursor(copy, fields,
+                                                                 spatial_reference=arcpy.Describe(source).spatialReference)],
+                           dtype=numpy.float64).reshape(-1, 3)
+    if len(sourceRows) != len(copyRows) or not numpy.allclose(sourceRows[:, 1:], copyRows[:, 1:],
+                                                              rtol=0.0, atol=1e-6, equal_nan=True):
+        raise ValueError("The rows of %s could not be matched with those of %s"%(copy, source))
+    position = sfca_core.mapIndex(sourceRows[:, 0].astype(numpy.int64),
+                                  numpy.asarray(sourceOIDs).astype(numpy.int64))
+    if (position < 0).any():
+        raise ValueError("%s is missing ObjectIDs of %s"%(copy, source))
+    return copyRows[position, 0].astype(numpy.int64)
+
+# A function for writing scores to a copy of points
+def scoredCopy(points, path, idField, ids, fields, columns):
+    '''Copies points (honouring selections & definition queries) to path &
+    adds the score columns to the copy, matched on idField. With "OID@" ids
+    are the points' ObjectIDs. Returns the path.'''
+    import arcpy
+    if arcpy.Exists(path):
+        arcpy.Delete_management(path)
+    arcpy.CopyFeatures_management(points, path)
+    if idField == "OID@":
+        ids = copiedOIDs(points, path, ids)
+        idField = arcpy.Describe(path).OIDFieldName
+    extendColumns(path, idField, ids, fields, columns)
+    return path
+
+# A function for writing the O-D lines resolved against the points
+def writeODTable(table, records):
+    '''records come from sfca_core.odRecords(); an existing table is replaced'''
+    import arcpy
+    if arcpy.Exists(table):
+        arcpy.Delete_management(table)
+    arcpy.da.NumPyArrayToTable(records, table)
+    return table
@@ -0,0 +1,408 @@
+'''-----------------------------------------------------------------------------
+# Name:        SFCA_Tiles_Version_1.0
+# Purpose:     Run V2SFCA in spatial tiles, solved by worker processes or
+#              machines sharing a job queue folder
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Supply points are split into square tiles of a given size (map units);
+# each tile owns the facilities inside it. A tile's job holds its own
+# facilities & the demand points within the halo of any of them, the
+# straight-line reach of the catchment at the network's maximum speed (see
+# od_prefilter). Every demand point a facility can reach is in its tile's
+# job, so the tile computes the facility's Step 1 ratio exactly, and once.
+# Step 2 scores are sums over facilities, so each tile also returns its
+# facilities' part of the score of every demand point in its halo.
+#
+# The queue is a folder every worker can reach:
+#   settings.json  - solver, network & weights, shared by all jobs
+#   pending/       - tile_<n>.npz jobs waiting for a worker
+#   claimed/       - jobs being solved; a worker claims one by moving it here
+#   done/          - each tile's ratios & score parts, and its O-D lines
+#                    (tile_<n>_first.npz, tile_<n>_second.npz) in the
+#                    od_cache spill layout
+#   failed/        - the error of each tile that could not be solved
+# Moving a file is atomic, so no two workers solve the same job. A worker
+# touches its claim every few minutes while it solves (a heartbeat), so a
+# claim untouched for the run's stale time (staleSeconds by default, kept
+# in settings.json) is put back, in case its worker was lost. Results
+# are merged in tile order, so scores do not depend on which worker
+# finished first.
+#
+# Workers on other machines join with:
+#   python sfca_tiles_GitHub.py work \\server\share\tiles --wait 600
+
+# Import necessary modules
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import threading
+import traceback
+import subprocess
+import numpy
+from scipy.spatial import cKDTree
+import sfca_core_GitHub as sfca_core
+import sfca_decay_GitHub as sfca_decay
+import od_graph_GitHub as od_graph
+import od_parallel_GitHub as od_parallel
+
+# Solvers a job can name (see od_parallel)
+solvers = {"graph": od_graph.graphSolver,
+           "networkAnalyst": od_parallel.networkAnalystSolver,
+           "straightLine": od_parallel.straightLineSolver}
+
+# Seconds after which a claim nobody touched is thought lost & put back
+staleSeconds = 900
+
+# Claims are touched this many times per stale time while a job is solved
+heartbeats = 5
+
+# Sub-folders of a queue
+queueFolders = ["pending", "claimed", "done", "failed"]
+
+# A function for the tile of each point
+def pointTiles(xs, ys, tileSize):
+    '''Returns the tile number of each point & the (column, row) of each
+    tile; tiles are numbered in column, row order'''
+    xs = numpy.asarray(xs, dtype=numpy.float64)
+    ys = numpy.asarray(ys, dtype=numpy.float64)
+    if not len(xs):
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros((0, 2), dtype=numpy.int64)
+    cells = numpy.column_stack([numpy.floor(xs/tileSize), numpy.floor(ys/tileSize)]).astype(numpy.int64)
+    tiles, tileOfPoint = numpy.unique(cells, axis=0, return_inverse=True)
+    return tileOfPoint.ravel().astype(numpy.int64), tiles
+
+# A function for emptying a queue folder
+def resetQueue(queueFolder):
+    '''Jobs & results of an earlier run are removed'''
+    for name in queueFolders:
+        shutil.rmtree(os.path.join(queueFolder, name), ignore_errors=True)
+        os.makedirs(os.path.join(queueFolder, name))
+
+# A function for writing a file under its final name only once it is whole
+def writeWhole(path, writer):
+    tempPath = path + ".%s.tmp"%os.getpid()
+    with open(tempPath, "wb") as tempFile:
+        writer(tempFile)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tempPath, path)
+    return path
+
+# A function for writing the jobs of a tiled run
+def writeJobs(queueFolder, settings, supplyIDs, supplyVolume, supplyX, supplyY,
+              demandIDs, demandVolume, demandX, demandY, tileSize, halo):
+    '''settings are shared by every job (see tileSettings). Returns the
+    number of jobs; tiles without facilities get none.'''
+    if halo <= 0:
+        raise ValueError("Tiled runs need a maximum speed, which bounds the halo of each tile")
+    resetQueue(queueFolder)
+    writeWhole(os.path.join(queueFolder, "settings.json"),
+               lambda settingsFile: settingsFile.write(json.dumps(settings, indent=2).encode("utf-8")))
+    supplyIDs, demandIDs = numpy.asarray(supplyIDs), numpy.asarray(demandIDs)
+    supplyVolume = numpy.asarray(supplyVolume, dtype=numpy.float64)
+    demandVolume = numpy.asarray(demandVolume, dtype=numpy.float64)
+    supplyX, supplyY = numpy.asarray(supplyX, dtype=numpy.float64), numpy.asarray(supplyY, dtype=numpy.float64)
+    demandX, demandY = numpy.asarray(demandX, dtype=numpy.float64), numpy.asarray(demandY, dtype=numpy.float64)
+    tileOfSupply, tiles = pointTiles(supplyX, supplyY, tileSize)
+    demandTree = cKDTree(numpy.column_stack([demandX, demandY]).reshape(-1, 2)) if len(demandX) else None
+    # A little slack, so pairs exactly at the halo are kept
+    bound = halo * (1.0 + 1e-9) + 1e-9
+    order = numpy.argsort(tileOfSupply, kind="mergesort")
+    starts = numpy.searchsorted(tileOfSupply[order], numpy.arange(len(tiles) + 1))
+    for tile in range(len(tiles)):
+        owned = order[starts[tile]:starts[tile + 1]]
+        inHalo = numpy.zeros(0, dtype=numpy.int64)
+        if demandTree is not None:
+            near = demandTree.query_ball_point(numpy.column_stack([supplyX[owned], supplyY[owned]]), bound)
+            inHalo = numpy.unique(numpy.concatenate([numpy.asarray(points, dtype=numpy.int64)
+                                                     for points in near]))
+        job = {"tile": tiles[tile], "supplyIndex": owned, "supplyIDs": supplyIDs[owned],
+               "supplyVolume": supplyVolume[owned], "supplyX": supplyX[owned], "supplyY": supplyY[owned],
+               "demandIndex": inHalo, "demandIDs": demandIDs[inHalo], "demandVolume": demandVolume[inHalo],
+               "demandX": demandX[inHalo], "demandY": demandY[inHalo]}
+        jobPath = os.path.join(queueFolder, "pending", "tile_%05d.npz"%tile)
+        writeWhole(jobPath, lambda jobFile: numpy.savez(jobFile, **job))
+    return len(tiles)
+
+# A function for the settings shared by the jobs of a run
+def tileSettings(solver, distance, coefficient, decayName="Gaussian", weightResolution=0,
+                 reuseMatrix=False, supplyPoints="", demandPoints="", **task):
+    '''solver names one of solvers. task holds what the solver needs besides
+    its points (e.g. networkFile & minutesField, networkDataset &
+    scratchFolder, or speed); supplyPoints & demandPoints are the catalog
+    paths Network Analyst loads points from. With reuseMatrix the second
+    step reuses the first matrix (symmetric networks only).'''
+    if solver not in solvers:
+        raise ValueError("Unknown solver %s (choose from %s)"%(solver, ", ".join(sorted(solvers))))
+    return {"solver": solver, "distance": float(distance), "coefficient": float(coefficient),
+            "decayName": decayName, "weightResolution": float(weightResolution),
+            "reuseMatrix": bool(reuseMatrix), "supplyPoints": supplyPoints,
+            "demandPoints": demandPoints, "task": task}
+
+# A function for the weight function of a run's settings
+def settingsWeights(settings):
+    decay = sfca_decay.decayFunction(settings["decayName"])[0]
+    weightFunction = lambda odMinutes: sfca_core.continuousWeights(odMinutes, settings["distance"],
+                                                                   settings["coefficient"], decay)
+    if settings["weightResolution"] > 0:
+        weightFunction = sfca_decay.quantizedWeights(weightFunction, settings["distance"],
+                                                     settings["weightResolution"])[0]
+    return weightFunction
+
+# A function for the solver task of one matrix of a tile
+def tileTask(settings, tile, originIDs, originX, originY, originPoints,
+             destinationIDs, destinationX, destinationY, destinationPoints):
+    '''Holds what every solver of od_parallel needs'''
+    task = dict(settings["task"])
+    task.update({"batch": tile, "cutoff": settings["distance"],
+                 "originIDs": originIDs, "originPoints": originPoints,
+                 "originXY": dict(zip(originIDs.tolist(), zip(originX.tolist(), originY.tolist()))),
+                 "destinationOIDs": destinationIDs, "destinationPoints": destinationPoints,
+                 "destinationXY": dict(zip(destinationIDs.tolist(),
+                                           zip(destinationX.tolist(), destinationY.tolist()))),
+                 "listed": True})
+    return task
+
+# A function for solving & scoring one tile
+def solveTile(settings, tile, job):
+    '''Returns the result (ratios of the tile's facilities & their part of
+    each score) & the lines of the first & second matrix, with positions in
+    the run's supply & demand arrays'''
+    solver = solvers[settings["solver"]]
+    weightFunction = settingsWeights(settings)
+    supplyIDs, demandIDs = job["supplyIDs"], job["demandIDs"]
+    lines = od_parallel.runTask((solver, tileTask(settings, tile, supplyIDs, job["supplyX"], job["supplyY"],
+                                                  settings["supplyPoints"], demandIDs, job["demandX"],
+                                                  job["demandY"], settings["demandPoints"])))
+    firstLines = sfca_core.odArrays(supplyIDs, demandIDs, *lines)
+    firstWeights = weightFunction(firstLines[2])
+    ratios = sfca_core.step1Ratios(job["supplyVolume"], job["demandVolume"], firstLines[0],
+                                   firstLines[1], firstWeights)
+    secondLines, secondWeights = firstLines, firstWeights
+    if not settings["reuseMatrix"]:
+        lines = od_parallel.runTask((solver, tileTask(settings, tile, demandIDs, job["demandX"],
+                                                      job["demandY"], settings["demandPoints"], supplyIDs,
+                                                      job["supplyX"], job["supplyY"],
+                                                      settings["supplyPoints"])))
+        secondLines = sfca_core.odArrays(supplyIDs, demandIDs, lines[1], lines[0], lines[2])
+        secondWeights = weightFunction(secondLines[2])
+    scoreParts = sfca_core.step2Scores(ratios, secondLines[0], secondLines[1], secondWeights, len(demandIDs))
+    result = {"supplyIndex": job["supplyIndex"], "ratios": ratios,
+              "demandIndex": job["demandIndex"], "scoreParts": scoreParts,
+              "lines": len(firstLines[0]) + (0 if settings["reuseMatrix"] else len(secondLines[0]))}
+    runLines = lambda tileLines: {"supplyIndex": job["supplyIndex"][tileLines[0]].astype(numpy.int32),
+                                  "demandIndex": job["demandIndex"][tileLines[1]].astype(numpy.int32),
+                                  "values": tileLines[2]}
+    return result, runLines(firstLines), (None if settings["reuseMatrix"] else runLines(secondLines))
+
+# A function for claiming the next job of a queue
+def claimJob(queueFolder):
+    '''Returns the claimed job's path, or None once no job is pending'''
+    pending = os.path.join(queueFolder, "pending")
+    for name in sorted(os.listdir(pending)):
+        if not name.endswith(".npz"):
+            continue
+        claimed = os.path.join(queueFolder, "claimed", name)
+        try:
+            # The claim's time is when it was made, not when the job was
+            # written, so it is set before the claim can be seen as stale
+            os.utime(os.path.join(pending, name), None)
+            os.rename(os.path.join(pending, name), claimed)
+        except OSError:
+            # Another worker claimed it first
+            continue
+        return claimed
+    return None
+
+# A function for touching a claim until a job is solved
+def heartbeat(claimed, interval):
+    '''Returns an event; setting it stops the heartbeat'''
+    stopped = threading.Event()
+    def touch():
+        while not stopped.wait(interval):
+            try:
+                os.utime(claimed, None)
+            except OSError:
+                # The claim was put back or removed
+                return
+    beat = threading.Thread(target=touch)
+    beat.daemon = True
+    beat.start()
+    return stopped
+
+# A function for solving jobs until the queue is empty
+def workQueue(queueFolder, wait=0):
+    '''wait is how long (seconds) to look for new jobs once none are
+    pending. Returns the number of jobs solved.'''
+    with open(os.path.join(queueFolder, "settings.json")) as settingsFile:
+        settings = json.load(settingsFile)
+    interval = float(settings.get("staleSeconds", staleSeconds)) / heartbeats
+    solved = 0
+    idleSince = time.time()
+    while True:
+        claimed = claimJob(queueFolder)
+        if claimed is None:
+            if time.time() - idleSince >= wait:
+                return solved
+            time.sleep(1)
+            continue
+        name = os.path.basename(claimed)
+        tile = int(name[len("tile_"):-len(".npz")])
+        done = os.path.join(queueFolder, "done")
+        # A job put back after its worker was thought lost may be done already
+        if not os.path.exists(os.path.join(done, name)):
+            beating = heartbeat(claimed, interval)
+            try:
+                with numpy.load(claimed) as stored:
+                    job = dict((key, stored[key]) for key in stored.files)
+                result, firstLines, secondLines = solveTile(settings, tile, job)
+                # The result is written last, so a tile with a result is whole
+                writeWhole(os.path.join(done, "tile_%05d_first.npz"%tile),
+                           lambda linesFile: numpy.savez(linesFile, **firstLines))
+                if secondLines is not None:
+                    writeWhole(os.path.join(done, "tile_%05d_second.npz"%tile),
+                               lambda linesFile: numpy.savez(linesFile, **secondLines))
+                writeWhole(os.path.join(done, name), lambda resultFile: numpy.savez(resultFile, **result))
+                solved += 1
+            except Exception:
+                error = traceback.format_exc()
+                writeWhole(os.path.join(queueFolder, "failed", "tile_%05d.txt"%tile),
+                           lambda errorFile: errorFile.write(error.encode("utf-8")))
+            finally:
+                beating.set()
+        try:
+            os.remove(claimed)
+        except OSError:
+            pass
+        idleSince = time.time()
+
+# A function for putting back jobs whose workers seem lost
+def requeueStale(queueFolder, seconds=staleSeconds):
+    '''Returns the number of jobs put back'''
+    claimedFolder = os.path.join(queueFolder, "claimed")
+    requeued = 0
+    for name in os.listdir(claimedFolder):
+        claimed = os.path.join(claimedFolder, name)
+        try:
+            if time.time() - os.path.getmtime(claimed) < seconds:
+                continue
+            os.rename(claimed, os.path.join(queueFolder, "pending", name))
+            requeued += 1
+        except OSError:
+            # Finished (or put back) meanwhile
+            continue
+    return requeued
+
+# A function for starting workers on this machine
+def startWorkers(queueFolder, count, wait=0):
+    '''Each worker is a separate Python process, standing in for a node'''
+    command = [od_parallel.pythonExecutable(), os.path.abspath(__file__).replace(".pyc", ".py"),
+               "work", queueFolder, "--wait", str(wait)]
+    return [subprocess.Popen(command) for worker in range(count)]
+
+# A function for waiting until every tile has a result
+def waitForTiles(queueFolder, jobCount, seconds=staleSeconds, poll=1.0):
+    '''Jobs left by lost workers are put back & solved here. Raises an
+    error with the traceback of the first tile that failed.'''
+    doneFolder = os.path.join(queueFolder, "done")
+    failedFolder = os.path.join(queueFolder, "failed")
+    while True:
+        failed = sorted(os.listdir(failedFolder))
+        if failed:
+            with open(os.path.join(failedFolder, failed[0])) as errorFile:
+                raise RuntimeError("Tile %s failed:\n%s"%(failed[0][len("tile_"):-len(".txt")],
+                                                          errorFile.read()))
+        results = [name for name in os.listdir(doneFolder)
+                   if name.endswith(".npz") and not name.endswith(("_first.npz", "_second.npz"))]
+        if len(results) >= jobCount:
+            return
+        if requeueStale(queueFolder, seconds):
+            workQueue(queueFolder)
+        time.sleep(poll)
+
+# A function for merging the results of every tile
+def mergeTiles(queueFolder, supplyCount, demandCount):
+    '''Returns Step 1 ratios, Step 2 scores, the lines solved & the paths of
+    the first & second matrix lines, in tile order'''
+    doneFolder = os.path.join(queueFolder, "done")
+    ratios = numpy.zeros(supplyCount)
+    scored = numpy.zeros(supplyCount, dtype=bool)
+    scores = numpy.zeros(demandCount)
+    lineCount = 0
+    firstPaths, secondPaths = [], []
+    for name in sorted(os.listdir(doneFolder)):
+        if not name.endswith(".npz") or name.endswith(("_first.npz", "_second.npz")):
+            continue
+        with numpy.load(os.path.join(doneFolder, name)) as result:
+            supplyIndex = result["supplyIndex"]
+            if scored[supplyIndex].any():
+                raise ValueError("%s holds facilities another tile owns"%name)
+            scored[supplyIndex] = True
+            ratios[supplyIndex] = result["ratios"]
+            numpy.add.at(scores, result["demandIndex"], result["scoreParts"])
+            lineCount += int(result["lines"])
+        firstPaths.append(os.path.join(doneFolder, name[:-len(".npz")] + "_first.npz"))
+        secondPath = os.path.join(doneFolder, name[:-len(".npz")] + "_second.npz")
+        if os.path.exists(secondPath):
+            secondPaths.append(secondPath)
+    return ratios, scores, lineCount, firstPaths, secondPaths
+
+# A function for a whole tiled run
+def runTiles(queueFolder, settings, supplyIDs, supplyVolume, supplyX, supplyY, demandIDs,
+             demandVolume, demandX, demandY, tileSize, halo, workers=0, seconds=staleSeconds):
+    '''workers local processes are started besides this one, which also
+    solves jobs; workers elsewhere may join the queue. Claims untouched for
+    seconds are put back. Returns Step 1 ratios, Step 2 scores, the number
+    of tiles, the lines solved & the paths of the first & second matrix
+    lines.'''
+    # Workers pace their heartbeats by the run's stale time
+    settings = dict(settings, staleSeconds=seconds)
+    jobCount = writeJobs(queueFolder, settings, supplyIDs, supplyVolume, supplyX, supplyY,
+                         demandIDs, demandVolume, demandX, demandY, tileSize, halo)
+    processes = startWorkers(queueFolder, workers) if jobCount > 1 else []
+    try:
+        workQueue(queueFolder)
+        waitForTiles(queueFolder, jobCount, seconds)
+    finally:
+        for process in processes:
+            process.wait()
+    ratios, scores, lineCount, firstPaths, secondPaths = mergeTiles(queueFolder, len(supplyIDs),
+                                                                    len(demandIDs))
+    return ratios, scores, jobCount, lineCount, firstPaths, secondPaths
+
+# A function for describing a tiled run in the report
+def tilesNote(tileCount, tileSize, halo, workers, lineCount):
+    return "Solved in %s tiles of %s map units (halo: %s; %s local workers); %s lines"%(
+        tileCount, tileSize, halo, workers + 1, lineCount)
+
+# Main function
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve the tiles of a tiled V2SFCA run")
+    subparsers = parser.add_subparsers(dest="command")
+    work = subparsers.add_parser("work", help="solve jobs from a queue folder")
+    work.add_argument("queue", help="queue folder of the run")
+    work.add_argument("--wait", type=float, default=0,
+                      help="seconds to keep looking for jobs once none are pending")
+    args = parser.parse_args(argv)
+    if args.command != "work":
+        parser.print_help()
+        return 1
+    # A node may start before the run has written its jobs
+    settingsPath = os.path.join(args.queue, "settings.json")
+    started = time.time()
+    while not os.path.exists(settingsPath) and time.time() - started < args.wait:
+        time.sleep(1)
+    if not os.path.exists(settingsPath):
+        return 0
+    print("%s jobs solved"%workQueue(args.queue, args.wait))
+    return 0
+
+# A standard python protocol to check before running the module's main funcion.
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,135 @@
+'''-----------------------------------------------------------------------------
+# Name:        SFCA_Timing_Version_1.0
+# Purpose:     Record wall time, CPU time, peak memory & row counts of each
+#              stage of a run, for the report and a JSON/CSV sidecar
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Stages are started one after another; starting a stage ends the one
+# before it. Each stage costs four clock reads and two memory queries, so
+# the timings can stay on in production runs.
+#
+# The operating system only keeps the peak memory of the whole process,
+# which never falls. Each stage records that peak as it ends
+# (processPeakMB, cumulative) & how far it rose during the stage
+# (peakGrowthMB). A stage that stays under the peak of earlier stages
+# shows no growth, even if it used a lot of memory.
+
+# Import necessary modules
+import sys
+import json
+import time
+
+# Clocks with the best resolution available
+wallTimer = getattr(time, "perf_counter", time.time)
+cpuTimer = getattr(time, "process_time", None) or getattr(time, "clock")
+
+# Columns of the sidecar & report
+columns = ["stage", "wallSeconds", "cpuSeconds", "processPeakMB", "peakGrowthMB", "rows"]
+
+# A function for the peak memory of this process
+def peakMemory():
+    '''Peak resident set size in MB, or None where it cannot be read'''
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, kilobytes elsewhere
+        return peak / 1048576.0 if sys.platform == "darwin" else peak / 1024.0
+    except ImportError:
+        pass
+    try:
+        import ctypes
+        from ctypes import wintypes
+        class MemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+        counters = MemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / 1048576.0
+    except Exception:
+        return None
+
+class StageTimings(object):
+    '''Timings of the stages of one run.'''
+
+    def __init__(self):
+        self.stages = []
+        self.current = None
+
+    def start(self, name):
+        '''Ends the current stage & starts the next one.'''
+        self.stop()
+        self.current = {"stage": name, "rows": None, "peakStart": peakMemory(),
+                        "wallStart": wallTimer(), "cpuStart": cpuTimer()}
+
+    def rows(self, count):
+        '''Sets the number of rows the current stage processed.'''
+        if self.current is not None:
+            self.current["rows"] = int(count)
+
+    def countLines(self, chunks):
+        '''Passes O-D chunks through, adding their lines to the row count.'''
+        for chunk in chunks:
+            if self.current is not None:
+                self.current["rows"] = (self.current["rows"] or 0) + len(chunk[0])
+            yield chunk
+
+    def stop(self):
+        '''Ends the current stage, if any.'''
+        if self.current is None:
+            return
+        stage = self.current
+        self.current = None
+        wallSeconds = wallTimer() - stage["wallStart"]
+        cpuSeconds = cpuTimer() - stage["cpuStart"]
+        peak = peakMemory()
+        growth = None
+        if peak is not None and stage["peakStart"] is not None:
+            growth = peak - stage["peakStart"]
+        self.stages.append({"stage": stage["stage"], "wallSeconds": wallSeconds,
+                            "cpuSeconds": cpuSeconds, "processPeakMB": peak,
+                            "peakGrowthMB": growth, "rows": stage["rows"]})
+
+    def reportText(self):
+        '''The stages as lines of text for the run report.'''
+        self.stop()
+        lines = []
+        for stage in self.stages:
+            line = "%s: %.3f s wall, %.3f s CPU"%(stage["stage"], stage["wallSeconds"],
+                                                 stage["cpuSeconds"])
+            if stage["processPeakMB"] is not None:
+                line += ", process peak memory so far %.1f MB"%stage["processPeakMB"]
+            if stage["peakGrowthMB"] is not None:
+                line += " (+%.1f MB in this stage)"%stage["peakGrowthMB"]
+            if stage["rows"] is not None:
+                line += ", %s rows"%stage["rows"]
+            lines.append(line)
+        total = sum(stage["wallSeconds"] for stage in self.stages)
+        lines.append("Total: %.3f s wall"%total)
+        return "\n".join(lines)
+
+    def writeSidecar(self, path):
+        '''Writes the stages to a .csv file, or as JSON to any other file.'''
+        self.stop()
+        outputFile = open(path, "w")
+        try:
+            if path.lower().endswith(".csv"):
+                outputFile.write(",".join(columns) + "\n")
+                for stage in self.stages:
+                    values = ["" if stage[column] is None else stage[column] for column in columns]
+                    values[0] = '"%s"'%str(values[0]).replace('"', '""')
+                    outputFile.write(",".join(str(value) for value in values) + "\n")
+            else:
+                json.dump({"stages": self.stages}, outputFile, indent=2)
+        finally:
+            outputFile.close()
+        return path
@@ -0,0 +1,194 @@
+'''-----------------------------------------------------------------------------
+# Name:        SFCA_Update_Version_1.0
+# Purpose:     Re-score a previous 2SFCA run when only some supply or demand
+#              points change, without solving the whole network again
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# A run's state holds its points, weighted O-D lines (as COO arrays, see
+# sfca_core), the weighted demand total & Step 1 ratio of each supply point
+# and the Step 2 scores. The first step lines run supply-to-demand; the
+# second step lines are the same unless a separate demand-to-supply matrix
+# was solved.
+#
+# An update changes volumes, removes points & adds points with the O-D lines
+# solved for them. Only supply points whose catchment changed get a new
+# Step 1 ratio, and only demand points reached by those supply points (or
+# that lost lines) get a new Step 2 score. SPAR is then taken over all
+# scores.
+
+# Import necessary modules
+import numpy
+import sfca_core_GitHub as sfca_core
+import od_store_GitHub as od_store
+
+# Names of the line arrays of each step
+stepLines = [("supplyIndex", "demandIndex", "weights"),
+             ("step2SupplyIndex", "step2DemandIndex", "step2Weights")]
+
+# A function for scoring a full run & keeping its state
+def buildState(supplyKeys, supplyVolume, demandKeys, demandVolume, supplyIndex,
+               demandIndex, weights, multiplier=1.0, step2Lines=None):
+    '''step2Lines is an optional (supplyIndex, demandIndex, weights) tuple
+    for a second step solved on its own matrix'''
+    sharedLines = step2Lines is None
+    if sharedLines:
+        step2Lines = (supplyIndex, demandIndex, weights)
+    state = {"sharedLines": numpy.bool_(sharedLines),
+             "supplyKeys": numpy.asarray(supplyKeys).astype(str),
+             "supplyVolume": numpy.asarray(supplyVolume, dtype=numpy.float64),
+             "demandKeys": numpy.asarray(demandKeys).astype(str),
+             "demandVolume": numpy.asarray(demandVolume, dtype=numpy.float64),
+             "multiplier": numpy.float64(multiplier)}
+    for names, lines in zip(stepLines, [(supplyIndex, demandIndex, weights), step2Lines]):
+        state[names[0]] = numpy.asarray(lines[0], dtype=numpy.int64)
+        state[names[1]] = numpy.asarray(lines[1], dtype=numpy.int64)
+        state[names[2]] = numpy.asarray(lines[2], dtype=numpy.float64)
+    weightedDemand = state["demandVolume"][state["demandIndex"]] * state["weights"]
+    state["demandTotals"] = sfca_core.groupSum(state["supplyIndex"], weightedDemand,
+                                               len(state["supplyKeys"]))
+    state["ratios"] = sfca_core.ratiosFromTotals(state["supplyVolume"], state["demandTotals"],
+                                                 multiplier)
+    state["scores"] = sfca_core.step2Scores(state["ratios"], state["step2SupplyIndex"],
+                                            state["step2DemandIndex"], state["step2Weights"],
+                                            len(state["demandKeys"]))
+    state["spar"], state["avgSpai"] = sfca_core.sparScores(state["scores"])
+    return state
+
+# A function for joining weighted O-D chunks into one set of lines
+def linesFromChunks(chunks):
+    '''chunks yields (supplyIndex, demandIndex, weights)'''
+    chunks = list(chunks)
+    if not chunks:
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0)
+    return tuple(numpy.concatenate(column) for column in zip(*chunks))
+
+# A function for scoring a full run from an O-D store (see od_store)
+def stateFromStore(store, supplyVolume, demandVolume, weightFunction, multiplier=1.0):
+    '''Volumes follow the order of the store's keys'''
+    lines = linesFromChunks(sfca_core.weightChunks(od_store.lineChunks(store), weightFunction))
+    return buildState(store["supplyKeys"], supplyVolume, store["demandKeys"], demandVolume,
+                      *lines, multiplier=multiplier)
+
+# A function for storing a state
+def saveState(path, state):
+    numpy.savez(path, **state)
+    return path
+
+# A function for loading a stored state
+def loadState(path):
+    with numpy.load(path) as stored:
+        return dict((name, stored[name]) for name in stored.files)
+
+# A function for the positions of keys that are in a key array
+def keyMask(keys, changedKeys):
+    '''Returns a mask of keys that are in changedKeys'''
+    changedKeys = numpy.asarray(list(changedKeys)).astype(str)
+    return numpy.isin(keys, changedKeys)
+
+# A function for applying volume changes & additions to one point set
+def setVolumes(keys, volume, volumes):
+    '''volumes maps keys to new volumes; unknown keys are added. Returns the
+    keys, volumes & a mask of the points that changed'''
+    newKeys = numpy.asarray(list(volumes.keys())).astype(str)
+    newVolume = numpy.asarray(list(volumes.values()), dtype=numpy.float64)
+    position = sfca_core.mapIndex(keys, newKeys)
+    volume = volume.copy()
+    volume[position[position >= 0]] = newVolume[position >= 0]
+    added = position < 0
+    changed = numpy.zeros(len(keys) + int(added.sum()), dtype=bool)
+    changed[position[position >= 0]] = True
+    changed[len(keys):] = True
+    return (numpy.concatenate([keys, newKeys[added]]),
+            numpy.concatenate([volume, newVolume[added]]), changed)
+
+# A function for updating a state
+def updateState(state, weightFunction=None, supplyVolumes=None, demandVolumes=None,
+                removedSupply=(), removedDemand=(), newLines=None, newStep2Lines=None):
+    '''supplyVolumes & demandVolumes map keys to new volumes (new keys are
+    added points); removedSupply & removedDemand list keys. newLines holds the
+    (supply keys, demand keys, minutes) of the lines solved for added points,
+    weighted by weightFunction; newStep2Lines does the same for a state with
+    a separate second step matrix. Returns the new state & the number of supply and
+    demand points re-scored.'''
+    state = dict(state)
+    multiplier = float(state["multiplier"])
+    sharedLines = bool(state["sharedLines"])
+    if sharedLines:
+        newStep2Lines = None
+    oldRatios, oldScores = state["ratios"], state["scores"]
+
+    # Removals: drop the points & their lines, noting who lost lines
+    keepSupply = ~keyMask(state["supplyKeys"], removedSupply)
+    keepDemand = ~keyMask(state["demandKeys"], removedDemand)
+    supplyMap = numpy.cumsum(keepSupply) - 1
+    demandMap = numpy.cumsum(keepDemand) - 1
+    lostSupply = []
+    lostDemand = []
+    for names in stepLines:
+        supplyIndex, demandIndex = state[names[0]], state[names[1]]
+        keepLine = keepSupply[supplyIndex] & keepDemand[demandIndex]
+        lostSupply.append(supplyMap[supplyIndex[~keepLine & keepSupply[supplyIndex]]])
+        lostDemand.append(demandMap[demandIndex[~keepLine & keepDemand[demandIndex]]])
+        state[names[0]] = supplyMap[supplyIndex[keepLine]]
+        state[names[1]] = demandMap[demandIndex[keepLine]]
+        state[names[2]] = state[names[2]][keepLine]
+    supplyKeys, supplyVolume = state["supplyKeys"][keepSupply], state["supplyVolume"][keepSupply]
+    demandKeys, demandVolume = state["demandKeys"][keepDemand], state["demandVolume"][keepDemand]
+
+    # Volume changes & additions
+    supplyKeys, supplyVolume, changedSupply = setVolumes(supplyKeys, supplyVolume, supplyVolumes or {})
+    demandKeys, demandVolume, changedDemand = setVolumes(demandKeys, demandVolume, demandVolumes or {})
+    supplyCount, demandCount = len(supplyKeys), len(demandKeys)
+
+    # Lines of the added points
+    for names, lines in zip(stepLines, [newLines, newStep2Lines]):
+        if lines is None or len(lines[0]) == 0:
+            continue
+        supplyIndex, demandIndex, lineMinutes = sfca_core.odArrays(supplyKeys, demandKeys,
+                                                                   numpy.asarray(lines[0]).astype(str),
+                                                                   numpy.asarray(lines[1]).astype(str),
+                                                                   lines[2])
+        state[names[0]] = numpy.concatenate([state[names[0]], supplyIndex])
+        state[names[1]] = numpy.concatenate([state[names[1]], demandIndex])
+        state[names[2]] = numpy.concatenate([state[names[2]], weightFunction(lineMinutes)])
+    if sharedLines:
+        for name1, name2 in zip(stepLines[0], stepLines[1]):
+            state[name2] = state[name1]
+
+    # Supply points whose catchment changed get a new Step 1 ratio
+    supplyIndex, demandIndex, weights = [state[name] for name in stepLines[0]]
+    affectedSupply = changedSupply.copy()
+    affectedSupply[supplyIndex[changedDemand[demandIndex]]] = True
+    affectedSupply[lostSupply[0]] = True
+    line = affectedSupply[supplyIndex]
+    totals = sfca_core.groupSum(supplyIndex[line], demandVolume[demandIndex[line]] * weights[line],
+                                supplyCount)
+    demandTotals = numpy.zeros(supplyCount)
+    demandTotals[:int(keepSupply.sum())] = state["demandTotals"][keepSupply]
+    demandTotals[affectedSupply] = totals[affectedSupply]
+    ratios = numpy.zeros(supplyCount)
+    ratios[:int(keepSupply.sum())] = oldRatios[keepSupply]
+    ratios[affectedSupply] = sfca_core.ratiosFromTotals(supplyVolume[affectedSupply],
+                                                        demandTotals[affectedSupply], multiplier)
+
+    # Demand points reached by those supply points (or that lost lines) get
+    # a new Step 2 score
+    supplyIndex, demandIndex, weights = [state[name] for name in stepLines[1]]
+    affectedDemand = changedDemand.copy()
+    affectedDemand[demandIndex[affectedSupply[supplyIndex]]] = True
+    affectedDemand[lostDemand[1]] = True
+    line = affectedDemand[demandIndex]
+    newScores = sfca_core.groupSum(demandIndex[line], ratios[supplyIndex[line]] * weights[line],
+                                   demandCount)
+    scores = numpy.zeros(demandCount)
+    scores[:int(keepDemand.sum())] = oldScores[keepDemand]
+    scores[affectedDemand] = newScores[affectedDemand]
+
+    state.update({"supplyKeys": supplyKeys, "supplyVolume": supplyVolume,
+                  "demandKeys": demandKeys, "demandVolume": demandVolume,
+                  "demandTotals": demandTotals, "ratios": ratios, "scores": scores})
+    state["spar"], state["avgSpai"] = sfca_core.sparScores(scores)
+    return state, int(affectedSupply.sum()), int(affectedDemand.sum())
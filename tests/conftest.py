@@ -0,0 +1,72 @@
+'''-----------------------------------------------------------------------------
+# Name:        Tests_Conftest_Version_1.0
+# Purpose:     Shared fixtures for the tests of the pure-NumPy modules
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# The tests only cover modules that run without ArcGIS. Problems are small
+# & random (with fixed seeds), and every engine is checked against a
+# brute-force answer or against another engine.
+
+# Import necessary modules
+import os
+import sys
+import numpy
+import pytest
+
+# The modules are flat files in the folder above
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sfca_benchmark_GitHub as sfca_benchmark
+
+# A function for random points & volumes
+def randomPoints(count, size, seed):
+    random = numpy.random.RandomState(seed)
+    return random.rand(count) * size, random.rand(count) * size, random.uniform(1, 100, count)
+
+# A function for the O-D matrix of every pair, by brute force
+def bruteMatrix(graph, originNodes, destinationNodes, cutoff):
+    '''Returns origin positions, destination positions & minutes'''
+    from scipy.sparse import csgraph
+    times = csgraph.dijkstra(graph, directed=True)[numpy.ix_(originNodes, destinationNodes)]
+    rows, columns = numpy.nonzero(times <= cutoff)
+    return rows, columns, times[rows, columns]
+
+# A function for sorting lines, so solvers can be compared
+def sortedLines(lines):
+    origin, destination, minutes = [numpy.asarray(column) for column in lines]
+    order = numpy.lexsort((destination, origin))
+    return origin[order], destination[order], minutes[order]
+
+# A function for comparing two sets of O-D lines, whatever their order
+def assertSameLines(lines, expected):
+    lines, expected = sortedLines(lines), sortedLines(expected)
+    numpy.testing.assert_array_equal(lines[0], expected[0])
+    numpy.testing.assert_array_equal(lines[1], expected[1])
+    numpy.testing.assert_allclose(lines[2], expected[2], rtol=1e-12, atol=1e-12)
+
+@pytest.fixture(scope="session")
+def gridRoads():
+    '''A 15 x 15 street grid, 1 minute per block'''
+    return sfca_benchmark.gridNetwork(15)
+
+@pytest.fixture(scope="session")
+def randomRoads():
+    '''A random road network of 400 nodes'''
+    return sfca_benchmark.randomNetwork(400, 20.0, seed=3)
+
+@pytest.fixture
+def problem():
+    '''Supply & demand points with volumes on a 20 x 20 area, and the
+    straight-line O-D matrix between them (1 map unit per minute) within a
+    cutoff of 6 minutes'''
+    supplyX, supplyY, supplyVolume = randomPoints(25, 20.0, 1)
+    demandX, demandY, demandVolume = randomPoints(300, 20.0, 2)
+    minutes = numpy.hypot(supplyX[:, None] - demandX, supplyY[:, None] - demandY)
+    supplyIndex, demandIndex = numpy.nonzero(minutes <= 6.0)
+    return {"supplyX": supplyX, "supplyY": supplyY, "supplyVolume": supplyVolume,
+            "demandX": demandX, "demandY": demandY, "demandVolume": demandVolume,
+            "supplyIndex": supplyIndex, "demandIndex": demandIndex,
+            "minutes": minutes[supplyIndex, demandIndex], "cutoff": 6.0}
@@ -0,0 +1,37 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_OD_Cache_Version_1.0
+# Purpose:     Test the O-D cache keys & cached matrices
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import os
+import numpy
+import od_cache_GitHub as od_cache
+
+def test_cacheKeyFollowsValues():
+    ids, xs, ys = numpy.arange(5), numpy.arange(5.0), numpy.zeros(5)
+    assert od_cache.pointsSignature(ids, xs, ys) == od_cache.pointsSignature(ids.astype(str), xs, ys)
+    assert od_cache.pointsSignature(ids, xs, ys) != od_cache.pointsSignature(ids, xs + 1e-9, ys)
+    assert od_cache.cacheKey(["a", 1]) != od_cache.cacheKey(["a1"])
+
+def test_networkSignatureFollowsTheFile(tmp_path):
+    path = str(tmp_path / "roads.csv")
+    with open(path, "w") as roads:
+        roads.write("fromX,fromY,toX,toY,minutes\n0,0,1,0,2\n")
+    signature = od_cache.networkSignature(path)
+    assert od_cache.networkSignature(path, "edited") != signature
+    with open(path, "a") as roads:
+        roads.write("1,0,2,0,3\n")
+    assert od_cache.networkSignature(path) != signature
+
+def test_cachedMatrixRoundTrip(tmp_path):
+    folder = str(tmp_path / "cache")
+    assert od_cache.loadMatrix(folder, "key") is None
+    od_cache.saveMatrix(folder, "key", [1, 2], ["a", "b"], [1.5, 2.5])
+    origins, destinations, minutes = od_cache.loadMatrix(folder, "key")
+    assert origins.tolist() == ["1", "2"] and destinations.tolist() == ["a", "b"]
+    assert minutes.tolist() == [1.5, 2.5]
+    assert os.listdir(folder) == [os.path.basename(od_cache.cachePath(folder, "key"))]
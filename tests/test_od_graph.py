@@ -0,0 +1,46 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_OD_Graph_Version_1.0
+# Purpose:     Test the local road network solvers against full Dijkstra
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import numpy
+import pytest
+import od_graph_GitHub as od_graph
+from conftest import bruteMatrix, assertSameLines
+
+@pytest.mark.parametrize("roads", ["gridRoads", "randomRoads"])
+def test_solveODMatchesFullDijkstra(roads, request):
+    graph, nodeXY = request.getfixturevalue(roads)
+    random = numpy.random.RandomState(5)
+    # Repeated nodes check that origins on one node share a search
+    originNodes = random.randint(0, graph.shape[0], 60)
+    destinationNodes = random.randint(0, graph.shape[0], 90)
+    assertSameLines(od_graph.solveOD(graph, originNodes, destinationNodes, 4.0),
+                    bruteMatrix(graph, originNodes, destinationNodes, 4.0))
+
+def test_solveODChunksDoNotChangeLines(randomRoads):
+    graph = randomRoads[0]
+    nodes = numpy.arange(0, graph.shape[0], 3)
+    assertSameLines(od_graph.solveOD(graph, nodes, nodes, 5.0, chunkCells=graph.shape[0] * 7),
+                    od_graph.solveOD(graph, nodes, nodes, 5.0))
+
+def test_edgeListNetwork(tmp_path):
+    path = str(tmp_path / "roads.csv")
+    with open(path, "w") as roads:
+        roads.write("fromX,fromY,toX,toY,minutes,oneway\n0,0,1,0,2,0\n1,0,2,0,3,1\n2,0,0,0,10,0\n")
+    graph, nodeXY = od_graph.loadNetwork(path)
+    originIndex, destinationIndex, minutes = od_graph.solvePoints((graph, nodeXY), [0.1], [0.0],
+                                                                   [2.0, 0.9], [0.1, 0.0], 20.0)[:3]
+    assert dict(zip(destinationIndex.tolist(), minutes.tolist())) == {0: 5.0, 1: 2.0}
+
+@pytest.mark.parametrize("minutes", ["", "-1"])
+def test_edgeWithoutTravelTimeIsRejected(tmp_path, minutes):
+    path = str(tmp_path / "roads.csv")
+    with open(path, "w") as roads:
+        roads.write("fromX,fromY,toX,toY,minutes\n0,0,1,0,2.5\n1,0,2,0,%s\n"%minutes)
+    with pytest.raises(ValueError, match="Line 3"):
+        od_graph.readEdgeList(path)
@@ -0,0 +1,45 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_OD_Hierarchy_Version_1.0
+# Purpose:     Test the contraction hierarchy against Dijkstra
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import numpy
+import pytest
+import od_graph_GitHub as od_graph
+import od_hierarchy_GitHub as od_hierarchy
+from conftest import bruteMatrix, assertSameLines
+
+@pytest.mark.parametrize("roads", ["gridRoads", "randomRoads"])
+def test_hierarchyMatchesDijkstra(roads, request):
+    graph, nodeXY = request.getfixturevalue(roads)
+    hierarchy = od_hierarchy.buildHierarchy(graph)
+    random = numpy.random.RandomState(6)
+    originNodes = random.randint(0, graph.shape[0], 50)
+    destinationNodes = random.randint(0, graph.shape[0], 120)
+    assertSameLines(od_hierarchy.solveOD(hierarchy, originNodes, destinationNodes, 4.5),
+                    od_graph.solveOD(graph, originNodes, destinationNodes, 4.5))
+
+def test_hierarchyOnOneWayRoads():
+    random = numpy.random.RandomState(7)
+    fromX, fromY = random.randint(0, 12, 500), random.randint(0, 12, 500)
+    toX, toY = fromX + random.randint(-1, 2, 500), fromY + random.randint(-1, 2, 500)
+    graph = od_graph.buildGraph(fromX, fromY, toX, toY, random.uniform(0.5, 2.0, 500),
+                                oneway=random.rand(500) < 0.3)[0]
+    assert not od_graph.graphIsSymmetric(graph)
+    hierarchy = od_hierarchy.buildHierarchy(graph)
+    nodes = numpy.arange(graph.shape[0])
+    assertSameLines(od_hierarchy.solveOD(hierarchy, nodes, nodes, 6.0),
+                    bruteMatrix(graph, nodes, nodes, 6.0))
+
+def test_hierarchyRoundTrip(gridRoads, tmp_path):
+    hierarchy = od_hierarchy.buildHierarchy(gridRoads[0])
+    path = str(tmp_path / "hierarchy.npz")
+    od_hierarchy.saveHierarchy(path, hierarchy)
+    loaded = od_hierarchy.loadHierarchy(path)
+    nodes = numpy.arange(0, gridRoads[0].shape[0], 4)
+    assertSameLines(od_hierarchy.solveOD(loaded, nodes, nodes, 5.0),
+                    od_hierarchy.solveOD(hierarchy, nodes, nodes, 5.0))
@@ -0,0 +1,43 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_OD_Locations_Version_1.0
+# Purpose:     Test stored network locations & their location files
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import os
+import numpy
+import od_locations_GitHub as od_locations
+
+# A function for location fields of some points
+def locationValues(count, start):
+    return dict((field, numpy.arange(start, start + count).astype(dtype))
+                for field, fieldType, dtype in od_locations.locationFields)
+
+def test_storedLocationsNeedTheSameCoordinates():
+    keys = numpy.array(["a|1", "a|2", "a|3"])
+    hashes = od_locations.geometryHashes([0.0, 1.0, 2.0], [0.0, 0.0, 0.0])
+    locations = od_locations.mergeLocations({}, keys, hashes, locationValues(3, 10))
+    moved = od_locations.geometryHashes([0.0, 1.5, 2.0], [0.0, 0.0, 0.0])
+    found, values = od_locations.storedLocations(locations, numpy.array(["a|3", "a|2", "a|9"]),
+                                                 moved[[2, 1, 0]])
+    assert found.tolist() == [True, False, False]
+    assert values["SourceOID"][0] == 12
+
+def test_editedNetworkGetsANewLocationFile(tmp_path):
+    network = str(tmp_path / "roads.csv")
+    with open(network, "w") as roads:
+        roads.write("fromX,fromY,toX,toY,minutes\n0,0,1,0,2\n")
+    folder = str(tmp_path / "locations")
+    first = od_locations.locationsPath(folder, network)
+    od_locations.saveLocations(first, od_locations.mergeLocations({}, ["a|1"], [1], locationValues(1, 0)))
+    with open(network, "a") as roads:
+        roads.write("1,0,2,0,3\n")
+    second = od_locations.locationsPath(folder, network)
+    assert second != first
+    # The file of the earlier network is stale & goes once the new one is written
+    assert od_locations.loadLocations(second) == {}
+    od_locations.saveLocations(second, od_locations.mergeLocations({}, ["a|1"], [1], locationValues(1, 5)))
+    assert os.listdir(folder) == [os.path.basename(second)]
@@ -0,0 +1,29 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_OD_Parallel_Version_1.0
+# Purpose:     Test the ObjectID where clauses of parallel batches
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import re
+import od_parallel_GitHub as od_parallel
+
+# A function for the ObjectIDs a where clause selects
+def selectedOIDs(where, candidates):
+    selected = set()
+    for low, high in re.findall(r"OID >= (\d+) AND OID <= (\d+)", where):
+        selected.update(oid for oid in candidates if int(low) <= oid <= int(high))
+    for listed in re.findall(r"OID IN \(([\d,-]+)\)", where):
+        selected.update(int(oid) for oid in listed.split(","))
+    return selected
+
+def test_oidWhereSelectsExactlyTheListedOIDs():
+    oids = list(range(10, 2000)) + list(range(3000, 9000, 2)) + [9001, 9002, 12000]
+    where = od_parallel.oidWhere("OID", oids, True)
+    assert selectedOIDs(where, range(13000)) == set(oids)
+    assert max(len(listed.split(",")) for listed in re.findall(r"IN \(([\d,]+)\)", where)) <= \
+        od_parallel.inListSize
+    assert od_parallel.oidWhere("OID", [], True) == "OID IN (-1)"
+    assert od_parallel.oidWhere("OID", [5, 9], False) == "OID >= 5 AND OID <= 9"
@@ -0,0 +1,23 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_OD_Prefilter_Version_1.0
+# Purpose:     Test the straight-line reachability pre-filter
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import numpy
+import od_prefilter_GitHub as od_prefilter
+from conftest import randomPoints
+
+def test_prefilterKeepsEveryReachablePair():
+    originX, originY, volume = randomPoints(80, 50.0, 8)
+    destinationX, destinationY, volume = randomPoints(400, 50.0, 9)
+    radius = od_prefilter.reachRadius(10.0, 0.5)
+    originMask, destinationMask = od_prefilter.reachableMasks(originX, originY, destinationX, destinationY,
+                                                              radius)
+    distances = numpy.hypot(originX[:, None] - destinationX, originY[:, None] - destinationY)
+    rows, columns = numpy.nonzero(distances <= radius)
+    assert originMask[rows].all() and destinationMask[columns].all()
+    assert not originMask[(distances > radius).all(axis=1)].any()
@@ -0,0 +1,89 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_OD_Store_Version_1.0
+# Purpose:     Test the memory-mapped O-D store against the lines it holds
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import os
+import numpy
+import pytest
+import od_store_GitHub as od_store
+from conftest import sortedLines
+
+@pytest.fixture
+def store(problem, tmp_path):
+    '''The problem's lines, written in three chunks'''
+    supplyKeys = ["S%d"%number for number in range(len(problem["supplyVolume"]))]
+    demandKeys = ["D%d"%number for number in range(len(problem["demandVolume"]))]
+    lines = (problem["supplyIndex"], problem["demandIndex"], problem["minutes"])
+    chunks = [tuple(column[start::3] for column in lines) for start in range(3)]
+    od_store.buildStore(str(tmp_path / "store"), supplyKeys, demandKeys, chunks)
+    return od_store.openStore(str(tmp_path / "store"))
+
+def test_supplyLinesMatchTheMatrix(problem, store):
+    minutes = problem["minutes"].astype(numpy.float32)
+    for supply in [0, 7, 24]:
+        for low, high in [(None, None), (2.0, 4.0)]:
+            mask = (problem["supplyIndex"] == supply) & od_store.minuteMask(minutes, low, high)
+            keys, lineMinutes = od_store.supplyLines(store, "S%d"%supply, low, high)
+            expected = dict(("D%d"%demand, value) for demand, value in
+                            zip(problem["demandIndex"][mask], minutes[mask]))
+            assert dict(zip(keys.tolist(), lineMinutes.tolist())) == expected
+
+def test_demandLinesMatchTheMatrix(problem, store):
+    minutes = problem["minutes"].astype(numpy.float32)
+    for demand in [0, 150, 299]:
+        for low, high in [(None, None), (None, 3.0)]:
+            mask = (problem["demandIndex"] == demand) & od_store.minuteMask(minutes, low, high)
+            keys, lineMinutes = od_store.demandLines(store, "D%d"%demand, low, high)
+            expected = dict(("S%d"%supply, value) for supply, value in
+                            zip(problem["supplyIndex"][mask], minutes[mask]))
+            assert dict(zip(keys.tolist(), lineMinutes.tolist())) == expected
+
+def test_unknownKeysHaveNoLines(store):
+    assert len(od_store.supplyLines(store, "S99")[0]) == 0
+    assert len(od_store.demandLines(store, "nowhere")[1]) == 0
+
+def test_lineChunksRebuildTheMatrix(problem, store):
+    chunks = list(od_store.lineChunks(store, chunkLines=50))
+    assert len(chunks) > 1
+    # Supply points are never split across chunks
+    rows = [set(numpy.asarray(chunk[0]).tolist()) for chunk in chunks]
+    assert all(not (rows[number] & rows[number + 1]) for number in range(len(rows) - 1))
+    lines = sortedLines([numpy.concatenate(column) for column in zip(*chunks)])
+    expected = sortedLines((problem["supplyIndex"], problem["demandIndex"],
+                            problem["minutes"].astype(numpy.float32)))
+    for column, expectedColumn in zip(lines, expected):
+        numpy.testing.assert_array_equal(column, expectedColumn)
+
+def test_smallBuildChunksGiveTheSameStore(problem, store, tmp_path):
+    # The counting sort must order lines as a full sort would
+    supplyIndex, demandIndex, minutes = problem["supplyIndex"], problem["demandIndex"], problem["minutes"]
+    shuffle = numpy.random.RandomState(4).permutation(len(minutes))
+    lines = (supplyIndex[shuffle], demandIndex[shuffle], minutes[shuffle])
+    chunks = (tuple(column[start:start + 40] for column in lines) for start in range(0, len(minutes), 40))
+    folder = str(tmp_path / "small")
+    od_store.buildStore(folder, store["supplyKeys"], store["demandKeys"], chunks, chunkLines=7)
+    small = od_store.openStore(folder)
+    rows = numpy.lexsort((demandIndex, supplyIndex))
+    columns = numpy.lexsort((supplyIndex[rows], demandIndex[rows]))
+    numpy.testing.assert_array_equal(small["supplyIndices"], demandIndex[rows])
+    numpy.testing.assert_array_equal(small["minutes"], minutes[rows].astype(numpy.float32))
+    numpy.testing.assert_array_equal(small["demandIndices"], supplyIndex[rows][columns])
+    numpy.testing.assert_array_equal(small["demandOrder"], columns)
+    for name in od_store.storeArrays:
+        numpy.testing.assert_array_equal(small[name], store[name])
+    assert sorted(os.listdir(folder)) == sorted([name + ".npy" for name in od_store.storeArrays] + ["store.json"])
+
+def test_emptyStore(tmp_path):
+    od_store.buildStore(str(tmp_path / "empty"), ["S1"], ["D1"], [])
+    empty = od_store.openStore(str(tmp_path / "empty"))
+    assert len(empty["minutes"]) == 0 and empty["supplyIndptr"].tolist() == [0, 0]
+    assert len(od_store.supplyLines(empty, "S1")[0]) == 0
+
+def test_openRejectsAnIncompleteStore(tmp_path):
+    with pytest.raises(IOError):
+        od_store.openStore(str(tmp_path))
@@ -0,0 +1,46 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_SFCA_Aggregate_Version_1.0
+# Purpose:     Test demand aggregation & its travel time bound
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import numpy
+from scipy.sparse import csgraph
+import od_graph_GitHub as od_graph
+import sfca_aggregate_GitHub as sfca_aggregate
+from conftest import randomPoints
+
+def test_clustersKeepVolumeAndRepresentMembers():
+    xs, ys, volume = randomPoints(500, 20.0, 11)
+    volume[:20] = 0.0
+    clusters = sfca_aggregate.clusterPoints(xs, ys, 2.0)
+    representative, totals = sfca_aggregate.representatives(xs, ys, volume, clusters)
+    numpy.testing.assert_array_equal(clusters[representative], numpy.arange(len(representative)))
+    assert abs(totals.sum() - volume.sum()) < 1e-9
+    # Each cell is 2 map units across, so no point moves further than its diagonal
+    assert sfca_aggregate.displacement(xs, ys, clusters, representative).max() <= 2.0 * numpy.sqrt(2.0)
+
+def test_networkClustersStayWithinTolerance(gridRoads):
+    graph, nodeXY = gridRoads
+    xs, ys, volume = randomPoints(600, 14.0, 12)
+    clusters, representative, totals, times = sfca_aggregate.networkClusters(gridRoads, xs, ys, volume,
+                                                                             3.0, 1.5)
+    numpy.testing.assert_array_equal(clusters[representative], numpy.arange(len(representative)))
+    assert abs(totals.sum() - volume.sum()) < 1e-9
+    assert times.max() <= 1.5
+    # Times are those between each point's node & its representative's node
+    pointNodes = od_graph.snapPoints(nodeXY, xs, ys)[0]
+    nodeTimes = csgraph.dijkstra(graph, directed=True)
+    expected = nodeTimes[pointNodes[representative[clusters]], pointNodes]
+    numpy.testing.assert_allclose(times, expected, atol=1e-12)
+    assert len(representative) < 600
+
+def test_aggregationNoteNamesTheBound():
+    clusters = numpy.array([0, 0, 1])
+    distances = numpy.array([0.0, 1.0, 0.0])
+    assert "no travel time bound" in sfca_aggregate.aggregationNote(2.0, clusters, [1, 1, 1], distances)
+    assert "tolerance 1.5" in sfca_aggregate.aggregationNote(2.0, clusters, [1, 1, 1], distances,
+                                                             numpy.array([0.0, 1.0, 0.0]), 1.5)
@@ -0,0 +1,39 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_SFCA_Categories_Version_1.0
+# Purpose:     Test per-category scores against a separate run per category
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import numpy
+import sfca_core_GitHub as sfca_core
+import sfca_categories_GitHub as sfca_categories
+
+def test_categoryRowsMatchSeparateRuns(problem):
+    # Step 1 runs on every facility; only Step 2 is split by category
+    values = numpy.array(["Clinic", "Hospital", "Pharmacy"])[numpy.arange(len(problem["supplyVolume"])) % 3]
+    names, categoryIndex = sfca_categories.supplyCategories(values)
+    assert names.tolist() == ["Clinic", "Hospital", "Pharmacy"]
+    weights = sfca_core.continuousWeights(problem["minutes"], problem["cutoff"], 20.0)
+    ratios = sfca_core.step1Ratios(problem["supplyVolume"], problem["demandVolume"],
+                                   problem["supplyIndex"], problem["demandIndex"], weights)
+    rows = sfca_categories.categoryRatios(ratios, categoryIndex, len(names))
+    scores = sfca_core.step2Scores(rows, problem["supplyIndex"], problem["demandIndex"], weights,
+                                   len(problem["demandVolume"]))
+    for category in range(len(names)):
+        line = categoryIndex[problem["supplyIndex"]] == category
+        expected = sfca_core.step2Scores(ratios, problem["supplyIndex"][line], problem["demandIndex"][line],
+                                         weights[line], len(problem["demandVolume"]))
+        numpy.testing.assert_allclose(scores[category], expected, rtol=1e-12)
+    numpy.testing.assert_allclose(scores.sum(axis=0),
+                                  sfca_core.step2Scores(ratios, problem["supplyIndex"], problem["demandIndex"],
+                                                        weights, len(problem["demandVolume"])), rtol=1e-12)
+
+def test_categoryFieldsAreNumberedWhenNamesClash():
+    validate = lambda name: name.replace(" ", "_").replace("-", "_")
+    assert sfca_categories.categoryFields(["Dental", "GP"]) == [("Score_Dental", "SPAR_Dental"),
+                                                                 ("Score_GP", "SPAR_GP")]
+    assert sfca_categories.categoryFields(["Urgent care", "Urgent-care"], validate) == \
+        [("Score_1", "SPAR_1"), ("Score_2", "SPAR_2")]
@@ -0,0 +1,104 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_SFCA_Core_Version_1.0
+# Purpose:     Test the 2SFCA scoring engines against a brute-force loop
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import numpy
+import sfca_core_GitHub as sfca_core
+import sfca_sparse_GitHub as sfca_sparse
+
+# A function scoring both steps one line at a time, as the original tools did
+def bruteScores(supplyVolume, demandVolume, supplyIndex, demandIndex, weights):
+    demandTotals = numpy.zeros(len(supplyVolume))
+    for supply, demand, weight in zip(supplyIndex, demandIndex, weights):
+        demandTotals[supply] += demandVolume[demand] * weight
+    ratios = numpy.zeros(len(supplyVolume))
+    for supply in range(len(supplyVolume)):
+        if demandTotals[supply] > 0:
+            ratios[supply] = supplyVolume[supply] / demandTotals[supply]
+    scores = numpy.zeros(len(demandVolume))
+    for supply, demand, weight in zip(supplyIndex, demandIndex, weights):
+        scores[demand] += ratios[supply] * weight
+    return ratios, scores
+
+def test_continuousWeightsDropZeroMinutes():
+    # Times of 0 are outside the catchment, as in the original tools
+    weights = sfca_core.continuousWeights([0.0, 5.0, 10.0, 10.5, -1.0], 10.0, 50.0)
+    assert weights[0] == 0
+    assert weights[1] == sfca_core.gaussianWeights(5.0, 50.0)
+    assert weights[2] > 0
+    assert weights[3] == 0 and weights[4] == 0
+
+def test_zoneWeightsFollowZoneLimits():
+    weights = sfca_core.zoneWeights(numpy.array([0.0, 5.0, 10.0, 10.01, 20.0, 30.0, 30.5, -1.0]),
+                                    [10, 20, 30], [1.0, 0.68, 0.22])
+    numpy.testing.assert_array_equal(weights, [0.0, 1.0, 1.0, 0.68, 0.68, 0.22, 0.0, 0.0])
+
+def test_gaussianSolveHitsTargetWeight():
+    coefficient = sfca_core.gaussianSolve(30.0, 0.01)
+    assert abs(sfca_core.gaussianWeights(30.0, coefficient) - 0.01) < 1e-12
+
+def test_twoStepScoresMatchBruteForce(problem):
+    weights = sfca_core.continuousWeights(problem["minutes"], problem["cutoff"],
+                                          sfca_core.gaussianSolve(problem["cutoff"], 0.1))
+    ratios, scores, spar, avgSpai = sfca_core.twoStepScores(problem["supplyVolume"], problem["demandVolume"],
+                                                            problem["supplyIndex"], problem["demandIndex"],
+                                                            weights)
+    expectedRatios, expectedScores = bruteScores(problem["supplyVolume"], problem["demandVolume"],
+                                                 problem["supplyIndex"], problem["demandIndex"], weights)
+    numpy.testing.assert_allclose(ratios, expectedRatios, rtol=1e-12)
+    numpy.testing.assert_allclose(scores, expectedScores, rtol=1e-12)
+    numpy.testing.assert_allclose(spar, scores / scores.mean(), rtol=1e-12)
+    assert abs(avgSpai - scores.mean()) < 1e-15
+
+def test_sparseEngineMatchesArrays(problem):
+    weights = sfca_core.continuousWeights(problem["minutes"], problem["cutoff"], 20.0)
+    expected = sfca_core.twoStepScores(problem["supplyVolume"], problem["demandVolume"],
+                                       problem["supplyIndex"], problem["demandIndex"], weights, 2.0)
+    matrix = sfca_sparse.weightMatrix([(problem["supplyIndex"], problem["demandIndex"], weights)],
+                                      len(problem["supplyVolume"]), len(problem["demandVolume"]))
+    result = sfca_sparse.twoStepScores(matrix, problem["supplyVolume"], problem["demandVolume"], 2.0)
+    for expectedValue, value in zip(expected, result):
+        numpy.testing.assert_allclose(value, expectedValue, rtol=1e-12, atol=1e-15)
+
+def test_streamedChunksMatchWholeMatrix(problem):
+    weightFunction = lambda minutes: sfca_core.continuousWeights(minutes, problem["cutoff"], 20.0)
+    lines = (problem["supplyIndex"], problem["demandIndex"], problem["minutes"])
+    chunks = lambda: sfca_core.weightChunks([tuple(column[start:start + 97] for column in lines)
+                                             for start in range(0, len(lines[0]), 97)], weightFunction)
+    ratios = sfca_core.streamStep1Ratios(problem["supplyVolume"], problem["demandVolume"], chunks())
+    scores = sfca_core.streamStep2Scores(ratios, chunks(), len(problem["demandVolume"]))
+    expected = sfca_core.twoStepScores(problem["supplyVolume"], problem["demandVolume"],
+                                       problem["supplyIndex"], problem["demandIndex"],
+                                       weightFunction(problem["minutes"]))
+    numpy.testing.assert_allclose(ratios, expected[0], rtol=1e-12)
+    numpy.testing.assert_allclose(scores, expected[1], rtol=1e-12)
+
+def test_scenarioRowsMatchSeparateRuns(problem):
+    distances = numpy.array([3.0, 4.5, 6.0])
+    coefficients = numpy.array([5.0, 10.0, 20.0])
+    weights = sfca_core.continuousWeights(problem["minutes"], distances, coefficients)
+    ratios = sfca_core.step1Ratios(problem["supplyVolume"], problem["demandVolume"],
+                                   problem["supplyIndex"], problem["demandIndex"], weights)
+    scores = sfca_core.step2Scores(ratios, problem["supplyIndex"], problem["demandIndex"], weights,
+                                   len(problem["demandVolume"]))
+    for row, (distance, coefficient) in enumerate(zip(distances, coefficients)):
+        single = sfca_core.twoStepScores(problem["supplyVolume"], problem["demandVolume"],
+                                         problem["supplyIndex"], problem["demandIndex"],
+                                         sfca_core.continuousWeights(problem["minutes"], distance, coefficient))
+        numpy.testing.assert_allclose(scores[row], single[1], rtol=1e-12)
+
+def test_unreachedPointsScoreZero():
+    ratios, scores, spar, avgSpai = sfca_core.twoStepScores([10.0, 5.0], [100.0, 50.0, 20.0],
+                                                            numpy.array([0]), numpy.array([1]),
+                                                            numpy.array([1.0]))
+    numpy.testing.assert_array_equal(ratios, [0.2, 0.0])
+    numpy.testing.assert_array_equal(scores, [0.0, 0.2, 0.0])
+
+def test_mapIndexMarksUnknownValues():
+    numpy.testing.assert_array_equal(sfca_core.mapIndex(numpy.array(["b", "a", "c"]),
+                                                        numpy.array(["c", "x", "a"])), [2, -1, 1])
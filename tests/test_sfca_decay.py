@@ -0,0 +1,54 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_SFCA_Decay_Version_1.0
+# Purpose:     Test the decay functions, their solvers & lookup tables
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import numpy
+import pytest
+import sfca_core_GitHub as sfca_core
+import sfca_decay_GitHub as sfca_decay
+
+@pytest.mark.parametrize("name", ["Gaussian", "Exponential", "Power", "Kernel density"])
+def test_solversHitTargetWeight(name):
+    decay, solve = sfca_decay.decayFunction(name)
+    coefficient = solve(30.0, 0.1)
+    assert abs(float(decay(30.0, coefficient, 30.0)) - 0.1) < 1e-9
+
+@pytest.mark.parametrize("name", sorted(sfca_decay.decayFunctions))
+def test_weightsFallWithTime(name):
+    decay, solve = sfca_decay.decayFunction(name)
+    minutes = numpy.linspace(0.0, 30.0, 61)
+    weights = decay(minutes, solve(30.0, 0.1), 30.0)
+    assert weights[0] == pytest.approx(1.0) or name == "Stepwise"
+    assert (numpy.diff(weights) <= 1e-12).all()
+
+def test_unknownDecayIsRejected():
+    with pytest.raises(ValueError):
+        sfca_decay.decayFunction("Linear")
+
+def test_powerWeightsAreCappedUnderAMinute():
+    numpy.testing.assert_array_equal(sfca_decay.powerDecay([0.0, 0.5, 1.0], 1.5), [1.0, 1.0, 1.0])
+
+def test_lookupErrorBoundsQuantizedWeights():
+    weightFunction = lambda minutes: sfca_core.continuousWeights(minutes, 30.0, sfca_core.gaussianSolve(30.0, 0.01))
+    quantized, maxError = sfca_decay.quantizedWeights(weightFunction, 30.0, 0.25)
+    minutes = numpy.random.RandomState(0).uniform(-1.0, 35.0, 5000)
+    minutes[:3] = [0.0, 30.0, 30.0 + 1e-9]
+    assert numpy.abs(quantized(minutes) - weightFunction(minutes)).max() <= maxError + 1e-12
+    assert maxError < 0.01
+
+def test_lookupErrorFindsJumpsInsideABin():
+    # A zone limit just past a bin edge changes the weight of a sliver of the bin
+    weightFunction = lambda minutes: sfca_core.zoneWeights(minutes, [1.01, 2.0, 3.0], [1.0, 0.5, 0.25])
+    quantized, maxError = sfca_decay.quantizedWeights(weightFunction, 3.0, 1.0)
+    assert maxError == 0.5
+    assert abs(quantized(numpy.array([1.005])) - weightFunction(numpy.array([1.005])))[0] == 0.5
+
+def test_lookupWeightsZeroAndPastCutoffExactly():
+    weightFunction = lambda minutes: sfca_core.continuousWeights(minutes, 10.0, 50.0)
+    quantized = sfca_decay.quantizedWeights(weightFunction, 10.0, 1.0)[0]
+    numpy.testing.assert_array_equal(quantized(numpy.array([0.0, 10.5, -2.0])), [0.0, 0.0, 0.0])
@@ -0,0 +1,36 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_SFCA_Jobs_Version_1.0
+# Purpose:     Test how job specs are split into waves sharing cached matrices
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import pytest
+import sfca_jobs_GitHub as sfca_jobs
+
+@pytest.fixture
+def spec():
+    return {"defaults": {"inputND": "streets_ND", "inputSupply": "clinics", "inputDemand": "blocks",
+                         "cacheFolder": "cache"},
+            "jobs": [{"name": "first", "method": "V2SFCA", "distance": 30},
+                     {"name": "coefficient", "method": "V2SFCA", "distance": 30, "coefficient": 80},
+                     {"name": "zones", "method": "E2SFCA", "distList": [10, 20, 30]},
+                     {"name": "aggregated", "method": "V2SFCA", "distance": 30, "demandCellSize": 500},
+                     {"name": "tiled", "method": "V2SFCA", "distance": 30, "tileSize": 5000},
+                     {"name": "farther", "method": "V2SFCA", "distance": 45}]}
+
+def test_onlyJobsSharingAMatrixWait(spec):
+    waves = sfca_jobs.jobWaves(sfca_jobs.specJobs(spec))
+    assert [[job["name"] for job in wave] for wave in waves] == \
+        [["first", "zones", "aggregated", "tiled", "farther"], ["coefficient"]]
+
+def test_jobsWithoutACacheNeverWait(spec):
+    spec["defaults"]["cacheFolder"] = ""
+    assert len(sfca_jobs.jobWaves(sfca_jobs.specJobs(spec))) == 1
+
+def test_methodIsRequired(spec):
+    spec["jobs"].append({"name": "unknown"})
+    with pytest.raises(ValueError):
+        sfca_jobs.specJobs(spec)
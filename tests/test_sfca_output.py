@@ -0,0 +1,34 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_SFCA_Output_Version_1.0
+# Purpose:     Test writing & reading back columnar output files
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import numpy
+import sfca_output_GitHub as sfca_output
+
+def test_columnarRoundTrip(problem, tmp_path):
+    scores = numpy.random.RandomState(13).rand(2, len(problem["demandVolume"]))
+    columns = sfca_output.scoreColumns(numpy.arange(len(problem["demandVolume"])), scores,
+                                       scores / scores.mean(axis=1)[:, None])
+    lines = (problem["supplyIndex"], problem["demandIndex"], problem["minutes"])
+    supplyKeys = ["S%d"%number for number in range(len(problem["supplyVolume"]))]
+    demandKeys = ["D%d"%number for number in range(len(problem["demandVolume"]))]
+    # pyarrow is optional, as in the tools
+    for name in ["scores.npz"] + ([] if sfca_output.pyarrow is None else ["scores.arrow"]):
+        path = str(tmp_path / name)
+        sfca_output.writeColumnar(path, columns, supplyKeys, demandKeys, [lines])
+        arrays = sfca_output.readColumnar(path)
+        numpy.testing.assert_array_equal(arrays["S2_Score"], scores[1])
+        numpy.testing.assert_array_equal(arrays["od_minutes"], problem["minutes"].astype(numpy.float32))
+        numpy.testing.assert_array_equal(numpy.asarray(arrays["od_demandKeys"])[arrays["od_demandIndex"]],
+                                         numpy.array(demandKeys)[problem["demandIndex"]])
+
+def test_wideIDsAreNotWrapped():
+    ids = numpy.array([1, 350010001001000], dtype=numpy.int64)
+    columns = dict(sfca_output.scoreColumns(ids, numpy.zeros(2), numpy.zeros(2)))
+    assert columns["ID"].tolist() == ids.tolist()
+    assert dict(sfca_output.scoreColumns(numpy.arange(3), numpy.zeros(3), numpy.zeros(3)))["ID"].dtype == numpy.int32
@@ -0,0 +1,22 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_SFCA_Tables_Version_1.0
+# Purpose:     Test the ID checks of bulk table writes
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import numpy
+import pytest
+import sfca_tables_GitHub as sfca_tables
+
+def test_longIDsKeepValues():
+    ids = sfca_tables.longIDs(numpy.array([1, 2 ** 31 - 1, -5], dtype=numpy.int64))
+    assert ids.dtype == numpy.int32
+    assert ids.tolist() == [1, 2 ** 31 - 1, -5]
+
+def test_longIDsRejectWideIDs():
+    # e.g. a census block GEOID read as a number
+    with pytest.raises(ValueError):
+        sfca_tables.longIDs(numpy.array([1, 350010001001000], dtype=numpy.int64))
@@ -0,0 +1,43 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_SFCA_Tiles_Version_1.0
+# Purpose:     Test tiled runs against an untiled run of the same problem
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import numpy
+import pytest
+import sfca_core_GitHub as sfca_core
+import sfca_tiles_GitHub as sfca_tiles
+
+@pytest.mark.parametrize("reuseMatrix", [True, False])
+def test_tiledScoresMatchUntiledScores(problem, tmp_path, reuseMatrix):
+    settings = sfca_tiles.tileSettings("straightLine", problem["cutoff"], 20.0, reuseMatrix=reuseMatrix,
+                                       speed=1.0)
+    supplyIDs = numpy.arange(len(problem["supplyVolume"])) + 1
+    demandIDs = numpy.arange(len(problem["demandVolume"])) + 1
+    ratios, scores, tileCount, lineCount = sfca_tiles.runTiles(str(tmp_path / "queue"), settings, supplyIDs,
+                                                               problem["supplyVolume"], problem["supplyX"],
+                                                               problem["supplyY"], demandIDs,
+                                                               problem["demandVolume"], problem["demandX"],
+                                                               problem["demandY"], 5.0,
+                                                               problem["cutoff"])[:4]
+    expected = sfca_core.twoStepScores(problem["supplyVolume"], problem["demandVolume"],
+                                       problem["supplyIndex"], problem["demandIndex"],
+                                       sfca_core.continuousWeights(problem["minutes"], problem["cutoff"], 20.0))
+    assert tileCount > 1
+    assert lineCount == len(problem["minutes"]) * (1 if reuseMatrix else 2)
+    numpy.testing.assert_allclose(ratios, expected[0], rtol=1e-12)
+    numpy.testing.assert_allclose(scores, expected[1], rtol=1e-12)
+
+def test_tilesNeedAHalo(problem, tmp_path):
+    settings = sfca_tiles.tileSettings("straightLine", problem["cutoff"], 20.0, speed=1.0)
+    with pytest.raises(ValueError):
+        sfca_tiles.writeJobs(str(tmp_path / "queue"), settings, [1], [1.0], [0.0], [0.0],
+                             [1], [1.0], [0.0], [0.0], 5.0, 0)
+
+def test_unknownSolverIsRejected():
+    with pytest.raises(ValueError):
+        sfca_tiles.tileSettings("teleport", 10.0, 20.0)
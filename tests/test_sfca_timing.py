@@ -0,0 +1,33 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_SFCA_Timing_Version_1.0
+# Purpose:     Test the per-stage memory of the run timings
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import csv
+import sfca_timing_GitHub as sfca_timing
+
+def test_peakGrowthIsPerStage(tmp_path, monkeypatch):
+    # The process peak read as each stage starts & ends; it never falls
+    peaks = iter([100.0, 180.0, 180.0, 180.0, 180.0, 250.0])
+    monkeypatch.setattr(sfca_timing, "peakMemory", lambda: next(peaks))
+    timings = sfca_timing.StageTimings()
+    for name in ("Solving", "Reading", "Scoring"):
+        timings.start(name)
+    timings.stop()
+    assert [stage["processPeakMB"] for stage in timings.stages] == [180.0, 180.0, 250.0]
+    assert [stage["peakGrowthMB"] for stage in timings.stages] == [80.0, 0.0, 70.0]
+    path = timings.writeSidecar(str(tmp_path / "timings.csv"))
+    rows = list(csv.DictReader(open(path)))
+    assert [float(row["peakGrowthMB"]) for row in rows] == [80.0, 0.0, 70.0]
+    assert "process peak memory so far 250.0 MB (+70.0 MB in this stage)" in timings.reportText()
+
+def test_memoryLeftOutWhereItCannotBeRead(monkeypatch):
+    monkeypatch.setattr(sfca_timing, "peakMemory", lambda: None)
+    timings = sfca_timing.StageTimings()
+    timings.start("Solving")
+    assert "memory" not in timings.reportText()
+    assert timings.stages[0]["peakGrowthMB"] is None
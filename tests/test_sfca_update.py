@@ -0,0 +1,62 @@
+'''-----------------------------------------------------------------------------
+# Name:        Test_SFCA_Update_Version_1.0
+# Purpose:     Test incremental updates against a full run from scratch
+# Author:      Sagert Sheets
+# Created:     October 2026
+# Note:        GitHub version. Provided for review purposes only.
+#----------------------------------------------------------------------------'''
+
+# Import necessary modules
+import numpy
+import sfca_core_GitHub as sfca_core
+import sfca_update_GitHub as sfca_update
+
+# A function for a state scored from scratch on some of the problem's points
+def freshState(problem, supplyPoints, demandPoints, weightFunction, supplyVolume, demandVolume):
+    supplyPosition = sfca_core.mapIndex(numpy.asarray(supplyPoints), problem["supplyIndex"])
+    demandPosition = sfca_core.mapIndex(numpy.asarray(demandPoints), problem["demandIndex"])
+    keep = (supplyPosition >= 0) & (demandPosition >= 0)
+    return sfca_update.buildState(["S%d"%point for point in supplyPoints], supplyVolume[supplyPoints],
+                                  ["D%d"%point for point in demandPoints], demandVolume[demandPoints],
+                                  supplyPosition[keep], demandPosition[keep],
+                                  weightFunction(problem["minutes"][keep]), multiplier=1000.0)
+
+def test_updateMatchesAFullRun(problem, tmp_path):
+    weightFunction = lambda minutes: sfca_core.continuousWeights(minutes, problem["cutoff"], 20.0)
+    supplyVolume, demandVolume = problem["supplyVolume"].copy(), problem["demandVolume"].copy()
+    supplyCount, demandCount = len(supplyVolume), len(demandVolume)
+    state = freshState(problem, list(range(supplyCount - 3)), list(range(demandCount - 10)),
+                       weightFunction, supplyVolume, demandVolume)
+    path = sfca_update.saveState(str(tmp_path / "state.npz"), state)
+    state = sfca_update.loadState(path)
+
+    # Add the last points, remove a few & change some volumes
+    supplyVolume[5], demandVolume[11] = 400.0, 2.5
+    supplyPoints = [point for point in range(supplyCount) if point != 3]
+    demandPoints = [point for point in range(demandCount) if point not in (7, 40)]
+    added = ((problem["supplyIndex"] >= supplyCount - 3) | (problem["demandIndex"] >= demandCount - 10))
+    newLines = (["S%d"%point for point in problem["supplyIndex"][added]],
+                ["D%d"%point for point in problem["demandIndex"][added]], problem["minutes"][added])
+    supplyVolumes = dict(("S%d"%point, supplyVolume[point]) for point in [5] + list(range(supplyCount - 3, supplyCount)))
+    demandVolumes = dict(("D%d"%point, demandVolume[point]) for point in [11] + list(range(demandCount - 10, demandCount)))
+    updated, nSupply, nDemand = sfca_update.updateState(state, weightFunction, supplyVolumes, demandVolumes,
+                                                        ["S3"], ["D7", "D40"], newLines)
+    expected = freshState(problem, supplyPoints, demandPoints, weightFunction, supplyVolume, demandVolume)
+
+    # Scores are compared by key, as added points come last
+    assert sorted(updated["supplyKeys"].tolist()) == sorted(expected["supplyKeys"].tolist())
+    supplyOrder = sfca_core.mapIndex(updated["supplyKeys"], expected["supplyKeys"])
+    demandOrder = sfca_core.mapIndex(updated["demandKeys"], expected["demandKeys"])
+    numpy.testing.assert_allclose(updated["ratios"][supplyOrder], expected["ratios"], rtol=1e-12)
+    numpy.testing.assert_allclose(updated["scores"][demandOrder], expected["scores"], rtol=1e-12)
+    numpy.testing.assert_allclose(updated["spar"][demandOrder], expected["spar"], rtol=1e-12)
+    assert 0 < nSupply < len(supplyPoints) and 0 < nDemand <= len(demandPoints)
+
+def test_updateWithoutChangesKeepsScores(problem):
+    weightFunction = lambda minutes: sfca_core.continuousWeights(minutes, problem["cutoff"], 20.0)
+    points = lambda count: list(range(count))
+    state = freshState(problem, points(len(problem["supplyVolume"])), points(len(problem["demandVolume"])),
+                       weightFunction, problem["supplyVolume"], problem["demandVolume"])
+    updated, nSupply, nDemand = sfca_update.updateState(state, weightFunction)
+    assert (nSupply, nDemand) == (0, 0)
+    numpy.testing.assert_array_equal(updated["scores"], state["scores"])